@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+上游原始响应归档（SQLite）
+每个响应体按内容寻址（blake2b）压缩保存一份，多次轮询得到相同内容时只更新抓取时间；
+抓取记录按 URL + 时间索引，回放时取某一时刻（默认最新）的响应，完全不访问网络。
+新增数据王字段、修复解析问题后，可以从归档重新生成历史输出，而不必重新下载。
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, Iterator, Optional, Tuple
+
+COMPRESS_LEVEL = 6
+
+
+def payload_digest(body: bytes) -> str:
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+class PayloadArchive:
+    """
+    blobs:   digest -> 压缩后的响应体（去重）
+    fetches: 每个 URL 的内容变化点 (status, digest, first_seen, last_seen, polls)；
+             内容未变的重复抓取只更新 last_seen / polls
+    线程安全。
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        # 本进程内的计数
+        self.stored = 0          # 新增的响应体
+        self.deduped = 0         # 内容已存在的抓取
+        self.raw_bytes = 0       # 新增响应体的原始大小
+        self.stored_bytes = 0    # 新增响应体压缩后的大小
+        self.replay_hits = 0
+        self.replay_misses = 0
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS blobs ("
+                " digest TEXT PRIMARY KEY,"
+                " size INTEGER NOT NULL,"
+                " data BLOB NOT NULL)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS fetches ("
+                " url TEXT NOT NULL,"
+                " status INTEGER NOT NULL,"
+                " digest TEXT NOT NULL,"
+                " first_seen REAL NOT NULL,"
+                " last_seen REAL NOT NULL,"
+                " polls INTEGER NOT NULL DEFAULT 1)")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS fetches_url_time ON fetches (url, first_seen)")
+
+    def record(self, url: str, status: int, body: bytes, fetched_at: Optional[float] = None) -> bool:
+        """保存一次抓取结果，返回是否新增了响应体"""
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        digest = payload_digest(body)
+        with self._lock, self._conn:
+            last = self._conn.execute(
+                "SELECT rowid, status, digest FROM fetches WHERE url = ? ORDER BY first_seen DESC LIMIT 1",
+                (url,)).fetchone()
+            if last is not None and last[1] == status and last[2] == digest:
+                self._conn.execute(
+                    "UPDATE fetches SET last_seen = MAX(last_seen, ?), polls = polls + 1 WHERE rowid = ?",
+                    (fetched_at, last[0]))
+                self.deduped += 1
+                return False
+            new_blob = self._conn.execute(
+                "SELECT 1 FROM blobs WHERE digest = ?", (digest,)).fetchone() is None
+            if new_blob:
+                data = zlib.compress(body, COMPRESS_LEVEL)
+                self._conn.execute(
+                    "INSERT INTO blobs (digest, size, data) VALUES (?, ?, ?)", (digest, len(body), data))
+                self.stored += 1
+                self.raw_bytes += len(body)
+                self.stored_bytes += len(data)
+            else:
+                self.deduped += 1
+            self._conn.execute(
+                "INSERT INTO fetches (url, status, digest, first_seen, last_seen) VALUES (?, ?, ?, ?, ?)",
+                (url, status, digest, fetched_at, fetched_at))
+        return new_blob
+
+    def lookup(self, url: str, as_of: Optional[float] = None) -> Optional[Tuple[int, bytes]]:
+        """取 URL 在 as_of 时刻（默认最新）的响应 (状态码, 响应体)，没有归档时返回 None"""
+        with self._lock:
+            if as_of is None:
+                row = self._conn.execute(
+                    "SELECT f.status, b.data FROM fetches f JOIN blobs b ON b.digest = f.digest"
+                    " WHERE f.url = ? ORDER BY f.first_seen DESC LIMIT 1", (url,)).fetchone()
+            else:
+                row = self._conn.execute(
+                    "SELECT f.status, b.data FROM fetches f JOIN blobs b ON b.digest = f.digest"
+                    " WHERE f.url = ? AND f.first_seen <= ? ORDER BY f.first_seen DESC LIMIT 1",
+                    (url, as_of)).fetchone()
+            if row is None:
+                self.replay_misses += 1
+                return None
+            self.replay_hits += 1
+        return row[0], zlib.decompress(row[1])
+
+    def iter_latest(self, pattern: str) -> Iterator[Tuple[str, int, bytes]]:
+        """URL 匹配 LIKE pattern 的每个 URL 的最新响应 (url, 状态码, 响应体)，按 URL 排序"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT f.url, f.status, f.digest FROM fetches f"
+                " WHERE f.url LIKE ? AND f.first_seen = (SELECT MAX(first_seen) FROM fetches WHERE url = f.url)"
+                " ORDER BY f.url", (pattern,)).fetchall()
+        for url, status, digest in rows:
+            with self._lock:
+                row = self._conn.execute("SELECT data FROM blobs WHERE digest = ?", (digest,)).fetchone()
+            if row is not None:
+                yield url, status, zlib.decompress(row[0])
+
+    def summary(self) -> Dict[str, int]:
+        """整个归档的规模：{urls, fetches, polls, blobs, rawBytes, storedBytes}"""
+        with self._lock:
+            urls, fetches, polls = self._conn.execute(
+                "SELECT COUNT(DISTINCT url), COUNT(*), COALESCE(SUM(polls), 0) FROM fetches").fetchone()
+            blobs, raw, stored = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(LENGTH(data)), 0) FROM blobs").fetchone()
+        return {"urls": urls, "fetches": fetches, "polls": polls, "blobs": blobs,
+                "rawBytes": raw, "storedBytes": stored}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
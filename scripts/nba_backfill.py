@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按美东日期区间回填（backfill）
+对 [start, end] 中的每一天有界并发抓取，每完成一天立即交给输出回调并记录检查点；
+中断后重新运行会跳过检查点中已完成的日期，不会重复下载。
+成功抓取、且比赛全部完赛并已定型（比分和数据王齐全）的日期记为完成
+（没有比赛的日期、以及过去的日期中未开赛的比赛只剩延期 / 取消的也算）；
+请求失败的日期记为失败、不输出；已完赛但数据王缺失（boxscore 请求失败等）的日期照常输出并记为失败；
+未完赛的日期不记录。失败和未完赛的日期下次仍会重新抓取。
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+from nba_game_store import is_final_match
+
+NY_TZ = ZoneInfo("America/New_York")
+
+# 同时抓取的日期数（每天内部的 boxscore 并发另由 BOXSCORE_CONCURRENCY 控制）
+DEFAULT_BACKFILL_CONCURRENCY = 4
+# 距今（美东）至少这么多天的日期中仍未开赛的比赛视为延期 / 取消，不再等待
+SETTLED_AFTER_DAYS = 2
+
+
+class DayFetchError(Exception):
+    """所有来源都没有返回这一天的赛程（请求失败，不同于当天没有比赛）"""
+
+
+def parse_et_date(value: str) -> date:
+    """解析 YYYY-MM-DD 或 YYYYMMDD 格式的美东日期"""
+    for fmt in ("%Y-%m-%d", "%Y%m%d"):
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"无法解析日期: {value}（应为 YYYY-MM-DD）")
+
+
+def et_date_range(start: date, end: date) -> List[datetime]:
+    """[start, end] 中每一天的美东零点（含两端）"""
+    if end < start:
+        raise ValueError(f"结束日期 {end} 早于开始日期 {start}")
+    return [datetime(d.year, d.month, d.day, tzinfo=NY_TZ)
+            for d in (start + timedelta(days=i) for i in range((end - start).days + 1))]
+
+
+def day_is_complete(matches: List[Dict], day: Optional[date] = None, today: Optional[date] = None) -> bool:
+    """
+    成功抓取的一天是否已定型：没有比赛，或比赛全部完赛且数据已定型（is_final_match）；
+    day 距 today（默认美东今天）至少 SETTLED_AFTER_DAYS 天时，未开赛的比赛（延期 / 取消）不影响定型
+    """
+    if today is None:
+        today = datetime.now(NY_TZ).date()
+    settled = day is not None and (today - day).days >= SETTLED_AFTER_DAYS
+    return all(is_final_match(m) or (settled and m.get("status") == "upcoming") for m in matches)
+
+
+def has_unsettled_finals(matches: List[Dict]) -> bool:
+    """是否有已完赛但数据尚未定型（数据王缺失等）的比赛"""
+    return any(m.get("status") == "finished" and not is_final_match(m) for m in matches)
+
+
+class BackfillCheckpoint:
+    """
+    回填检查点：{"done": {YYYYMMDD: 比赛数}, "failed": {YYYYMMDD: 错误信息}}，按日期记录，
+    不同区间的回填可共用同一个文件。failed 中的日期下次仍会重新抓取，成功后移出。
+    每完成一天原子写入一次。
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.done: Dict[str, int] = {}
+        self.failed: Dict[str, str] = {}
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.done = {str(k): int(v) for k, v in data["done"].items()}
+            self.failed = {str(k): str(v) for k, v in (data.get("failed") or {}).items()}
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            pass
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"done": self.done, "failed": self.failed, "updatedAt": time.time()}, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"回填检查点保存失败: {e}", file=sys.stderr)
+
+    def is_done(self, day_key: str) -> bool:
+        return day_key in self.done
+
+    def mark_done(self, day_key: str, count: int) -> None:
+        self.done[day_key] = count
+        self.failed.pop(day_key, None)
+        self.save()
+
+    def mark_failed(self, day_key: str, error: str) -> None:
+        self.failed[day_key] = error
+        self.save()
+
+    def clear_failed(self, day_key: str) -> None:
+        if self.failed.pop(day_key, None) is not None:
+            self.save()
+
+
+async def run_backfill(days: List[datetime],
+                       fetch_day: Callable[[datetime], Awaitable[List[Dict]]],
+                       on_day: Callable[[datetime, List[Dict]], Awaitable[None]],
+                       checkpoint: Optional[BackfillCheckpoint] = None,
+                       concurrency: int = DEFAULT_BACKFILL_CONCURRENCY) -> Dict:
+    """
+    有界并发回填：固定数量的 worker 依次领取日期，内存占用与区间长度无关。
+    fetch_day: 抓取一天的协程函数（请求失败时抛出异常，如 DayFetchError；没有比赛时返回空列表）
+    on_day: 每成功抓取一天调用一次的协程函数（先输出，再写检查点：中断时最多重复输出一天，不会丢失）；
+            失败的日期不输出，只记入检查点的 failed
+    返回汇总 {days, skipped, completed, incomplete, failed, count}
+    """
+    checkpoint = checkpoint or BackfillCheckpoint(None)
+    pending = [d for d in days if not checkpoint.is_done(d.strftime("%Y%m%d"))]
+    summary = {"days": len(days), "skipped": len(days) - len(pending), "completed": 0, "incomplete": 0,
+               "failed": 0, "count": 0}
+    if summary["skipped"]:
+        print(f"回填: 检查点中已完成 {summary['skipped']} 天，跳过", file=sys.stderr)
+
+    queue: "asyncio.Queue[datetime]" = asyncio.Queue()
+    for d in pending:
+        queue.put_nowait(d)
+
+    async def worker() -> None:
+        while True:
+            try:
+                day = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            day_key = day.strftime("%Y%m%d")
+            try:
+                matches = await fetch_day(day)
+            except Exception as e:
+                print(f"回填 {day_key} 失败: {e}", file=sys.stderr)
+                checkpoint.mark_failed(day_key, str(e))
+                summary["failed"] += 1
+                continue
+            await on_day(day, matches)
+            summary["count"] += len(matches)
+            if day_is_complete(matches, day.date()):
+                checkpoint.mark_done(day_key, len(matches))
+                summary["completed"] += 1
+            else:
+                if has_unsettled_finals(matches):
+                    checkpoint.mark_failed(day_key, "已完赛比赛的数据尚未定型")
+                else:
+                    checkpoint.clear_failed(day_key)
+                summary["incomplete"] += 1
+            print(f"回填 {day_key}: {len(matches)} 场比赛", file=sys.stderr)
+
+    await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, len(pending) or 1)))))
+    return summary
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+离线基准测试：对回放上游（nba_bench_stub）跑完整的多日抓取，报告
+端到端延迟（最小/中位数/p95/最大）、各阶段 CPU 时间（JSON 解码、CDN 比赛构建、数据王、stats 解析、
+ESPN 解析、完赛存储、输出编码）、请求数、峰值内存。每轮在独立子进程中运行，默认使用全新的缓存目录（冷启动）。
+
+用法：
+    python scripts/nba_bench.py                                   # 默认场景 light，5 轮
+    python scripts/nba_bench.py run heavy -n 10 --latency-ms 30 --save heavy.json
+    python scripts/nba_bench.py run heavy --baseline heavy.json   # 与上次结果对比
+    python scripts/nba_bench.py run fallback --env NBA_JSON_BACKEND=json
+    python scripts/nba_bench.py run light --warm                  # 共享缓存目录（先预热一轮）
+    python scripts/nba_bench.py generate                          # 重新生成内置场景
+    python scripts/nba_bench.py record tonight                    # 录制今天前后的真实响应（需要网络）
+    python scripts/nba_bench.py stub heavy --port 8800            # 只启动回放上游
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+from urllib.request import urlopen
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+STUB_SCRIPT = os.path.join(SCRIPT_DIR, "nba_bench_stub.py")
+
+# (阶段名, 模块, 函数名)：在工作进程中包装这些函数以统计线程 CPU 时间（嵌套调用只计入最内层）
+STAGES = (
+    ("decode", "nba_json", "loads"),
+    ("cdn_build", "nba_scraper", "_build_cdn_match"),
+    ("leaders", "nba_scraper", "cdn_team_leaders"),
+    ("stats_scoreboard", "nba_scraper", "_parse_stats_scoreboard"),
+    ("stats_leaders", "nba_scraper", "_parse_stats_boxscore_leaders"),
+    ("espn_leaders", "nba_scraper", "_parse_espn_leaders_map"),
+    ("store_write", "nba_scraper", "_store_finished_day"),
+    ("store_read", "nba_scraper", "_load_finished_games"),
+)
+
+
+# ===== 工作进程：跑一轮抓取，把测量结果作为一行 JSON 输出到 stdout =====
+
+def _instrument(stage_cpu: Dict[str, float]) -> None:
+    import importlib
+
+    stack: List[float] = []  # 每层已被子阶段占用的 CPU 时间
+
+    def wrap(name: str, fn):
+        def timed(*args, **kwargs):
+            stack.append(0.0)
+            start = time.thread_time()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = time.thread_time() - start
+                child = stack.pop()
+                stage_cpu[name] = stage_cpu.get(name, 0.0) + elapsed - child
+                if stack:
+                    stack[-1] += elapsed
+        return timed
+
+    for name, module, attr in STAGES:
+        mod = importlib.import_module(module)
+        setattr(mod, attr, wrap(name, getattr(mod, attr)))
+
+
+def _worker(args: argparse.Namespace) -> None:
+    import resource
+    import tracemalloc
+
+    if args.tracemalloc:
+        tracemalloc.start()
+    stage_cpu: Dict[str, float] = {}
+    _instrument(stage_cpu)
+    import nba_json
+    import nba_scraper
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    matches = nba_scraper.fetch_nba_schedule_multi_day()
+    fetch_wall = time.perf_counter() - wall_start
+    encode_start = time.thread_time()
+    output = nba_json.dumps_bytes(nba_scraper._build_result(matches))
+    stage_cpu["encode"] = time.thread_time() - encode_start
+    wall = time.perf_counter() - wall_start
+    result = {
+        "wall": wall,
+        "fetchWall": fetch_wall,
+        "cpu": time.process_time() - cpu_start,
+        "stages": stage_cpu,
+        "matches": len(matches),
+        "outputBytes": len(output),
+        "maxRssKb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "sources": nba_scraper.METRICS.totals("source_wins_total", "source"),
+    }
+    if args.tracemalloc:
+        result["tracemallocPeak"] = tracemalloc.get_traced_memory()[1]
+    sys.stdout.write(json.dumps(result) + "\n")
+
+
+# ===== 运行器 =====
+
+def _start_stub(args: argparse.Namespace):
+    """启动回放上游子进程，返回 (进程, 基础 URL)"""
+    cmd = [sys.executable, STUB_SCRIPT, args.scenario, "--latency-ms", str(args.latency_ms),
+           "--jitter-ms", str(args.jitter_ms), "--error-rate", str(args.error_rate), "--seed", str(args.seed)]
+    for v in args.host_latency:
+        cmd += ["--host-latency", v]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    line = proc.stdout.readline().strip()
+    if not line.startswith("http://"):
+        proc.kill()
+        raise RuntimeError(f"回放上游启动失败: {line or proc.wait()}")
+    return proc, line
+
+
+def _stub_call(base: str, path: str) -> Dict:
+    with urlopen(f"{base}/{path}", timeout=5) as resp:
+        return json.loads(resp.read())
+
+
+def _run_iteration(base: str, cache_dir: str, args: argparse.Namespace) -> Dict:
+    env = dict(os.environ)
+    env.update(v.split("=", 1) for v in args.env)
+    env["NBA_UPSTREAM_OVERRIDE"] = base
+    env["NBA_CACHE_DIR"] = cache_dir
+    cmd = [sys.executable, os.path.abspath(__file__), "_worker"] + (["--tracemalloc"] if args.tracemalloc else [])
+    _stub_call(base, "__reset")
+    proc = subprocess.run(cmd, env=env, capture_output=True, text=True, timeout=args.timeout)
+    if proc.returncode != 0 or not proc.stdout.strip():
+        raise RuntimeError(f"工作进程失败（退出码 {proc.returncode}）:\n{proc.stderr[-2000:]}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["upstream"] = _stub_call(base, "__stats")
+    return result
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))]
+
+
+def summarize(runs: List[Dict]) -> Dict:
+    walls = [r["wall"] for r in runs]
+    stage_names = sorted({name for r in runs for name in r["stages"]})
+    summary = {
+        "runs": len(runs),
+        "wall": {"min": min(walls), "median": statistics.median(walls), "p95": _percentile(walls, 0.95),
+                 "max": max(walls)},
+        "cpu": statistics.median(r["cpu"] for r in runs),
+        "stages": {name: statistics.median(r["stages"].get(name, 0.0) for r in runs) for name in stage_names},
+        "matches": runs[-1]["matches"],
+        "outputBytes": runs[-1]["outputBytes"],
+        "maxRssKb": max(r["maxRssKb"] for r in runs),
+        "requests": runs[-1]["upstream"]["requests"],
+        "statuses": runs[-1]["upstream"]["statuses"],
+        "upstreamBytes": runs[-1]["upstream"]["bytes"],
+        "sources": runs[-1]["sources"],
+    }
+    if all("tracemallocPeak" in r for r in runs):
+        summary["tracemallocPeak"] = max(r["tracemallocPeak"] for r in runs)
+    return summary
+
+
+def _delta(now: float, before: Optional[float]) -> str:
+    if not before:
+        return ""
+    return f"  ({(now - before) / before * 100:+.1f}%)"
+
+
+def print_report(summary: Dict, baseline: Optional[Dict] = None) -> None:
+    base = baseline or {}
+    bw = base.get("wall", {})
+    w = summary["wall"]
+    print(f"场景 {summary['scenario']}，{summary['runs']} 轮，比赛 {summary['matches']} 场，"
+          f"输出 {summary['outputBytes'] / 1024:.0f} KB")
+    for key in ("min", "median", "p95", "max"):
+        print(f"  延迟 {key:<6} {w[key] * 1000:9.1f} ms{_delta(w[key], bw.get(key))}")
+    print(f"  CPU 总计     {summary['cpu'] * 1000:9.1f} ms{_delta(summary['cpu'], base.get('cpu'))}")
+    base_stages = base.get("stages", {})
+    for name, cpu in sorted(summary["stages"].items(), key=lambda kv: -kv[1]):
+        print(f"    {name:<17} {cpu * 1000:8.1f} ms{_delta(cpu, base_stages.get(name))}")
+    requests_total = sum(summary["requests"].values())
+    print(f"  上游请求 {requests_total} 次{_delta(requests_total, sum(base.get('requests', {}).values()))}，"
+          f"{summary['upstreamBytes'] / 1024:.0f} KB，"
+          + ", ".join(f"{h} {n}" for h, n in sorted(summary["requests"].items())))
+    print("  状态码 " + ", ".join(f"{s}: {n}" for s, n in sorted(summary["statuses"].items()))
+          + "；数据来源 " + (", ".join(f"{s} {n:g} 天" for s, n in sorted(summary["sources"].items())) or "-"))
+    print(f"  峰值 RSS {summary['maxRssKb'] / 1024:.1f} MB{_delta(summary['maxRssKb'], base.get('maxRssKb'))}"
+          + (f"，tracemalloc 峰值 {summary['tracemallocPeak'] / 1024 / 1024:.1f} MB"
+             if "tracemallocPeak" in summary else ""))
+
+
+def run(args: argparse.Namespace) -> Dict:
+    stub, base = _start_stub(args)
+    runs: List[Dict] = []
+    shared_dir = tempfile.mkdtemp(prefix="nba_bench_") if args.warm else None
+    try:
+        if shared_dir is not None:
+            _run_iteration(base, shared_dir, args)  # 预热，不计入结果
+        for i in range(args.iterations):
+            cache_dir = shared_dir or tempfile.mkdtemp(prefix="nba_bench_")
+            try:
+                runs.append(_run_iteration(base, cache_dir, args))
+            finally:
+                if shared_dir is None:
+                    shutil.rmtree(cache_dir, ignore_errors=True)
+            print(f"第 {i + 1}/{args.iterations} 轮: {runs[-1]['wall'] * 1000:.1f} ms", file=sys.stderr)
+    finally:
+        stub.terminate()
+        stub.wait()
+        if shared_dir is not None:
+            shutil.rmtree(shared_dir, ignore_errors=True)
+    summary = summarize(runs)
+    summary.update(scenario=args.scenario, warm=args.warm, env=args.env, latencyMs=args.latency_ms,
+                   errorRate=args.error_rate)
+    return summary
+
+
+def _record(args: argparse.Namespace) -> None:
+    import nba_scraper
+    from nba_bench_fixtures import record_scenario, save_scenario
+
+    def http_get(url: str):
+        resp = nba_scraper.http_get(url, timeout=20)
+        try:
+            return resp.status_code, resp.json()
+        except ValueError:
+            return resp.status_code, None
+
+    urls = {
+        "cdn_scoreboard": nba_scraper._cdn_scoreboard_url,
+        "cdn_boxscore": nba_scraper._cdn_boxscore_url,
+        "stats_scoreboard": nba_scraper._stats_scoreboard_url,
+        "stats_boxscore": nba_scraper._stats_boxscore_url,
+        "espn_scoreboard": nba_scraper._espn_scoreboard_url,
+    }
+    print(f"已保存 {save_scenario(record_scenario(args.name, http_get, urls), args.output)}")
+
+
+def _parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="NBA 抓取离线基准测试")
+    sub = parser.add_subparsers(dest="command")
+
+    p_run = sub.add_parser("run", help="跑基准测试（默认）")
+    p_run.add_argument("scenario", nargs="?", default="light", help="场景名或场景文件路径（默认 light）")
+    p_run.add_argument("-n", "--iterations", type=int, default=5)
+    p_run.add_argument("--warm", action="store_true", help="各轮共享缓存目录（先预热一轮），默认每轮冷启动")
+    p_run.add_argument("--latency-ms", type=float, default=20.0, help="上游基础延迟（默认 20ms）")
+    p_run.add_argument("--jitter-ms", type=float, default=10.0)
+    p_run.add_argument("--host-latency", action="append", default=[], metavar="HOST=MS")
+    p_run.add_argument("--error-rate", type=float, default=0.0)
+    p_run.add_argument("--seed", type=int, default=1)
+    p_run.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                       help="传给工作进程的环境变量，可重复（如 NBA_JSON_BACKEND=json）")
+    p_run.add_argument("--tracemalloc", action="store_true", help="额外统计 Python 堆峰值（会拖慢运行）")
+    p_run.add_argument("--timeout", type=float, default=300.0, help="单轮超时（秒）")
+    p_run.add_argument("--save", metavar="FILE", help="把汇总结果保存为 JSON")
+    p_run.add_argument("--baseline", metavar="FILE", help="与之前保存的结果对比")
+
+    p_gen = sub.add_parser("generate", help="重新生成内置场景")
+    p_gen.add_argument("names", nargs="*", help="默认全部")
+    p_gen.add_argument("--seed", type=int, default=20250115)
+
+    p_rec = sub.add_parser("record", help="录制今天前后的真实响应为场景文件（需要网络）")
+    p_rec.add_argument("name")
+    p_rec.add_argument("--output", help="默认 bench_fixtures/<name>.json.gz")
+
+    sub.add_parser("stub", help="只启动回放上游（参数同 nba_bench_stub.py）", add_help=False)
+
+    p_worker = sub.add_parser("_worker")
+    p_worker.add_argument("--tracemalloc", action="store_true")
+
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or argv[0] not in sub.choices and argv[0] not in ("-h", "--help"):
+        argv.insert(0, "run")
+    if argv[0] == "stub":
+        return argparse.Namespace(command="stub", stub_argv=argv[1:])
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = _parse_args(argv)
+    if args.command == "_worker":
+        _worker(args)
+    elif args.command == "stub":
+        import nba_bench_stub
+        nba_bench_stub.main(args.stub_argv)
+    elif args.command == "generate":
+        from nba_bench_fixtures import SCENARIOS, generate_scenario, save_scenario
+        for name in args.names or sorted(SCENARIOS):
+            print(f"已生成 {save_scenario(generate_scenario(name, args.seed))}")
+    elif args.command == "record":
+        _record(args)
+    else:
+        baseline = None
+        if args.baseline:
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+        summary = run(args)
+        print_report(summary, baseline)
+        if args.save:
+            with open(args.save, "w", encoding="utf-8") as f:
+                json.dump(summary, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基准测试用的本地上游（stub）
+回放一个场景（见 nba_bench_fixtures），可注入延迟和错误。
+爬虫设置 NBA_UPSTREAM_OVERRIDE=http://127.0.0.1:<port> 后，https://cdn.nba.com/a/b?c 会被请求为
+http://127.0.0.1:<port>/cdn.nba.com/a/b?c。
+
+管理接口（不计入请求统计）：
+    GET /__stats   {"requests": {host: n}, "statuses": {code: n}, "bytes": n}
+    GET /__reset   清零统计
+
+用法：
+    python scripts/nba_bench_stub.py heavy --port 8800 --latency-ms 40 --host-latency stats.nba.com=400 --error-rate 0.02
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from nba_bench_fixtures import NY_TZ, load_scenario
+
+
+def _strip_scheme(url: str) -> str:
+    parts = urlsplit(url)
+    return parts.netloc + parts.path + (f"?{parts.query}" if parts.query else "")
+
+
+def build_routes(scenario: Dict, today: Optional[datetime] = None) -> Dict[str, Tuple[int, bytes]]:
+    """把场景展开为 {host/path?query: (状态码, 响应体)}，日期对齐到 today（默认美东今天）"""
+    # URL 构造与爬虫保持一致
+    from nba_scraper import (_cdn_boxscore_url, _cdn_scoreboard_url, _espn_scoreboard_url, _stats_boxscore_url,
+                             _stats_scoreboard_url)
+
+    today = today or datetime.now(NY_TZ)
+    routes: Dict[str, Tuple[int, bytes]] = {}
+
+    def put(url: str, resp: Optional[Dict]) -> None:
+        if resp is None:
+            return
+        body = resp.get("body")
+        raw = json.dumps(body, ensure_ascii=False).encode("utf-8") if body is not None else b""
+        routes[_strip_scheme(url)] = (int(resp.get("status", 200)), raw)
+
+    for offset, day_data in scenario["days"].items():
+        day = today + timedelta(days=int(offset))
+        put(_cdn_scoreboard_url(day.strftime("%Y%m%d")), day_data.get("cdn"))
+        put(_stats_scoreboard_url(day.strftime("%m/%d/%Y")), day_data.get("stats"))
+        put(_espn_scoreboard_url(day.strftime("%Y%m%d")), day_data.get("espn"))
+    for gid, resp in scenario.get("cdnBoxscores", {}).items():
+        put(_cdn_boxscore_url(gid), resp)
+    for gid, resp in scenario.get("statsBoxscores", {}).items():
+        put(_stats_boxscore_url(gid), resp)
+    return routes
+
+
+class StubUpstream:
+    """
+    回放服务。
+    latency_ms / jitter_ms: 每个请求的基础延迟和随机抖动；host_latency_ms 按主机覆盖基础延迟
+    error_rate: 按该比例返回 503（随机种子固定，可复现）
+    """
+
+    def __init__(self, routes: Dict[str, Tuple[int, bytes]], latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 host_latency_ms: Optional[Dict[str, float]] = None, error_rate: float = 0.0, seed: int = 1):
+        self.routes = routes
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.host_latency_ms = host_latency_ms or {}
+        self.error_rate = error_rate
+        self._rnd = random.Random(seed)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.requests: Dict[str, int] = {}
+            self.statuses: Dict[str, int] = {}
+            self.bytes = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"requests": dict(self.requests), "statuses": dict(self.statuses), "bytes": self.bytes}
+
+    def respond(self, key: str) -> Tuple[int, bytes]:
+        host = key.split("/", 1)[0]
+        with self._lock:
+            delay = self.host_latency_ms.get(host, self.latency_ms) + self._rnd.uniform(0, self.jitter_ms)
+            inject_error = self._rnd.random() < self.error_rate
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+        status, body = (503, b"injected error") if inject_error else self.routes.get(key, (404, b"not found"))
+        with self._lock:
+            self.requests[host] = self.requests.get(host, 0) + 1
+            self.statuses[str(status)] = self.statuses.get(str(status), 0) + 1
+            self.bytes += len(body)
+        return status, body
+
+    def make_server(self, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self) -> None:
+                key = self.path.lstrip("/")
+                if key == "__stats":
+                    status, body = 200, json.dumps(stub.stats()).encode("utf-8")
+                elif key == "__reset":
+                    stub.reset()
+                    status, body = 200, b"{}"
+                else:
+                    status, body = stub.respond(key)
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args) -> None:
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        return server
+
+
+def _parse_host_latency(values) -> Dict[str, float]:
+    out: Dict[str, float] = {}
+    for v in values or []:
+        host, _, ms = v.partition("=")
+        out[host.strip()] = float(ms)
+    return out
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="基准测试用的本地上游（回放场景）")
+    parser.add_argument("scenario", help="场景名（bench_fixtures/ 下）或场景文件路径")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0, help="0 表示随机端口")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--host-latency", action="append", default=[], metavar="HOST=MS",
+                        help="按主机覆盖基础延迟，可重复，如 stats.nba.com=400")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 503 的比例（0~1）")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    stub = StubUpstream(build_routes(load_scenario(args.scenario)), args.latency_ms, args.jitter_ms,
+                        _parse_host_latency(args.host_latency), args.error_rate, args.seed)
+    server = stub.make_server(args.host, args.port)
+    # 第一行输出监听地址，供基准测试进程读取
+    print(f"http://{server.server_address[0]}:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"stub 统计: {stub.stats()}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CDN boxscore 解析：解码 + 投影到比赛构建用到的字段
+都是不依赖抓取器 / 身份注册表等进程内状态的纯函数，可以直接在子进程中运行。
+回填 / 回放等批量任务开启解析进程池（NBA_PARSE_WORKERS 或 --parse-workers）后，
+事件循环只负责抓取原始字节，解码、投影和数据王候选的筛选分摊到多个 CPU 核上，
+返回给主进程的只是每队几名球员的小字典。
+开启球员数据存储时，完赛比赛另外提取全部上场球员的单场数据（player_lines），供 nba_player_store 追加写入。
+"""
+
+import asyncio
+import multiprocessing
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+from zoneinfo import ZoneInfo
+
+import nba_json
+from nba_leaders import LeaderStat, TopK, cdn_player_played
+
+# 球员单场数据中保存的统计项（CDN statistics 键），顺序即列式存储中的列顺序
+PLAYER_LINE_STATS = (
+    "points", "reboundsTotal", "reboundsOffensive", "reboundsDefensive", "assists", "steals", "blocks",
+    "turnovers", "foulsPersonal", "fieldGoalsMade", "fieldGoalsAttempted", "threePointersMade",
+    "threePointersAttempted", "freeThrowsMade", "freeThrowsAttempted", "plusMinusPoints",
+)
+_MINUTES_RE = re.compile(r"PT(?:(\d+)M)?(?:(\d+)(?:\.\d+)?S)?")
+_NY_TZ = ZoneInfo("America/New_York")
+
+
+def to_int_or_none(v):
+    try:
+        if v is None:
+            return None
+        return int(v)
+    except Exception:
+        return None
+
+
+def extract_cdn_boxscore_game(data) -> Optional[Dict]:
+    """从 boxscore 响应中取出 game 对象（含 homeTeam/awayTeam/players 等）"""
+    data = data or {}
+    # 绝大多数情况下是 { game: {...} }
+    if isinstance(data, dict) and isinstance(data.get("game"), dict):
+        return data["game"]
+    # 兜底
+    return data if isinstance(data, dict) else None
+
+
+def project_cdn_boxscore_game(game: Dict, stats: Sequence[LeaderStat]) -> Dict:
+    """
+    boxscore 的 game 对象只保留比赛构建用到的字段：两队比分，以及球员的 personId、名字、是否上场和数据王统计项。
+    解码后立即投影，整份文档（全部统计项、每节比分、裁判、场馆等）随响应一起释放，
+    同一天的所有 boxscore 等待组装期间只占用投影后的小对象。
+    """
+    keys = [s.cdn_key for s in stats]
+    out: Dict = {}
+    for side in ("homeTeam", "awayTeam"):
+        team = game.get(side)
+        if not isinstance(team, dict):
+            continue
+        players = []
+        for p in team.get("players") or []:
+            st = p.get("statistics") or {}
+            players.append({
+                "personId": p.get("personId"), "firstName": p.get("firstName"), "familyName": p.get("familyName"),
+                "played": p.get("played", "1"), "statistics": {k: st.get(k) for k in keys},
+            })
+        out[side] = {"score": team.get("score"), "players": players}
+    return out
+
+
+def leader_candidates(players: List[Dict], stats: Sequence[LeaderStat]) -> List[Dict]:
+    """
+    只保留至少在一项统计上排第一的球员，保持原有顺序。
+    数值相同时 TopK 取先出现的球员，保序的子集上重新计算得到的数据王与全体球员上完全一致。
+    """
+    keys = [s.cdn_key for s in stats]
+    top = TopK(len(stats))
+    for i, p in enumerate(players):
+        if not cdn_player_played(p):
+            continue
+        st = p["statistics"]
+        top.offer([to_int_or_none(st.get(key)) for key in keys], i)
+    keep = {i for ranked in top.results() for _, i in ranked}
+    return [p for i, p in enumerate(players) if i in keep]
+
+
+def _played_seconds(value) -> int:
+    """上场时间 "PT34M12.00S" -> 2052 秒"""
+    m = _MINUTES_RE.fullmatch(str(value or ""))
+    if m is None:
+        return 0
+    return int(m.group(1) or 0) * 60 + int(m.group(2) or 0)
+
+
+def _et_date(game: Dict) -> Optional[int]:
+    """比赛的美东日期 YYYYMMDD（按开赛 UTC 时间换算）"""
+    utc_str = str(game.get("gameTimeUTC") or "")
+    try:
+        et = datetime.fromisoformat(utc_str.replace("Z", "+00:00")).astimezone(_NY_TZ)
+    except ValueError:
+        return None
+    return et.year * 10000 + et.month * 100 + et.day
+
+
+def player_lines(game: Dict) -> Optional[Dict]:
+    """
+    完赛比赛中所有上场球员的单场数据（未完赛或缺少开赛时间时返回 None）：
+    {"gameId", "date": YYYYMMDD, "rows": [(teamId, oppTeamId, home, personId, name, 上场秒数, *PLAYER_LINE_STATS)]}
+    """
+    if to_int_or_none(game.get("gameStatus")) != 3:
+        return None
+    date = _et_date(game)
+    home, away = game.get("homeTeam") or {}, game.get("awayTeam") or {}
+    if date is None or not home.get("teamId") or not away.get("teamId"):
+        return None
+    rows = []
+    for team, opp, is_home in ((home, away, 1), (away, home, 0)):
+        for p in team.get("players") or []:
+            if not cdn_player_played(p):
+                continue
+            st = p.get("statistics") or {}
+            name = f"{p.get('firstName', '')} {p.get('familyName', '')}".strip() or str(p.get("name") or "")
+            rows.append((int(team["teamId"]), int(opp["teamId"]), is_home, int(p.get("personId") or 0), name,
+                         _played_seconds(st.get("minutes")),
+                         *(to_int_or_none(st.get(k)) or 0 for k in PLAYER_LINE_STATS)))
+    return {"gameId": str(game.get("gameId") or ""), "date": date, "rows": rows}
+
+
+def parse_cdn_boxscore(body: bytes, stats: Sequence[LeaderStat], candidates_only: bool = False,
+                       with_lines: bool = False) -> Optional[Dict]:
+    """
+    解码 boxscore 响应体并投影；candidates_only 时每队只保留数据王候选（进程池返回给主进程的结果）。
+    with_lines 时完赛比赛的全部球员单场数据放在 "playerLines" 键中（见 player_lines）
+    """
+    game = extract_cdn_boxscore_game(nba_json.loads(body))
+    if game is None:
+        return None
+    projected = project_cdn_boxscore_game(game, stats)
+    if candidates_only:
+        for team in projected.values():
+            team["players"] = leader_candidates(team["players"], stats)
+    if with_lines:
+        lines = player_lines(game)
+        if lines is not None:
+            projected["playerLines"] = lines
+    return projected
+
+
+def parse_cdn_boxscores(batch: Sequence[Tuple[bytes, Sequence[LeaderStat], bool]]) -> List[Union[Dict, None, Exception]]:
+    """
+    进程池任务：一次解析一批 boxscore，摊薄每个任务的进程间通信开销。
+    单份解析失败时该位置返回异常（只影响这一场），不让整批失败
+    """
+    out: List[Union[Dict, None, Exception]] = []
+    for body, stats, with_lines in batch:
+        try:
+            out.append(parse_cdn_boxscore(body, stats, True, with_lines))
+        except Exception as e:
+            # 解码异常可能带着整份响应体，只传回消息
+            out.append(ValueError(f"{type(e).__name__}: {e}"))
+    return out
+
+
+def _pool_context():
+    # fork 出的子进程会继承主进程里其它线程持有的锁（SQLite、HTTP 连接池等），优先用 forkserver
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+class BoxscoreParsePool:
+    """
+    boxscore 解析进程池：事件循环把原始响应体交给子进程解码和投影，等待期间继续处理其它请求。
+    每个进程池任务的通信开销与解析一份 boxscore 相当，所以先攒批：凑满 batch_size 份或等待 linger 秒后
+    一起提交，主进程每份只花少量 CPU 在收发上。
+    进程池异常退出（如子进程被 OOM 杀掉）时回退到本进程解析，不影响结果。
+    """
+
+    def __init__(self, workers: int, batch_size: int = 16, linger: float = 0.005):
+        self.workers = workers
+        self.batch_size = max(1, batch_size)
+        self.linger = linger
+        self._executor = ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context())
+        self._pending: List[Tuple[bytes, Tuple[LeaderStat, ...], bool, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._broken = False
+        self.parsed = 0        # 在子进程中解析的份数
+        self.batches = 0       # 提交的批次数
+        self.fallbacks = 0     # 回退到本进程解析的份数
+
+    async def parse(self, body: bytes, stats: Sequence[LeaderStat], with_lines: bool = False) -> Optional[Dict]:
+        stats = tuple(stats)
+        if not self._broken:
+            loop = asyncio.get_running_loop()
+            fut = loop.create_future()
+            self._pending.append((body, stats, with_lines, fut))
+            if len(self._pending) >= self.batch_size:
+                self._flush()
+            elif self._flush_handle is None:
+                self._flush_handle = loop.call_later(self.linger, self._flush)
+            try:
+                return await fut
+            except BrokenProcessPool as e:
+                if not self._broken:
+                    self._broken = True
+                    print(f"解析进程池不可用，改为在本进程解析: {e}", file=sys.stderr)
+        self.fallbacks += 1
+        return parse_cdn_boxscore(body, stats, True, with_lines)
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        waiters = [item[-1] for item in batch]
+        try:
+            job = asyncio.wrap_future(self._executor.submit(parse_cdn_boxscores, [item[:-1] for item in batch]))
+        except BrokenProcessPool as e:
+            for fut in waiters:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        self.batches += 1
+
+        def deliver(job: asyncio.Future) -> None:
+            error = job.exception() if not job.cancelled() else asyncio.CancelledError()
+            if error is None:
+                self.parsed += len(waiters)
+            for i, fut in enumerate(waiters):
+                if fut.done():
+                    continue
+                result = error if error is not None else job.result()[i]
+                if isinstance(result, BaseException):
+                    fut.set_exception(result)
+                else:
+                    fut.set_result(result)
+
+        job.add_done_callback(deliver)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+比赛数据的版本化变更流
+每次抓取结果与上一次比较：任一比赛内容（比分、状态、球员数据等）变化时全局版本号 +1，
+并记录每场比赛最后变化时的版本号和内容哈希；从窗口中消失的比赛记为墓碑（tombstone）。
+消费方只需携带上次的版本号即可拿到增量；整体快照的 ETag 由纪元 + 版本号组成，
+判断“是否有变化”只需比较字符串，不必重新序列化整份数据。
+"""
+
+import hashlib
+import json
+import os
+import sys
+import uuid
+from typing import Dict, List, Optional
+
+import nba_json
+
+# 墓碑最多保留的版本跨度；更早的 since 无法精确给出删除列表，直接返回全量
+TOMBSTONE_RETENTION_VERSIONS = 1000
+
+
+def match_content_hash(m: Dict) -> str:
+    """单场比赛的内容哈希（键排序后序列化，与字段顺序无关）"""
+    return hashlib.blake2b(nba_json.dumps_bytes(m, sort_keys=True), digest_size=8).hexdigest()
+
+
+class ChangeFeed:
+    """
+    变更流状态：{gameId: (内容哈希, 最后变化版本)} + 墓碑 {gameId: 删除版本}。
+    epoch 在状态首次创建时随机生成，状态丢失重建后旧版本号自动失效。
+    """
+
+    def __init__(self, state_path: Optional[str] = None):
+        self.state_path = state_path
+        self.epoch = uuid.uuid4().hex[:12]
+        self.version = 0
+        self.entries: Dict[str, List] = {}
+        self.tombstones: Dict[str, int] = {}
+        self.matches: List[Dict] = []
+        self._load()
+
+    def _load(self) -> None:
+        if not self.state_path:
+            return
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.epoch = str(data["epoch"])
+            self.version = int(data["version"])
+            self.entries = {k: [str(v[0]), int(v[1])] for k, v in data["entries"].items()}
+            self.tombstones = {k: int(v) for k, v in data.get("tombstones", {}).items()}
+        except (OSError, ValueError, KeyError, TypeError, IndexError):
+            pass
+
+    def save(self) -> None:
+        if not self.state_path:
+            return
+        tmp = f"{self.state_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"epoch": self.epoch, "version": self.version,
+                           "entries": self.entries, "tombstones": self.tombstones}, f)
+            os.replace(tmp, self.state_path)
+        except OSError as e:
+            print(f"变更流状态保存失败: {e}", file=sys.stderr)
+
+    @property
+    def etag(self) -> str:
+        """整体快照的 ETag：内容不变则版本号不变"""
+        return f'"{self.epoch}-{self.version}"'
+
+    def apply(self, matches: List[Dict]) -> bool:
+        """合并一次完整抓取结果，有任何变化时版本号 +1，返回是否有变化"""
+        next_version = self.version + 1
+        changed = False
+        current_ids = set()
+        for m in matches:
+            gid = str(m.get("id") or "")
+            if not gid:
+                continue
+            current_ids.add(gid)
+            h = match_content_hash(m)
+            entry = self.entries.get(gid)
+            if entry is None or entry[0] != h:
+                self.entries[gid] = [h, next_version]
+                self.tombstones.pop(gid, None)
+                changed = True
+        for gid in [gid for gid in self.entries if gid not in current_ids]:
+            del self.entries[gid]
+            self.tombstones[gid] = next_version
+            changed = True
+        self.matches = matches
+        if changed:
+            self.version = next_version
+            oldest = self.version - TOMBSTONE_RETENTION_VERSIONS
+            self.tombstones = {k: v for k, v in self.tombstones.items() if v > oldest}
+        return changed
+
+    def changes_since(self, since: int, epoch: Optional[str] = None) -> Dict:
+        """
+        给出 since 版本之后的增量：changes 为内容变化的比赛，removed 为被删除的 gameId。
+        since 不可用（纪元不同、超出墓碑保留范围或大于当前版本）时 full=True，changes 为全量。
+        """
+        full = (
+            since <= 0
+            or since > self.version
+            or (epoch is not None and epoch != self.epoch)
+            or since < self.version - TOMBSTONE_RETENTION_VERSIONS
+        )
+        if full:
+            changes = list(self.matches)
+            removed: List[str] = []
+        else:
+            changes = [m for m in self.matches
+                       if (self.entries.get(str(m.get("id") or "")) or ("", 0))[1] > since]
+            removed = sorted(gid for gid, v in self.tombstones.items() if v > since)
+        return {
+            "epoch": self.epoch,
+            "version": self.version,
+            "since": since,
+            "full": full,
+            "etag": self.etag,
+            "changes": changes,
+            "removed": removed,
+            "count": len(changes),
+            "error": False,
+        }
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+NBA爬虫常驻模式
+在内存中保存最新的 {matches, count, error} 快照并在后台定时刷新，
+通过本地 HTTP（TCP 或 Unix domain socket）提供快照：
+读取方永远拿到内存中已序列化好的数据，不会等待 nba.com（stale-while-revalidate）。
+每次刷新成功后把快照持久化到磁盘，重启后立即可用。
+"""
+
+import asyncio
+import os
+import sys
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs
+
+import nba_json
+from nba_change_feed import ChangeFeed
+from nba_metrics import Metrics
+
+
+class Snapshot:
+    """一份已序列化的快照"""
+    __slots__ = ("body", "updated_at")
+
+    def __init__(self, body: bytes, updated_at: float):
+        self.body = body
+        self.updated_at = updated_at
+
+
+class SnapshotDaemon:
+    """
+    快照常驻服务。
+    refresh: 返回结果字典（与命令行输出相同的 {matches, count, error}）的协程函数
+    interval: 后台刷新间隔（秒）；快照超过该时长被视为过期，请求到来时会顺带触发一次后台刷新
+    snapshot_path: 快照持久化文件，None 表示不持久化
+    next_refresh_in: 可选，返回距下次需要刷新还有多少秒（None 表示无待刷新资源），用于提前唤醒后台刷新
+    change_feed: 可选，版本化变更流；提供 ETag/304 和 /changes?since=N 增量接口，内容未变时跳过重新序列化
+    metrics: 可选，指标注册表；提供 /metrics（Prometheus 文本格式，?format=json 为 JSON），并记录快照序列化耗时
+    """
+
+    def __init__(self, refresh: Callable[[], Awaitable[Dict]], interval: float, snapshot_path: Optional[str] = None,
+                 next_refresh_in: Optional[Callable[[], Optional[float]]] = None,
+                 change_feed: Optional[ChangeFeed] = None, metrics: Optional[Metrics] = None):
+        self.refresh = refresh
+        self.interval = max(1.0, interval)
+        self.snapshot_path = snapshot_path
+        self.next_refresh_in = next_refresh_in
+        self.change_feed = change_feed
+        self.metrics = metrics
+        self.snapshot: Optional[Snapshot] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    # ---- 快照 ----
+
+    def load_persisted(self) -> None:
+        """启动时读取上次持久化的快照"""
+        if not self.snapshot_path:
+            return
+        try:
+            with open(self.snapshot_path, "rb") as f:
+                body = f.read()
+            nba_json.loads(body)
+            self.snapshot = Snapshot(body, os.path.getmtime(self.snapshot_path))
+            print(f"已加载持久化快照: {self.snapshot_path}", file=sys.stderr)
+        except (OSError, ValueError):
+            pass
+
+    def _persist(self, body: bytes) -> None:
+        if not self.snapshot_path:
+            return
+        tmp = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.snapshot_path) or ".", exist_ok=True)
+            with open(tmp, "wb") as f:
+                f.write(body)
+            os.replace(tmp, self.snapshot_path)
+        except OSError as e:
+            print(f"快照持久化失败: {e}", file=sys.stderr)
+
+    async def refresh_once(self) -> None:
+        """执行一次刷新；失败或出错时保留旧快照继续提供服务"""
+        started = time.monotonic()
+        try:
+            result = await self.refresh()
+        except Exception as e:
+            print(f"快照刷新失败，继续使用旧快照: {e}", file=sys.stderr)
+            return
+        if result.get("error") and self.snapshot is not None:
+            print("快照刷新返回错误，继续使用旧快照", file=sys.stderr)
+            return
+        feed = self.change_feed
+        if feed is not None and not result.get("error"):
+            changed = feed.apply(result.get("matches") or [])
+            if changed:
+                feed.save()
+            elif self.snapshot is not None:
+                # 内容未变：只更新时间，不重新序列化/持久化
+                self.snapshot.updated_at = time.time()
+                return
+        if self.metrics is not None:
+            with self.metrics.stage("serialize"):
+                body = nba_json.dumps_bytes(result)
+        else:
+            body = nba_json.dumps_bytes(result)
+        self.snapshot = Snapshot(body, time.time())
+        self._persist(body)
+        print(
+            f"快照已刷新: {result.get('count', 0)} 场比赛, 耗时 {time.monotonic() - started:.2f}s", file=sys.stderr)
+
+    def trigger_refresh(self) -> None:
+        """后台触发刷新（已有刷新在进行时不重复触发）"""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.ensure_future(self.refresh_once())
+
+    def _sleep_seconds(self) -> float:
+        delay = self.interval
+        if self.next_refresh_in is not None:
+            due_in = self.next_refresh_in()
+            if due_in is not None:
+                delay = min(delay, due_in)
+        return max(1.0, delay)
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            self.trigger_refresh()
+            await asyncio.shield(self._refresh_task)
+            await asyncio.sleep(self._sleep_seconds())
+
+    # ---- HTTP ----
+
+    def _changes_response(self, query: str) -> Tuple[int, Dict[str, str], bytes]:
+        feed = self.change_feed
+        if feed is None:
+            return 404, {"Content-Type": "application/json; charset=utf-8"}, b'{"error": true, "message": "change feed disabled"}'
+        params = parse_qs(query)
+        try:
+            since = int((params.get("since") or ["0"])[0])
+        except ValueError:
+            since = 0
+        epoch = (params.get("epoch") or [None])[0]
+        body = nba_json.dumps_bytes(feed.changes_since(since, epoch))
+        return 200, {"Content-Type": "application/json; charset=utf-8", "ETag": feed.etag}, body
+
+    def _metrics_response(self, query: str) -> Tuple[int, Dict[str, str], bytes]:
+        if self.metrics is None:
+            return 404, {"Content-Type": "application/json; charset=utf-8"}, b'{"error": true, "message": "metrics disabled"}'
+        if (parse_qs(query).get("format") or [""])[0] == "json":
+            return 200, {"Content-Type": "application/json; charset=utf-8"}, nba_json.dumps_bytes(self.metrics.snapshot())
+        return 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}, self.metrics.prometheus().encode("utf-8")
+
+    def _response(self, target: str, if_none_match: Optional[str] = None) -> Tuple[int, Dict[str, str], bytes]:
+        path, _, query = target.partition("?")
+        if path in ("/healthz", "/health"):
+            return 200, {"Content-Type": "text/plain; charset=utf-8"}, b"ok"
+        if path == "/changes":
+            return self._changes_response(query)
+        if path == "/metrics":
+            return self._metrics_response(query)
+        if path not in ("/", "/snapshot", "/matches"):
+            return 404, {"Content-Type": "application/json; charset=utf-8"}, b'{"error": true, "message": "not found"}'
+
+        snap = self.snapshot
+        if snap is None:
+            # 还没有任何快照（首次启动且无持久化文件）：不阻塞，告知稍后重试
+            self.trigger_refresh()
+            body = nba_json.dumps_bytes(
+                {"matches": [], "count": 0, "error": True, "message": "快照尚未就绪，请稍后重试"})
+            return 503, {"Content-Type": "application/json; charset=utf-8", "Retry-After": "1"}, body
+
+        age = max(0.0, time.time() - snap.updated_at)
+        if age > self.interval:
+            # stale-while-revalidate：先返回旧快照，同时后台刷新
+            self.trigger_refresh()
+        headers = {
+            "Content-Type": "application/json; charset=utf-8",
+            "Cache-Control": f"max-age={int(self.interval)}, stale-while-revalidate={int(self.interval * 10)}",
+            "Age": str(int(age)),
+            "X-Snapshot-Updated-At": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(snap.updated_at)),
+        }
+        if self.change_feed is not None and self.change_feed.version > 0:
+            etag = self.change_feed.etag
+            headers["ETag"] = etag
+            # 内容未变：只比较 ETag，返回 304 不传输数据
+            if if_none_match and etag in [t.strip() for t in if_none_match.split(",")]:
+                return 304, headers, b""
+        return 200, headers, snap.body
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                parts = request_line.decode("latin-1").split()
+                keep_alive = len(parts) >= 3 and parts[2].upper() == "HTTP/1.1"
+                if_none_match = None
+                # 读完请求头（忽略请求体，只支持 GET/HEAD）
+                while True:
+                    line = await reader.readline()
+                    if not line or line in (b"\r\n", b"\n"):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    name = name.strip().lower()
+                    if name == "connection":
+                        keep_alive = value.strip().lower() != "close" and keep_alive
+                    elif name == "if-none-match":
+                        if_none_match = value.strip()
+                if len(parts) < 2 or parts[0] not in ("GET", "HEAD"):
+                    status, headers, body = 405, {"Allow": "GET, HEAD"}, b""
+                else:
+                    status, headers, body = self._response(parts[1], if_none_match)
+                reason = {200: "OK", 304: "Not Modified", 404: "Not Found", 405: "Method Not Allowed",
+                          503: "Service Unavailable"}.get(status, "OK")
+                head = [f"HTTP/1.1 {status} {reason}", f"Content-Length: {len(body)}",
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+                head.extend(f"{k}: {v}" for k, v in headers.items())
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode("utf-8"))
+                if parts and parts[0] != "HEAD":
+                    writer.write(body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8787, unix_path: Optional[str] = None) -> None:
+        """启动后台刷新并提供 HTTP 服务，直到进程退出"""
+        self.load_persisted()
+        refresher = asyncio.ensure_future(self._refresh_loop())
+        if unix_path:
+            if os.path.exists(unix_path):
+                os.remove(unix_path)
+            server = await asyncio.start_unix_server(self._handle, path=unix_path)
+            print(f"快照服务已启动: unix:{unix_path}", file=sys.stderr)
+        else:
+            server = await asyncio.start_server(self._handle, host=host, port=port)
+            print(f"快照服务已启动: http://{host}:{port}/snapshot", file=sys.stderr)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            refresher.cancel()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+比赛与数据王写入平台数据库（NbaMatch / NbaMatchLeader，见 apps/web/prisma/schema.prisma）
+- 每场比赛带内容哈希（与变更流相同，nba_change_feed.match_content_hash）；先一次查询库中的哈希，
+  只有内容变化（或新出现）的比赛才写入，未变化的比赛不产生任何写操作
+- 变化的比赛在一个事务内用多行 upsert 写入，数据王整场先删后插，
+  一轮定时抓取只需 查询 + BEGIN + upsert + 删除 + 插入 + COMMIT 几次往返
+- 本进程内记住已写入的哈希，常驻模式下内容未变的刷新连查询也省掉
+连接串：mysql://用户:密码@主机:端口/数据库名（与平台的 DATABASE_URL 相同，需要 pymysql），
+本地测试可以用 SQLite 代替：sqlite:///相对路径 或 sqlite:////绝对路径。
+"""
+
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+try:
+    import pymysql
+except ImportError:  # 可选依赖：只有写入 MySQL 时需要
+    pymysql = None
+
+from nba_change_feed import match_content_hash
+from nba_model import MATCH_FIELDS, PlayerLine, line_from_dict
+
+MATCH_TABLE = "NbaMatch"
+LEADER_TABLE = "NbaMatchLeader"
+MATCH_COLUMNS = MATCH_FIELDS + ("contentHash", "updatedAt")
+LEADER_COLUMNS = ("matchId", "field", "name", "avatar", "stat", "value")
+# 每条多行语句最多的行数；SQLite 另受绑定参数上限（旧版本 999）限制
+DEFAULT_BATCH_ROWS = 200
+SQLITE_MAX_PARAMS = 999
+
+DB_ERRORS: Tuple[type, ...] = (sqlite3.Error,) + ((pymysql.MySQLError,) if pymysql is not None else ())
+
+_SQLITE_DDL = (
+    f"CREATE TABLE IF NOT EXISTS `{MATCH_TABLE}` ("
+    " `id` TEXT PRIMARY KEY, `homeTeam` TEXT NOT NULL, `awayTeam` TEXT NOT NULL,"
+    " `homeTeamId` INTEGER, `awayTeamId` INTEGER, `homeScore` INTEGER, `awayScore` INTEGER,"
+    " `status` TEXT NOT NULL, `date` TEXT NOT NULL, `time` TEXT NOT NULL, `league` TEXT NOT NULL,"
+    " `venue` TEXT NOT NULL, `contentHash` TEXT NOT NULL, `updatedAt` TEXT NOT NULL)",
+    f"CREATE TABLE IF NOT EXISTS `{LEADER_TABLE}` ("
+    " `matchId` TEXT NOT NULL, `field` TEXT NOT NULL, `name` TEXT NOT NULL, `avatar` TEXT,"
+    " `stat` TEXT NOT NULL, `value` INTEGER, PRIMARY KEY (`matchId`, `field`))",
+)
+# 与 prisma db push 生成的表结构一致（表已由 Prisma 创建时不做任何改动）
+_MYSQL_DDL = (
+    f"CREATE TABLE IF NOT EXISTS `{MATCH_TABLE}` ("
+    " `id` VARCHAR(191) NOT NULL, `homeTeam` VARCHAR(191) NOT NULL, `awayTeam` VARCHAR(191) NOT NULL,"
+    " `homeTeamId` INTEGER NULL, `awayTeamId` INTEGER NULL, `homeScore` INTEGER NULL, `awayScore` INTEGER NULL,"
+    " `status` VARCHAR(191) NOT NULL, `date` VARCHAR(191) NOT NULL, `time` VARCHAR(191) NOT NULL,"
+    " `league` VARCHAR(191) NOT NULL, `venue` VARCHAR(191) NOT NULL, `contentHash` VARCHAR(191) NOT NULL,"
+    " `updatedAt` DATETIME(3) NOT NULL,"
+    " INDEX `NbaMatch_date_idx`(`date`), INDEX `NbaMatch_status_idx`(`status`), PRIMARY KEY (`id`)"
+    ") DEFAULT CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci",
+    f"CREATE TABLE IF NOT EXISTS `{LEADER_TABLE}` ("
+    " `matchId` VARCHAR(191) NOT NULL, `field` VARCHAR(191) NOT NULL, `name` VARCHAR(191) NOT NULL,"
+    " `avatar` VARCHAR(191) NULL, `stat` VARCHAR(191) NOT NULL, `value` INTEGER NULL,"
+    " INDEX `NbaMatchLeader_matchId_idx`(`matchId`), PRIMARY KEY (`matchId`, `field`)"
+    ") DEFAULT CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci",
+)
+
+
+def _connect(url: str):
+    """按连接串打开自动提交模式的连接，返回 (连接, 方言)；事务用显式的 BEGIN / COMMIT"""
+    parts = urlsplit(url)
+    if parts.scheme == "sqlite":
+        path = unquote(parts.path[1:])
+        conn = sqlite3.connect(path or ":memory:", isolation_level=None, check_same_thread=False, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn, "sqlite"
+    if parts.scheme != "mysql":
+        raise ValueError(f"不支持的数据库连接串（mysql:// 或 sqlite:///）: {parts.scheme}://")
+    if pymysql is None:
+        raise RuntimeError("写入 MySQL 需要 pymysql（pip install pymysql）")
+    query = {k.lower(): v[-1] for k, v in parse_qs(parts.query).items()}
+    ssl = None
+    # Prisma / TiDB Cloud 的连接串用 sslaccept=strict 要求 TLS
+    if query.get("sslaccept") == "strict" or query.get("ssl-mode", "").upper() in ("REQUIRED", "VERIFY_IDENTITY"):
+        import ssl as ssl_module
+        ssl = ssl_module.create_default_context()
+    conn = pymysql.connect(
+        host=parts.hostname or "localhost", port=parts.port or 3306,
+        user=unquote(parts.username or ""), password=unquote(parts.password or ""),
+        database=unquote(parts.path.lstrip("/")), charset="utf8mb4", autocommit=True, ssl=ssl)
+    return conn, "mysql"
+
+
+def _leader_rows(match_id: str, m) -> List[Tuple]:
+    rows = []
+    for field in m.keys():
+        if field in MATCH_FIELDS:
+            continue
+        line = m.get(field)
+        if isinstance(line, dict):
+            line = line_from_dict(line)
+        if not isinstance(line, PlayerLine):
+            continue
+        rows.append((match_id, field, line.name, line.get("avatar"), line.stat, line.value))
+    return rows
+
+
+class MatchSink:
+    """
+    比赛写入器（线程安全）。write(matches) 只写入内容变化的比赛，返回本次的
+    {"written", "unchanged", "roundTrips"}；数据库异常原样抛出（DB_ERRORS），事务回滚。
+    """
+
+    def __init__(self, url: str, batch_rows: int = DEFAULT_BATCH_ROWS):
+        self.url = url
+        self.batch_rows = max(1, batch_rows)
+        self._lock = threading.Lock()
+        self._conn = None
+        self._dialect = ""
+        # 本进程内已确认与库中一致的 {gameId: 内容哈希}
+        self._hashes: Dict[str, str] = {}
+        self.written = 0
+        self.unchanged = 0
+        self.round_trips = 0
+        self._open()
+
+    def _open(self) -> None:
+        self._conn, self._dialect = _connect(self.url)
+        cur = self._conn.cursor()
+        for ddl in (_MYSQL_DDL if self._dialect == "mysql" else _SQLITE_DDL):
+            cur.execute(ddl)
+        self.round_trips += 2
+
+    def _execute(self, cur, sql: str, params: Sequence[Any] = ()) -> None:
+        if self._dialect == "mysql":
+            sql = sql.replace("?", "%s")
+        cur.execute(sql, params)
+        self.round_trips += 1
+
+    def _chunks(self, rows: List[Tuple], width: int) -> Iterable[List[Tuple]]:
+        size = self.batch_rows
+        if self._dialect == "sqlite":
+            size = min(size, SQLITE_MAX_PARAMS // width)
+        for i in range(0, len(rows), size):
+            yield rows[i:i + size]
+
+    def _stored_hashes(self, cur, ids: List[str]) -> Dict[str, str]:
+        found: Dict[str, str] = {}
+        for chunk in self._chunks([(i,) for i in ids], 1):
+            self._execute(cur, f"SELECT `id`, `contentHash` FROM `{MATCH_TABLE}` WHERE `id` IN "
+                               f"({', '.join('?' * len(chunk))})", [i for i, in chunk])
+            found.update((str(r[0]), str(r[1])) for r in cur.fetchall())
+        return found
+
+    def _upsert_sql(self, table: str, columns: Sequence[str], keys: Sequence[str], rows: int) -> str:
+        cols = ", ".join(f"`{c}`" for c in columns)
+        values = ", ".join([f"({', '.join('?' * len(columns))})"] * rows)
+        updates = [c for c in columns if c not in keys]
+        if self._dialect == "mysql":
+            tail = "ON DUPLICATE KEY UPDATE " + ", ".join(f"`{c}` = VALUES(`{c}`)" for c in updates)
+        else:
+            tail = (f"ON CONFLICT ({', '.join(f'`{k}`' for k in keys)}) DO UPDATE SET "
+                    + ", ".join(f"`{c}` = excluded.`{c}`" for c in updates))
+        return f"INSERT INTO `{table}` ({cols}) VALUES {values} {tail}"
+
+    def write(self, matches: Iterable) -> Dict[str, int]:
+        with self._lock:
+            if self._conn is None:
+                self._open()
+            start_trips = self.round_trips
+            current: Dict[str, Tuple] = {}
+            for m in matches:
+                mid = str(m.get("id") or "")
+                if mid:
+                    current[mid] = (m, match_content_hash(m))
+            pending = [mid for mid, (_, h) in current.items() if self._hashes.get(mid) != h]
+            cur = self._conn.cursor()
+            try:
+                stored = self._stored_hashes(cur, pending) if pending else {}
+                changed = [mid for mid in pending if stored.get(mid) != current[mid][1]]
+                self._hashes.update((mid, h) for mid, h in stored.items() if h == current[mid][1])
+                if changed:
+                    self._write_changed(cur, changed, current)
+            except DB_ERRORS:
+                self._abort()
+                raise
+            for mid in changed:
+                self._hashes[mid] = current[mid][1]
+            result = {"written": len(changed), "unchanged": len(current) - len(changed),
+                      "roundTrips": self.round_trips - start_trips}
+            self.written += result["written"]
+            self.unchanged += result["unchanged"]
+            return result
+
+    def _write_changed(self, cur, changed: List[str], current: Dict[str, Tuple]) -> None:
+        now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+        match_rows, leader_rows = [], []
+        for mid in changed:
+            m, content_hash = current[mid]
+            match_rows.append((mid, *(m.get(k) for k in MATCH_FIELDS[1:]), content_hash, now))
+            leader_rows.extend(_leader_rows(mid, m))
+        self._execute(cur, "BEGIN")
+        for chunk in self._chunks(match_rows, len(MATCH_COLUMNS)):
+            self._execute(cur, self._upsert_sql(MATCH_TABLE, MATCH_COLUMNS, ("id",), len(chunk)),
+                          [v for row in chunk for v in row])
+        # 数据王字段随来源 / 统计项配置变化，整场替换
+        for chunk in self._chunks([(mid,) for mid in changed], 1):
+            self._execute(cur, f"DELETE FROM `{LEADER_TABLE}` WHERE `matchId` IN ({', '.join('?' * len(chunk))})",
+                          [mid for mid, in chunk])
+        for chunk in self._chunks(leader_rows, len(LEADER_COLUMNS)):
+            cols = ", ".join(f"`{c}`" for c in LEADER_COLUMNS)
+            values = ", ".join([f"({', '.join('?' * len(LEADER_COLUMNS))})"] * len(chunk))
+            self._execute(cur, f"INSERT INTO `{LEADER_TABLE}` ({cols}) VALUES {values}",
+                          [v for row in chunk for v in row])
+        self._execute(cur, "COMMIT")
+
+    def _abort(self) -> None:
+        # 回滚失败（如连接已断开）时丢弃连接，下次写入重新连接
+        try:
+            self._conn.cursor().execute("ROLLBACK")
+        except DB_ERRORS:
+            self.close()
+
+    def close(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            try:
+                conn.close()
+            except DB_ERRORS:
+                pass
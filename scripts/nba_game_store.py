@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+已完赛比赛的本地持久化存储（SQLite）
+比赛进入 gameStatus == 3 后，比分和六项球员数据不再变化，
+按 gameId 保存最终的比赛数据；整天全部完赛时再记录当天的比赛列表，
+之后的运行直接从本地返回，不再发起任何网络请求。
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import nba_json
+from nba_leaders import configured_leader_fields
+from nba_model import MATCH_FIELDS, Match, match_from_dict
+
+LEADER_KEYS = ("homeTopScorer", "homeTopRebounder", "homeTopAssister",
+               "awayTopScorer", "awayTopRebounder", "awayTopAssister")
+
+
+def leader_layout(m: Dict) -> Tuple[str, ...]:
+    """比赛数据中的数据王字段（按顺序）"""
+    if isinstance(m, Match):
+        return m.leader_fields
+    return tuple(k for k in m if k not in MATCH_FIELDS)
+
+
+def is_final_match(m: Dict) -> bool:
+    """
+    比赛数据是否已定型：已完赛、比分齐全、数据王字段与当前配置（NBA_EXTRA_LEADER_STATS）一致且全部齐全。
+    配置改变后，按旧布局保存的比赛不再算定型，会重新抓取并覆盖
+    """
+    fields = configured_leader_fields()
+    return (
+        m.get("status") == "finished"
+        and m.get("homeScore") is not None
+        and m.get("awayScore") is not None
+        and leader_layout(m) == fields
+        and all(m.get(k) for k in fields)
+    )
+
+
+class FinishedGameStore:
+    """按 gameId / 日期(YYYYMMDD) 保存已定型比赛数据的 SQLite 存储（线程安全）"""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS finished_games ("
+                " game_id TEXT PRIMARY KEY,"
+                " day TEXT NOT NULL,"
+                " match_json TEXT NOT NULL,"
+                " stored_at REAL NOT NULL)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS finished_days ("
+                " day TEXT PRIMARY KEY,"
+                " game_ids TEXT NOT NULL,"
+                " stored_at REAL NOT NULL)")
+
+    def get_many(self, game_ids: Iterable[str]) -> Dict[str, Dict]:
+        """批量读取已定型的比赛，返回 {gameId: match}；数据王布局与当前配置不符的不返回"""
+        ids = [gid for gid in dict.fromkeys(game_ids) if gid]
+        if not ids:
+            return {}
+        out: Dict[str, Dict] = {}
+        with self._lock:
+            # SQLite 默认最多 999 个参数，分批查询
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT game_id, match_json FROM finished_games WHERE game_id IN ({','.join('?' * len(chunk))})",
+                    chunk).fetchall()
+                for gid, match_json in rows:
+                    m = match_from_dict(nba_json.loads(match_json))
+                    if is_final_match(m):
+                        out[gid] = m
+        return out
+
+    def put_many(self, day: str, matches: Iterable[Dict]) -> int:
+        """保存已定型的比赛（未定型的自动跳过），返回写入条数"""
+        now = time.time()
+        rows = [(str(m["id"]), day, nba_json.dumps(m), now)
+                for m in matches if m.get("id") and is_final_match(m)]
+        if not rows:
+            return 0
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO finished_games (game_id, day, match_json, stored_at) VALUES (?, ?, ?, ?)",
+                rows)
+        return len(rows)
+
+    def get_day(self, day: str) -> Optional[List[Dict]]:
+        """读取整天已完赛的比赛列表（保持原赛程顺序），当天未完全定型（含布局与当前配置不符）时返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT game_ids FROM finished_days WHERE day = ?", (day,)).fetchone()
+        if not row:
+            return None
+        game_ids = json.loads(row[0])
+        stored = self.get_many(game_ids)
+        if len(stored) != len(set(game_ids)):
+            return None
+        return [stored[gid] for gid in game_ids]
+
+    def put_day(self, day: str, game_ids: List[str]) -> None:
+        """记录整天已全部定型（game_ids 为原赛程顺序）"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO finished_days (day, game_ids, stored_at) VALUES (?, ?, ?)",
+                (day, json.dumps(game_ids), time.time()))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
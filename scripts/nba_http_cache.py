@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+NBA爬虫的磁盘HTTP缓存
+保存响应体和校验器（ETag / Last-Modified），下次请求带上
+If-None-Match / If-Modified-Since，命中 304 时直接使用本地缓存的响应体。
+缓存总大小有上限，超出时按最近访问时间（LRU）淘汰到上限的 EVICT_TO 比例。
+"""
+
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Tuple
+
+# 淘汰时删到总大小上限的这个比例，留出余量，避免接近上限时每次写入都触发淘汰
+EVICT_TO = 0.9
+
+
+class CacheEntry(NamedTuple):
+    """一条缓存记录"""
+    url: str
+    body: bytes
+    headers: Dict[str, str]
+    etag: Optional[str]
+    last_modified: Optional[str]
+
+
+def _header(headers: Dict[str, str], name: str) -> Optional[str]:
+    """大小写不敏感地读取响应头"""
+    lower = name.lower()
+    for k, v in headers.items():
+        if k.lower() == lower:
+            return v
+    return None
+
+
+class HttpCache:
+    """
+    基于文件的条件请求缓存（方法都是阻塞的文件 I/O，事件循环中经 asyncio.to_thread 调用）。
+    每个 URL 对应一个 <sha1>.entry 文件：第一行是 JSON 元数据（URL、校验器、响应头、响应体大小），其后是响应体；
+    校验器和响应体在同一个文件里，经临时文件 + os.replace 整体替换，多进程并发时不会拿到新校验器配旧响应体。
+    文件的 mtime 即最近访问时间，用于 LRU 淘汰。
+    本进程在内存中维护 {文件路径: 大小} 的 LRU 索引和总大小（首次写入时扫描一次目录建立），
+    写入只做 O(1) 的记账；总大小超过上限时才重新扫描目录（计入其他进程写入的文件）并淘汰。
+    """
+
+    def __init__(self, directory: str, max_bytes: int, url_prefixes: Tuple[str, ...] = ()):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.url_prefixes = url_prefixes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # 缓存文件路径 -> 大小，按最近访问从旧到新排列；None 表示尚未扫描目录
+        self._index: Optional["OrderedDict[str, int]"] = None
+        self._total = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def accepts(self, url: str) -> bool:
+        """只缓存指定前缀下的 URL（为空则全部缓存）"""
+        return not self.url_prefixes or url.startswith(self.url_prefixes)
+
+    def _path(self, url: str) -> str:
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, key + ".entry")
+
+    def load(self, url: str) -> Optional[CacheEntry]:
+        """读取缓存记录，不存在、损坏或不完整时返回 None"""
+        try:
+            with open(self._path(url), "rb") as f:
+                meta = json.loads(f.readline())
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        if meta.get("url") != url or meta.get("size") != len(body):
+            return None
+        return CacheEntry(url, body, meta.get("headers") or {}, meta.get("etag"), meta.get("lastModified"))
+
+    @staticmethod
+    def conditional_headers(entry: Optional[CacheEntry]) -> Dict[str, str]:
+        """根据缓存记录生成条件请求头"""
+        headers: Dict[str, str] = {}
+        if entry is None:
+            return headers
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def touch(self, url: str) -> None:
+        """304 命中：刷新访问时间（LRU）"""
+        path = self._path(url)
+        now = time.time()
+        try:
+            os.utime(path, (now, now))
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+            if self._index is not None and path in self._index:
+                self._index.move_to_end(path)
+
+    def store(self, url: str, body: bytes, headers: Dict[str, str]) -> None:
+        """保存 200 响应；没有任何校验器的响应无法做条件请求，不缓存"""
+        with self._lock:
+            self.misses += 1
+        etag = _header(headers, "ETag")
+        last_modified = _header(headers, "Last-Modified")
+        if not etag and not last_modified:
+            return
+        if len(body) > self.max_bytes:
+            return
+        path = self._path(url)
+        # 响应体已由 HTTP 客户端解压，不再保存 Content-Encoding/Content-Length
+        kept_headers = {k: v for k, v in headers.items() if k.lower() not in (
+            "content-encoding", "content-length", "transfer-encoding")}
+        meta = {"url": url, "etag": etag, "lastModified": last_modified,
+                "headers": kept_headers, "size": len(body)}
+        # 紧凑 JSON 中的换行都已转义，元数据恰好占第一行
+        data = json.dumps(meta, ensure_ascii=False).encode("utf-8") + b"\n" + body
+        try:
+            self._atomic_write(path, data)
+        except OSError as e:
+            print(f"HTTP缓存写入失败: {e}", file=sys.stderr)
+            return
+        with self._lock:
+            if self._index is None:
+                self._scan()
+            else:
+                self._total += len(data) - self._index.pop(path, 0)
+                self._index[path] = len(data)
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def _atomic_write(self, path: str, data: bytes) -> None:
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def _scan(self) -> None:
+        """扫描目录重建 LRU 索引（按 mtime 从旧到新），调用方持有 _lock"""
+        entries = []
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            names = []
+        for name in names:
+            path = os.path.join(self.directory, name)
+            if name.endswith((".body", ".meta")):
+                # 旧版本分开保存的响应体 / 元数据，不再读取
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            if not name.endswith(".entry"):
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, path, st.st_size))
+        entries.sort()
+        self._index = OrderedDict((path, size) for _, path, size in entries)
+        self._total = sum(self._index.values())
+
+    def _evict(self) -> None:
+        """总大小超过上限时，重新扫描目录，按 mtime 从旧到新淘汰到上限的 EVICT_TO；调用方持有 _lock"""
+        self._scan()
+        target = self.max_bytes * EVICT_TO
+        while self._index and self._total > target:
+            path, size = self._index.popitem(last=False)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            self._total -= size
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+球队 / 球员身份注册表
+启动时构建一次并持久化到磁盘，所有路径都通过字典 O(1) 查询：
+- 球队：teamId、三字母缩写、英文名（含别名）-> 中文名；未知写法只做一次模糊匹配，结果记入别名表
+- 球员：NBA personId -> 显示名，ESPN athlete id -> 显示名 / 头像 URL；
+  头像只由 id 决定、与注册表里已经学到的内容无关：CDN / stats.nba.com 来源的数据王总是用 personId 的
+  NBA 官方头像，ESPN 来源的数据王用该 athlete 的 ESPN 头像。两套 id 之间不按显示名关联（同名球员会被合并），
+  同一场比赛的输出不会因为注册表状态变化而改变（变更流哈希、数据库写入保持稳定）
+"""
+
+import json
+import os
+import sys
+from typing import Dict, Iterable, Optional, Tuple
+
+NBA_HEADSHOT_URL = "https://cdn.nba.com/headshots/nba/latest/1040x760/{person_id}.png"
+ESPN_HEADSHOT_URL = "https://a.espncdn.com/i/headshots/nba/players/full/{athlete_id}.png"
+
+
+class IdentityRegistry:
+    """
+    teams: [(teamId, 三字母缩写, 中文名), ...]
+    team_names: {英文名: 中文名}（同一球队可以有多个英文写法）
+    state_path 不为 None 时持久化学到的球队别名和球员信息。
+    """
+
+    def __init__(self, teams: Iterable[Tuple[int, str, str]], team_names: Dict[str, str],
+                 state_path: Optional[str] = None):
+        self.state_path = state_path
+        self.team_by_id: Dict[int, str] = {}
+        self.team_by_tricode: Dict[str, str] = {}
+        for team_id, tricode, chinese in teams:
+            self.team_by_id[int(team_id)] = chinese
+            self.team_by_tricode[tricode.upper()] = chinese
+        self.team_names = dict(team_names)
+        # 模糊匹配过的英文写法 -> 中文名（"" 表示没有匹配）
+        self.team_aliases: Dict[str, str] = {}
+        # NBA personId -> 显示名
+        self.players: Dict[str, str] = {}
+        # ESPN athlete id -> (显示名, 头像 URL)
+        self.espn_players: Dict[str, Tuple[str, str]] = {}
+        self.dirty = False
+        self._load()
+
+    # ---- 持久化 ----
+
+    def _load(self) -> None:
+        if not self.state_path:
+            return
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.team_aliases = {str(k): str(v) for k, v in data.get("teamAliases", {}).items()}
+            for pid, name in data.get("players", {}).items():
+                # 旧格式为 [名字, ESPN id, 头像]，按名字关联的 ESPN 信息不再使用
+                if isinstance(name, list):
+                    name = name[0]
+                if name:
+                    self.players[str(pid)] = str(name)
+            for athlete_id, (name, avatar) in data.get("espnPlayers", {}).items():
+                self.espn_players[str(athlete_id)] = (str(name), str(avatar))
+        except (OSError, ValueError, TypeError, AttributeError):
+            pass
+
+    def save(self) -> None:
+        if not self.state_path or not self.dirty:
+            return
+        tmp = f"{self.state_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({
+                    "teamAliases": self.team_aliases,
+                    "players": self.players,
+                    "espnPlayers": {k: list(v) for k, v in self.espn_players.items()},
+                }, f, ensure_ascii=False)
+            os.replace(tmp, self.state_path)
+            self.dirty = False
+        except OSError as e:
+            print(f"身份注册表保存失败: {e}", file=sys.stderr)
+
+    # ---- 球队 ----
+
+    def team_chinese_name(self, team_id: Optional[int], english_name: Optional[str]) -> str:
+        """teamId / 英文名 / 三字母缩写 -> 中文名；都匹配不上时返回英文名或“未知球队”"""
+        if team_id:
+            zh = self.team_by_id.get(team_id)
+            if zh is not None:
+                return zh
+        if not english_name:
+            return '未知球队'
+        zh = self.team_names.get(english_name) or self.team_by_tricode.get(english_name)
+        if zh is not None:
+            return zh
+        zh = self.team_aliases.get(english_name)
+        if zh is None:
+            # 新的写法：模糊匹配一次并记住结果
+            zh = next((z for en, z in self.team_names.items() if en in english_name or english_name in en), "")
+            self.team_aliases[english_name] = zh
+            self.dirty = True
+        return zh or english_name
+
+    # ---- 球员 ----
+
+    def identify(self, person_id, name: str) -> Dict[str, Optional[str]]:
+        """
+        NBA 球员（CDN / stats.nba.com）：personId + 名字 -> {"name", "avatar"}。
+        头像总是 personId 的 NBA 官方头像；没有名字时用注册表中记录的名字。
+        """
+        if not person_id:
+            return {"name": name, "avatar": None}
+        pid = str(person_id)
+        if name and self.players.get(pid) != name:
+            self.players[pid] = name
+            self.dirty = True
+        return {"name": name or self.players.get(pid, name),
+                "avatar": NBA_HEADSHOT_URL.format(person_id=pid)}
+
+    def link_espn(self, athlete_id: str, name: str, headshot: Optional[str]) -> Optional[str]:
+        """
+        记录 ESPN 球员（按 athlete id），返回头像 URL：ESPN 给出的 headshot，没给时用 athlete id 拼出来。
+        """
+        avatar = headshot or (ESPN_HEADSHOT_URL.format(athlete_id=athlete_id) if athlete_id else None)
+        if athlete_id and avatar and self.espn_players.get(athlete_id) != (name, avatar):
+            self.espn_players[athlete_id] = (name, avatar)
+            self.dirty = True
+        return avatar
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON 编解码
+响应解码和结果输出统一走这里：安装了 orjson 时使用 orjson，否则使用标准库 json。
+两种后端输出完全相同的字节（UTF-8、不转义非 ASCII、紧凑分隔符），输出与安装了哪个后端无关。
+命令行默认输出的整份结果改用 dumps_document：与原来的 json.dumps(result, ensure_ascii=False) 逐字节相同
+（分隔符 ", " / ": "，orjson 不支持，总是使用标准库），下游读取标准输出的程序不受影响。
+NBA_JSON_BACKEND=json 可强制使用标准库。
+数据类（nba_model 的 Match / PlayerLine）按字段顺序输出为对象：orjson 直接序列化，标准库经 default 转换。
+"""
+
+import json
+import os
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # 可选依赖
+    orjson = None
+
+
+def _select_backend() -> str:
+    choice = os.getenv("NBA_JSON_BACKEND", "auto").strip().lower()
+    if choice == "json" or orjson is None:
+        return "json"
+    return "orjson"
+
+
+BACKEND = _select_backend()
+
+
+def _default(obj: Any) -> Any:
+    fields = getattr(obj, "__dataclass_fields__", None)
+    if fields is None:
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+    return {name: getattr(obj, name) for name in fields}
+
+
+def loads(data: Union[bytes, bytearray, str]) -> Any:
+    """解码 JSON（bytes 或 str）"""
+    if BACKEND == "orjson":
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # NaN/Infinity 等 orjson 不接受的扩展写法，交给标准库再试一次（真正的错误会在那里抛出）
+            pass
+    return json.loads(data)
+
+
+def dumps_bytes(obj: Any, sort_keys: bool = False) -> bytes:
+    """编码为 UTF-8 字节"""
+    if BACKEND == "orjson":
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            # orjson 不对数据类字段排序：交给 default 转成字典后再排序
+            option |= orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATACLASS
+        try:
+            return orjson.dumps(obj, default=_default, option=option)
+        except TypeError:
+            # 超出 64 位的整数等 orjson 不支持的值
+            pass
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), sort_keys=sort_keys,
+                      default=_default).encode("utf-8")
+
+
+def dumps(obj: Any, sort_keys: bool = False) -> str:
+    """编码为 str"""
+    return dumps_bytes(obj, sort_keys).decode("utf-8")
+
+
+def dumps_document(obj: Any) -> str:
+    """编码为 str，格式与 json.dumps(obj, ensure_ascii=False) 完全相同（标准分隔符，总是使用标准库）"""
+    return json.dumps(obj, ensure_ascii=False, default=_default)
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON 解码吞吐量微基准
+对比标准库 json 和 orjson（已安装时）解码 boxscore 大小的响应的速度。
+
+用法：
+    python scripts/nba_json_bench.py                      # 使用合成的 CDN boxscore（结构与字段数与真实响应一致）
+    python scripts/nba_json_bench.py boxscore_*.json      # 使用录制下来的真实响应
+    python scripts/nba_json_bench.py --seconds 3
+"""
+
+import argparse
+import json
+import sys
+import time
+from typing import Callable, List, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# CDN boxscore 每名球员 statistics 中的字段
+_PLAYER_STAT_KEYS = (
+    "assists", "blocks", "blocksReceived", "fieldGoalsAttempted", "fieldGoalsMade", "fieldGoalsPercentage",
+    "foulsOffensive", "foulsDrawn", "foulsPersonal", "foulsTechnical", "freeThrowsAttempted", "freeThrowsMade",
+    "freeThrowsPercentage", "minus", "minutes", "minutesCalculated", "plus", "plusMinusPoints", "points",
+    "pointsFastBreak", "pointsInThePaint", "pointsSecondChance", "reboundsDefensive", "reboundsOffensive",
+    "reboundsTotal", "steals", "threePointersAttempted", "threePointersMade", "threePointersPercentage",
+    "turnovers", "twoPointersAttempted", "twoPointersMade", "twoPointersPercentage",
+)
+
+
+def synthetic_boxscore(game_index: int = 0) -> bytes:
+    """生成一份与 cdn.nba.com boxscore_{gameId}.json 结构、大小相当的响应"""
+    def player(team: int, i: int) -> dict:
+        stats = {k: (i * 7 + n + team) % 40 for n, k in enumerate(_PLAYER_STAT_KEYS)}
+        stats["minutes"] = f"PT{20 + i % 20:02d}M{i * 13 % 60:02d}.00S"
+        stats["fieldGoalsPercentage"] = round(0.3 + (i % 7) / 20, 9)
+        return {
+            "status": "ACTIVE", "order": i + 1, "personId": 1620000 + team * 100 + i, "jerseyNum": str(i),
+            "position": "G" if i % 2 else "F", "starter": "1" if i < 5 else "0", "oncourt": "0", "played": "1",
+            "statistics": stats, "name": f"Player {team}-{i}", "nameI": f"P. {team}-{i}",
+            "firstName": "Player", "familyName": f"{team}-{i}",
+        }
+
+    def team(side: int) -> dict:
+        team_stats = {k: 100 + n for n, k in enumerate(_PLAYER_STAT_KEYS)}
+        return {
+            "teamId": 1610612737 + side, "teamName": f"Team {side}", "teamCity": "City", "teamTricode": f"T{side:02d}",
+            "score": 100 + side, "inBonus": "1", "timeoutsRemaining": 2,
+            "periods": [{"period": p, "periodType": "REGULAR", "score": 25 + p} for p in range(1, 5)],
+            "players": [player(side, i) for i in range(17)],
+            "statistics": team_stats,
+        }
+
+    payload = {
+        "meta": {"version": 1, "code": 200, "request": "boxscore", "time": "2026-10-17 00:00:00.000000"},
+        "game": {
+            "gameId": f"00224{game_index:05d}", "gameTimeLocal": "2026-10-17T19:30:00-04:00", "gameStatus": 3,
+            "gameStatusText": "Final", "period": 4, "gameClock": "PT00M00.00S", "attendance": 18000,
+            "arena": {"arenaId": 1, "arenaName": "Arena", "arenaCity": "City", "arenaState": "ST"},
+            "officials": [{"personId": n, "name": f"Official {n}"} for n in range(3)],
+            "homeTeam": team(0), "awayTeam": team(1),
+        },
+    }
+    return json.dumps(payload).encode("utf-8")
+
+
+def _bench(decode: Callable[[bytes], object], payloads: List[bytes], seconds: float) -> Tuple[int, float]:
+    """在 seconds 秒内循环解码，返回 (解码次数, 耗时)"""
+    n = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while True:
+        for p in payloads:
+            decode(p)
+        n += len(payloads)
+        now = time.perf_counter()
+        if now >= deadline:
+            return n, now - started
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="JSON 解码吞吐量微基准")
+    parser.add_argument("files", nargs="*", help="录制的 boxscore 响应文件；不提供时使用合成数据")
+    parser.add_argument("--seconds", type=float, default=2.0, help="每个后端的测试时长（秒）")
+    args = parser.parse_args(argv)
+
+    if args.files:
+        payloads = []
+        for path in args.files:
+            with open(path, "rb") as f:
+                payloads.append(f.read())
+    else:
+        payloads = [synthetic_boxscore(i) for i in range(8)]
+    avg_kb = sum(len(p) for p in payloads) / len(payloads) / 1024
+    print(f"payload: {len(payloads)} 份, 平均 {avg_kb:.1f} KB", file=sys.stderr)
+
+    backends = [("json", json.loads)]
+    if orjson is not None:
+        backends.append(("orjson", orjson.loads))
+    else:
+        print("未安装 orjson，只测试标准库 json", file=sys.stderr)
+
+    baseline = None
+    for name, decode in backends:
+        n, elapsed = _bench(decode, payloads, args.seconds)
+        per_sec = n / elapsed
+        mb_per_sec = per_sec * avg_kb / 1024
+        speedup = "" if baseline is None else f"  ({per_sec / baseline:.2f}x)"
+        baseline = baseline or per_sec
+        print(f"{name:>7}: {per_sec:10.0f} 次/秒  {mb_per_sec:8.1f} MB/s{speedup}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+球员数据王（leaders）提取
+对一支球队的球员只遍历一次，同时为任意一组统计项计算前 k 名，
+CDN boxscore 和 stats.nba.com boxscoretraditionalv2 两条路径共用。
+新增统计项只需在 LEADER_STATS 中登记，不会增加遍历次数。
+"""
+
+import os
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from nba_model import PlayerLine, player_line
+
+
+class LeaderStat(NamedTuple):
+    """一个统计项：输出字段、CDN statistics 键、stats.nba.com 列名"""
+    category: str
+    value_key: str      # 球员 leader 字典中的数值键，如 {"name": ..., "points": 30}
+    field_suffix: str   # 比赛数据中的字段后缀，如 homeTopScorer
+    cdn_key: str
+    stats_column: str
+
+
+LEADER_STATS: Dict[str, LeaderStat] = {
+    "points": LeaderStat("points", "points", "TopScorer", "points", "PTS"),
+    "rebounds": LeaderStat("rebounds", "rebounds", "TopRebounder", "reboundsTotal", "REB"),
+    "assists": LeaderStat("assists", "assists", "TopAssister", "assists", "AST"),
+    "steals": LeaderStat("steals", "steals", "TopStealer", "steals", "STL"),
+    "blocks": LeaderStat("blocks", "blocks", "TopBlocker", "blocks", "BLK"),
+    "threes": LeaderStat("threes", "threes", "TopThreePointShooter", "threePointersMade", "FG3M"),
+    "plusMinus": LeaderStat("plusMinus", "plusMinus", "TopPlusMinus", "plusMinusPoints", "PLUS_MINUS"),
+}
+
+# 比赛数据中默认输出的三项（homeTopScorer / homeTopRebounder / homeTopAssister ...）
+DEFAULT_LEADER_CATEGORIES = ("points", "rebounds", "assists")
+
+
+def configured_leader_stats() -> Tuple[LeaderStat, ...]:
+    """默认三项 + NBA_EXTRA_LEADER_STATS 中额外配置的统计项（逗号分隔，如 steals,blocks）"""
+    extra = [c.strip() for c in os.getenv("NBA_EXTRA_LEADER_STATS", "").split(",") if c.strip()]
+    categories = list(DEFAULT_LEADER_CATEGORIES)
+    for c in extra:
+        if c in LEADER_STATS and c not in categories:
+            categories.append(c)
+    return tuple(LEADER_STATS[c] for c in categories)
+
+
+def leader_field(side: str, stat: LeaderStat) -> str:
+    """比赛数据中的字段名，如 ("home", points) -> homeTopScorer"""
+    return f"{side}{stat.field_suffix}"
+
+
+def configured_leader_fields() -> Tuple[str, ...]:
+    """configured_leader_stats() 在比赛数据中的全部字段名（先主队后客队，与比赛布局的顺序一致）"""
+    return tuple(leader_field(side, stat) for side in ("home", "away") for stat in configured_leader_stats())
+
+
+class TopK:
+    """
+    单次遍历的多统计项前 k 名。
+    offer() 接收一名球员所有统计项的值；数值相同时先出现的球员排在前面（与 max() 的行为一致），
+    缺失值（None）不参与该项排名（正负值这类可以为负的统计项，缺失不能当作 0）。
+    """
+    __slots__ = ("k", "tops")
+
+    def __init__(self, n_stats: int, k: int = 1):
+        self.k = max(1, k)
+        # 每个统计项一个按比较值降序排列的列表：[(比较值, 原始值, 球员), ...]
+        self.tops: List[List[Tuple[int, Optional[int], Any]]] = [[] for _ in range(n_stats)]
+
+    def offer(self, values: Sequence[Optional[int]], payload: Any) -> None:
+        k = self.k
+        for top, v in zip(self.tops, values):
+            if v is None:
+                continue
+            key = v
+            if len(top) >= k and key <= top[-1][0]:
+                continue
+            pos = len(top)
+            while pos > 0 and top[pos - 1][0] < key:
+                pos -= 1
+            top.insert(pos, (key, v, payload))
+            if len(top) > k:
+                top.pop()
+
+    def results(self) -> List[List[Tuple[Optional[int], Any]]]:
+        """每个统计项的前 k 名 [(原始值, 球员), ...]"""
+        return [[(v, payload) for _, v, payload in top] for top in self.tops]
+
+
+def cdn_player_played(p: Dict) -> bool:
+    """CDN boxscore 球员是否上场（played == "1"）；没有该字段时视为上场"""
+    return str(p.get("played", "1")) == "1"
+
+
+# 由 (personId, 名字) 得到球员身份 {"name": ..., "avatar": ...}（见 nba_identity.IdentityRegistry.identify）
+Identify = Callable[[Any, str], Dict[str, Optional[str]]]
+
+
+def _leader_entry(person_id: Any, name: str, stat: LeaderStat, value: Optional[int],
+                  identify: Optional[Identify]) -> PlayerLine:
+    if identify is None:
+        return player_line(name, stat.value_key, value)
+    identity = identify(person_id, name)
+    return player_line(identity["name"], stat.value_key, value, identity["avatar"])
+
+
+def cdn_team_leaders(players: Iterable[Dict], stats: Sequence[LeaderStat], to_int: Callable[[Any], Optional[int]],
+                     k: int = 1, identify: Optional[Identify] = None) -> Dict[str, List[PlayerLine]]:
+    """
+    CDN boxscore：一支球队球员列表的各项前 k 名（未上场的球员不参与，与 stats_game_leaders 按 MIN 过滤一致）。
+    返回 {category: [PlayerLine({"name": ..., value_key: 值}), ...]}；传入 identify 时附带 avatar
+    """
+    keys = [s.cdn_key for s in stats]
+    top = TopK(len(stats), k)
+    for p in players:
+        if not cdn_player_played(p):
+            continue
+        st = p.get("statistics", {})
+        top.offer([to_int(st.get(key)) for key in keys], p)
+    out: Dict[str, List[PlayerLine]] = {}
+    for s, ranked in zip(stats, top.results()):
+        out[s.category] = [
+            _leader_entry(p.get("personId"), f"{p.get('firstName', '')} {p.get('familyName', '')}".strip(),
+                          s, v, identify)
+            for v, p in ranked
+        ]
+    return out
+
+
+def stats_game_leaders(rows: Iterable[Sequence], columns: Dict[str, int], team_ids: Sequence[int],
+                       stats: Sequence[LeaderStat], to_int: Callable[[Any], Optional[int]],
+                       k: int = 1, identify: Optional[Identify] = None) -> Dict[int, Dict[str, Optional[List[PlayerLine]]]]:
+    """
+    stats.nba.com PlayerStats：一次遍历所有行，同时计算两队各项前 k 名。
+    columns 为列名 -> 下标（TEAM_ID、PLAYER_NAME 必需，MIN 可选，用于过滤 DNP；PLAYER_ID 可选，用于 identify）。
+    返回 {team_id: {category: [PlayerLine, ...] 或 None（该列不存在）}}；
+    排名第一的球员没有名字时，该项视为没有数据（返回空列表）。
+    """
+    team_i = columns["TEAM_ID"]
+    name_i = columns["PLAYER_NAME"]
+    min_i = columns.get("MIN", -1)
+    pid_i = columns.get("PLAYER_ID", -1)
+    stat_idx = [columns.get(s.stats_column, -1) for s in stats]
+    tops = {int(t): TopK(len(stats), k) for t in team_ids}
+
+    for row in rows:
+        top = tops.get(to_int(row[team_i]))
+        if top is None:
+            continue
+        # 有些 DNP 也会有行，MIN 为空或 "0"；尽量过滤掉
+        if min_i != -1:
+            mv = row[min_i]
+            if mv is None:
+                continue
+            ms = str(mv).strip()
+            if ms == "" or ms == "0" or ms == "0:00":
+                continue
+        top.offer([to_int(row[i]) if i != -1 else None for i in stat_idx], row)
+
+    out: Dict[int, Dict[str, Optional[List[PlayerLine]]]] = {}
+    for team_id, top in tops.items():
+        per_team: Dict[str, Optional[List[PlayerLine]]] = {}
+        for s, i, ranked in zip(stats, stat_idx, top.results()):
+            if i == -1:
+                per_team[s.category] = None
+                continue
+            leaders = []
+            for v, row in ranked:
+                name = str(row[name_i] or "").strip()
+                if not name:
+                    break
+                leaders.append(_leader_entry(row[pid_i] if pid_i != -1 else None, name, s, v, identify))
+            per_team[s.category] = leaders
+        out[team_id] = per_team
+    return out
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+抓取 / 解析热路径的结构化指标
+- 计数器与延迟直方图（带标签），可导出为 JSON 或 Prometheus 文本格式
+- 阶段计时：记录耗时直方图和结果（ok / empty / error），并保留每个阶段最慢的若干个 key（日期、gameId），
+  用来找出拖慢一轮抓取的那一天 / 那场比赛
+"""
+
+import asyncio
+import functools
+import heapq
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# 直方图桶上限（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# 计为成功的 result 标签值（用于计算成功率 / 命中率）
+SUCCESS_RESULTS = frozenset({"ok", "hit"})
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value, 6)
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Histogram:
+    """累积桶直方图（与 Prometheus 的 histogram 语义一致）"""
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.sum += value
+        self.count += 1
+        for i, upper in enumerate(self.buckets):
+            if value <= upper:
+                self.counts[i] += 1
+                break
+
+    def cumulative(self) -> List[int]:
+        out, total = [], 0
+        for n in self.counts:
+            total += n
+            out.append(total)
+        return out
+
+    def quantile(self, q: float) -> Optional[float]:
+        """按桶线性插值估算分位数；超出最大桶时返回最大桶上限"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        lower, seen = 0.0, 0
+        for upper, n in zip(self.buckets, self.counts):
+            if n and seen + n >= rank:
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+            lower = upper
+        return self.buckets[-1]
+
+
+class Metrics:
+    """指标注册表（线程安全）；名字不带前缀，导出 Prometheus 时统一加 prefix"""
+
+    def __init__(self, prefix: str = "nba_", buckets: Tuple[float, ...] = DEFAULT_BUCKETS, slowest: int = 5):
+        self.prefix = prefix
+        self.buckets = buckets
+        self.slowest_n = slowest
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters: Dict[str, Dict[LabelKey, float]] = {}
+            self.histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+            self.slowest: Dict[str, List[Tuple[float, str]]] = {}
+
+    def reset_slowest(self) -> None:
+        """清空“最慢 key”列表（常驻模式每轮刷新开始时调用，只反映最近一轮）"""
+        with self._lock:
+            self.slowest = {}
+
+    # ---- 记录 ----
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = Histogram(self.buckets)
+            hist.observe(value)
+
+    def record_stage(self, stage: str, seconds: float, result: Optional[str] = None, key: Optional[str] = None) -> None:
+        """记录一次阶段耗时；result 为 ok / empty / error，key 为日期或 gameId（进入最慢列表）"""
+        self.observe("stage_seconds", seconds, stage=stage)
+        if result is not None:
+            self.inc("stage_total", stage=stage, result=result)
+        if key is not None:
+            with self._lock:
+                heap = self.slowest.setdefault(stage, [])
+                item = (seconds, str(key))
+                if len(heap) < self.slowest_n:
+                    heapq.heappush(heap, item)
+                elif item > heap[0]:
+                    heapq.heapreplace(heap, item)
+
+    @contextmanager
+    def stage(self, stage: str, key: Optional[str] = None) -> Iterator[None]:
+        """with metrics.stage("serialize"): ...（抛出异常时 result 记为 error，被取消记为 cancelled）"""
+        start = time.perf_counter()
+        result = "ok"
+        try:
+            yield
+        except asyncio.CancelledError:
+            result = "cancelled"
+            raise
+        except BaseException:
+            result = "error"
+            raise
+        finally:
+            self.record_stage(stage, time.perf_counter() - start, result, key)
+
+    def timed_stage(self, stage: str, key: Optional[Callable[..., str]] = None):
+        """
+        装饰器：记录函数（同步或协程）的耗时，返回值为真时 result=ok，否则 empty，
+        抛出异常为 error，被取消（如对冲请求中落败的一方）为 cancelled。
+        key(*args, **kwargs) 给出进入最慢列表的 key。
+        """
+        def decorate(fn):
+            def outcome(value) -> str:
+                return "ok" if value else "empty"
+
+            if asyncio.iscoroutinefunction(fn):
+                @functools.wraps(fn)
+                async def async_wrapper(*args, **kwargs):
+                    start = time.perf_counter()
+                    result = "error"
+                    try:
+                        value = await fn(*args, **kwargs)
+                        result = outcome(value)
+                        return value
+                    except asyncio.CancelledError:
+                        result = "cancelled"
+                        raise
+                    finally:
+                        self.record_stage(stage, time.perf_counter() - start, result,
+                                          key(*args, **kwargs) if key else None)
+                return async_wrapper
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                result = "error"
+                try:
+                    value = fn(*args, **kwargs)
+                    result = outcome(value)
+                    return value
+                finally:
+                    self.record_stage(stage, time.perf_counter() - start, result,
+                                      key(*args, **kwargs) if key else None)
+            return wrapper
+        return decorate
+
+    # ---- 读取 / 导出 ----
+
+    def totals(self, name: str, label: str) -> Dict[str, float]:
+        """按某个标签汇总计数器：{标签值: 合计}"""
+        out: Dict[str, float] = {}
+        with self._lock:
+            for key, value in self.counters.get(name, {}).items():
+                label_value = dict(key).get(label, "")
+                out[label_value] = out.get(label_value, 0) + value
+        return out
+
+    def ratios(self) -> Dict[str, Dict[str, float]]:
+        """带 result 标签的计数器的成功率 / 命中率：{计数器名: {其余标签: 比例}}"""
+        out: Dict[str, Dict[str, float]] = {}
+        with self._lock:
+            for name, series in self.counters.items():
+                grouped: Dict[str, List[float]] = {}
+                for key, value in series.items():
+                    labels = dict(key)
+                    # 被取消的（对冲中落败的一方）不计入成功率
+                    if labels.get("result", "cancelled") == "cancelled":
+                        continue
+                    group = ",".join(f"{k}={v}" for k, v in key if k != "result")
+                    acc = grouped.setdefault(group, [0.0, 0.0])
+                    acc[1] += value
+                    if labels["result"] in SUCCESS_RESULTS:
+                        acc[0] += value
+                if grouped:
+                    out[name] = {g: round(ok / total, 4) for g, (ok, total) in sorted(grouped.items()) if total}
+        return out
+
+    def snapshot(self) -> Dict:
+        """JSON 可序列化的指标快照"""
+        ratios = self.ratios()
+        with self._lock:
+            counters = {
+                name: [{"labels": dict(key), "value": value} for key, value in sorted(series.items())]
+                for name, series in sorted(self.counters.items())
+            }
+            histograms = {
+                name: [{
+                    "labels": dict(key), "count": h.count, "sum": round(h.sum, 6),
+                    "p50": _round(h.quantile(0.5)), "p95": _round(h.quantile(0.95)),
+                    "buckets": {str(b): n for b, n in zip(h.buckets, h.cumulative())},
+                } for key, h in sorted(series.items())]
+                for name, series in sorted(self.histograms.items())
+            }
+            slowest = {
+                stage: [{"key": k, "seconds": round(s, 6)} for s, k in sorted(heap, reverse=True)]
+                for stage, heap in sorted(self.slowest.items())
+            }
+        return {"counters": counters, "histograms": histograms, "ratios": ratios, "slowest": slowest}
+
+    def prometheus(self) -> str:
+        """Prometheus 文本格式（最慢 key 列表基数不固定，不导出）"""
+        def fmt_value(value: float) -> str:
+            # 计数器不能按有效数字截断（字节数超过 1e6 后增量会丢失）：整数原样输出，否则输出完整精度
+            return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+        def fmt_labels(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+            items = key + extra
+            if not items:
+                return ""
+            escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in items)
+            return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(items, escaped)) + "}"
+
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self.counters.items()):
+                full = self.prefix + name
+                lines.append(f"# TYPE {full} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{full}{fmt_labels(key)} {fmt_value(value)}")
+            for name, series in sorted(self.histograms.items()):
+                full = self.prefix + name
+                lines.append(f"# TYPE {full} histogram")
+                for key, h in sorted(series.items()):
+                    for upper, n in zip(h.buckets, h.cumulative()):
+                        lines.append(f"{full}_bucket{fmt_labels(key, (('le', f'{upper:g}'),))} {n}")
+                    lines.append(f"{full}_bucket{fmt_labels(key, (('le', '+Inf'),))} {h.count}")
+                    lines.append(f"{full}_sum{fmt_labels(key)} {h.sum:.6f}")
+                    lines.append(f"{full}_count{fmt_labels(key)} {h.count}")
+        return "\n".join(lines) + "\n"
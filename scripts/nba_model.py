@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+比赛 / 球员数据王的紧凑数据模型（Match / PlayerLine）
+原来每场比赛是一个 18 键的字典、每个数据王又是一个小字典，键和哈希表随每个对象重复保存。
+这里改为 __slots__ 数据类：
+- 对象只保存字段值；日期、场馆、球员名字和头像等反复出现的字符串驻留（intern）后共享
+- orjson 直接按字段顺序序列化数据类（C 实现，不构造中间字典），输出字节与原来的字典完全相同
+- 保留映射接口（m["id"]、m.get("status")、"homeTopScorer" in m），与从 JSON 加载回来的字典可以混用
+数据王字段因来源（CDN / ESPN / stats.nba.com）和 NBA_EXTRA_LEADER_STATS 而不同，
+数值键因统计项而不同，所以每种字段布局生成一个数据类并缓存。
+"""
+
+import dataclasses
+import sys
+import threading
+from typing import Any, ClassVar, Dict, Mapping, Optional, Sequence, Tuple, Type, Union
+
+# 比赛的固定字段（输出顺序）；数据王字段（homeTopScorer ...）排在其后
+MATCH_FIELDS: Tuple[str, ...] = (
+    "id", "homeTeam", "awayTeam", "homeTeamId", "awayTeamId", "homeScore", "awayScore",
+    "status", "date", "time", "league", "venue",
+)
+# 在很多比赛之间重复的字段值，驻留后共享同一个字符串对象
+_SHARED_MATCH_FIELDS = frozenset({"homeTeam", "awayTeam", "status", "date", "time", "league", "venue"})
+
+_NO_AVATAR = object()
+_types_lock = threading.Lock()
+_line_types: Dict[Tuple[str, bool], Type["PlayerLine"]] = {}
+_match_types: Dict[Tuple[str, ...], Type["Match"]] = {}
+
+
+def _shared(value: Any) -> Any:
+    return sys.intern(value) if type(value) is str else value
+
+
+class _Record:
+    """按字段名读写的映射接口（沿用原来字典的用法）"""
+    __slots__ = ()
+    __dataclass_fields__: ClassVar[Dict[str, dataclasses.Field]]
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self.__dataclass_fields__:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        # 只能修改已有字段；新增字段会改变布局，用 Match.updated()
+        if key not in self.__dataclass_fields__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.__dataclass_fields__
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in self.__dataclass_fields__ else default
+
+    def keys(self):
+        return self.__dataclass_fields__.keys()
+
+    def items(self):
+        return [(k, getattr(self, k)) for k in self.__dataclass_fields__]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转为普通字典（数据王仍为 PlayerLine）"""
+        return {k: getattr(self, k) for k in self.__dataclass_fields__}
+
+
+class PlayerLine(_Record):
+    """
+    一名球员某一统计项的数据王，序列化为 {"name", "avatar", <统计项>: 值}；
+    没有身份信息（如 gameLeaders 缺 personId）时不带 avatar 键，与原来的字典一致。
+    """
+    __slots__ = ()
+    stat: ClassVar[str] = ""
+
+    @property
+    def value(self) -> Optional[int]:
+        return getattr(self, self.stat)
+
+    def __reduce__(self):
+        return _rebuild_line, (self.stat, "avatar" in self.__dataclass_fields__,
+                               tuple(getattr(self, k) for k in self.__dataclass_fields__))
+
+
+def player_line_type(stat: str, with_avatar: bool = True) -> Type[PlayerLine]:
+    key = (stat, with_avatar)
+    cls = _line_types.get(key)
+    if cls is None:
+        fields = ("name", "avatar", stat) if with_avatar else ("name", stat)
+        cls = dataclasses.make_dataclass(
+            "PlayerLine", fields, bases=(PlayerLine,), namespace={"__slots__": fields, "stat": stat})
+        cls.__module__ = __name__
+        with _types_lock:
+            cls = _line_types.setdefault(key, cls)
+    return cls
+
+
+def player_line(name: str, stat: str, value: Optional[int], avatar: Any = _NO_AVATAR) -> PlayerLine:
+    """stat 为数值键（points / rebounds ...）；不传 avatar 时输出中不带 avatar 键"""
+    if avatar is _NO_AVATAR:
+        return player_line_type(stat, False)(_shared(name), value)
+    return player_line_type(stat, True)(_shared(name), _shared(avatar), value)
+
+
+def _rebuild_line(stat: str, with_avatar: bool, values: Tuple) -> PlayerLine:
+    return player_line_type(stat, with_avatar)(*values)
+
+
+def line_from_dict(d: Mapping) -> Optional[PlayerLine]:
+    """{"name", ["avatar",] <统计项>} 形状的字典转为 PlayerLine，形状不符时返回 None"""
+    keys = tuple(d)
+    if len(keys) == 3 and keys[:2] == ("name", "avatar"):
+        return player_line(d["name"], keys[2], d[keys[2]], d["avatar"])
+    if len(keys) == 2 and keys[0] == "name" and keys[1] != "avatar":
+        return player_line(d["name"], keys[1], d[keys[1]])
+    return None
+
+
+class Match(_Record):
+    """一场比赛：MATCH_FIELDS + 该布局的数据王字段（值为 PlayerLine 或 None）"""
+    __slots__ = ()
+    leader_fields: ClassVar[Tuple[str, ...]] = ()
+
+    def updated(self, values: Mapping[str, Any]) -> "Match":
+        """按 dict.update 的语义更新字段，返回新对象（新增的数据王字段排在末尾）"""
+        if all(k in self.__dataclass_fields__ for k in values):
+            for k, v in values.items():
+                setattr(self, k, v)
+            return self
+        leaders = {k: getattr(self, k) for k in self.leader_fields}
+        leaders.update((k, v) for k, v in values.items() if k not in MATCH_FIELDS)
+        fixed = [values.get(k, getattr(self, k)) for k in MATCH_FIELDS]
+        return _new_match(fixed, leaders)
+
+    def __reduce__(self):
+        return _rebuild_match, (self.leader_fields, tuple(getattr(self, k) for k in self.__dataclass_fields__))
+
+
+def match_type(leader_fields: Tuple[str, ...]) -> Type[Match]:
+    cls = _match_types.get(leader_fields)
+    if cls is None:
+        fields = MATCH_FIELDS + leader_fields
+        cls = dataclasses.make_dataclass(
+            "Match", fields, bases=(Match,), namespace={"__slots__": fields, "leader_fields": leader_fields})
+        cls.__module__ = __name__
+        with _types_lock:
+            cls = _match_types.setdefault(leader_fields, cls)
+    return cls
+
+
+def _new_match(fixed: Sequence[Any], leaders: Mapping[str, Optional[PlayerLine]]) -> Match:
+    values = [_shared(v) if k in _SHARED_MATCH_FIELDS else v for k, v in zip(MATCH_FIELDS, fixed)]
+    return match_type(tuple(leaders))(*values, *leaders.values())
+
+
+def _rebuild_match(leader_fields: Tuple[str, ...], values: Tuple) -> Match:
+    return match_type(leader_fields)(*values)
+
+
+def make_match(leaders: Optional[Mapping[str, Optional[PlayerLine]]] = None, **fields: Any) -> Match:
+    """make_match(leaders, id=..., homeTeam=..., ..., venue=...)：固定字段必须齐全"""
+    if len(fields) != len(MATCH_FIELDS):
+        unknown = set(fields) - set(MATCH_FIELDS)
+        raise TypeError(f"未知字段: {sorted(unknown)}" if unknown else
+                        f"缺少字段: {sorted(set(MATCH_FIELDS) - set(fields))}")
+    return _new_match([fields[k] for k in MATCH_FIELDS], leaders or {})
+
+
+def match_from_dict(d: Dict) -> Union[Match, Dict]:
+    """
+    从 JSON 加载回来的比赛字典转为 Match（完赛存储、刷新调度状态）；
+    字段布局不符（旧版本写入、未知字段）时原样返回字典，两者可以混用。
+    """
+    keys = tuple(d)
+    n = len(MATCH_FIELDS)
+    if keys[:n] != MATCH_FIELDS:
+        return d
+    leaders: Dict[str, Optional[PlayerLine]] = {}
+    for k in keys[n:]:
+        v = d[k]
+        if v is not None:
+            v = line_from_dict(v) if isinstance(v, dict) else None
+            if v is None:
+                return d
+        leaders[k] = v
+    return _new_match([d[k] for k in MATCH_FIELDS], leaders)
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+比赛文字直播（CDN playbyplay_{gameId}.json）的增量处理
+响应每次都包含从开赛到当前的全部 action，越到比赛后段越大。每场比赛保存 actionNumber 游标和派生状态
+（比分、领先方、领先变换 / 打平次数、两队最大领先），每轮只处理游标之后的新 action；
+游标和状态持久化到 JSON 文件，重启后从断点继续，不重复输出。
+actions 数组只在末尾追加：记住上一轮数组部分的原始字节，本轮同一位置的字节一致（memcmp）时只解码新增的尾部，
+每轮的解码和处理量只和新 action 数有关；不一致（之前的 action 被修改 / 删除、格式变化）时退回解码整个数组，
+按游标过滤。之前的 action 被修改时已输出的派生状态不回溯，比分以之后 action 自带的比分为准。
+"""
+
+import json
+import os
+import re
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import nba_json
+
+# 输出中保留的 action 字段
+ACTION_FIELDS = ("actionNumber", "period", "clock", "teamTricode", "personId", "playerName",
+                 "actionType", "subType", "description", "scoreHome", "scoreAway")
+# 已结束的比赛的状态保留天数
+FINAL_RETENTION_SECONDS = 2 * 86400
+_ACTIONS_KEY = b'"actions":'
+# actions 数组必须是 game 的最后一个成员、game 必须是根对象的最后一个成员，才能只解码尾部
+_DOC_END_RE = re.compile(rb"\]\s*\}\s*\}\s*\Z")
+
+
+def _to_int(v) -> Optional[int]:
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return None
+
+
+def _region(body: bytes, start: int, end: int) -> memoryview:
+    """actions 数组部分（去掉末尾空白）的零拷贝视图，下一轮用来比较"""
+    while end > start and body[end - 1] in b" \t\r\n":
+        end -= 1
+    return memoryview(body)[start:end]
+
+
+def _actions_span(body: bytes) -> Optional[Tuple[int, int]]:
+    """actions 数组内容（不含方括号）在响应体中的 [start, end)；结构不符时返回 None"""
+    key = body.find(_ACTIONS_KEY)
+    if key < 0:
+        return None
+    start = body.find(b"[", key + len(_ACTIONS_KEY))
+    if start < 0:
+        return None
+    m = _DOC_END_RE.search(body, max(start + 1, len(body) - 64))
+    if m is None:
+        return None
+    return start + 1, m.start()
+
+
+class GameCursor:
+    """一场比赛的游标与派生状态"""
+    __slots__ = ("game_id", "cursor", "period", "clock", "score_home", "score_away", "last_leader",
+                 "lead_changes", "times_tied", "largest_lead_home", "largest_lead_away", "final", "updated_at",
+                 "_region")
+
+    def __init__(self, game_id: str):
+        self.game_id = game_id
+        self.cursor = 0                 # 已处理的最大 actionNumber
+        self.period = 0
+        self.clock = ""
+        self.score_home = 0
+        self.score_away = 0
+        self.last_leader = 0            # 最近一次领先的一方：1 主队，-1 客队，0 尚无
+        self.lead_changes = 0
+        self.times_tied = 0
+        self.largest_lead_home = 0
+        self.largest_lead_away = 0
+        self.final = False
+        self.updated_at = 0.0
+        self._region: Optional[memoryview] = None   # 上一轮响应体中 actions 数组部分（不持久化）
+
+    _PERSISTED = ("cursor", "period", "clock", "score_home", "score_away", "last_leader", "lead_changes",
+                  "times_tied", "largest_lead_home", "largest_lead_away", "final", "updated_at")
+
+    def to_dict(self) -> Dict:
+        return {k: getattr(self, k) for k in self._PERSISTED}
+
+    @classmethod
+    def from_dict(cls, game_id: str, d: Dict) -> "GameCursor":
+        state = cls(game_id)
+        for k in cls._PERSISTED:
+            if k in d:
+                setattr(state, k, type(getattr(state, k))(d[k]))
+        return state
+
+    def summary(self) -> Dict:
+        return {"gameId": self.game_id, "cursor": self.cursor, "period": self.period, "clock": self.clock,
+                "scoreHome": self.score_home, "scoreAway": self.score_away, "leadChanges": self.lead_changes,
+                "timesTied": self.times_tied, "largestLeadHome": self.largest_lead_home,
+                "largestLeadAway": self.largest_lead_away, "final": self.final}
+
+    def apply(self, action: Dict) -> Dict:
+        """处理一个新 action，更新派生状态，返回输出的事件（含 leadChange / tied 标记）"""
+        self.cursor = max(self.cursor, int(action["actionNumber"]))
+        period = _to_int(action.get("period"))
+        if period is not None:
+            self.period = period
+        self.clock = str(action.get("clock") or self.clock)
+        event = {k: action[k] for k in ACTION_FIELDS if k in action}
+        event["gameId"] = self.game_id
+        home, away = _to_int(action.get("scoreHome")), _to_int(action.get("scoreAway"))
+        lead_change = tied = False
+        if home is not None and away is not None and (home, away) != (self.score_home, self.score_away):
+            self.score_home, self.score_away = home, away
+            margin = home - away
+            leader = (margin > 0) - (margin < 0)
+            if leader == 0:
+                tied = True
+                self.times_tied += 1
+            else:
+                # 经过平局再反超也算一次领先变换
+                if self.last_leader and leader != self.last_leader:
+                    lead_change = True
+                    self.lead_changes += 1
+                self.last_leader = leader
+            self.largest_lead_home = max(self.largest_lead_home, margin)
+            self.largest_lead_away = max(self.largest_lead_away, -margin)
+        event["leadChange"] = lead_change
+        event["tied"] = tied
+        if action.get("actionType") == "game" and action.get("subType") == "end":
+            self.final = True
+        return event
+
+
+class PlayByPlayCursors:
+    """
+    所有比赛的游标（state_path 为 None 时只在内存中）。
+    ingest(gameId, 响应体) 返回游标之后的新事件；stats 记录各解码方式的次数：
+    tail（只解码新增尾部）、full（解码整个数组）、unchanged（数组未变）
+    """
+
+    def __init__(self, state_path: Optional[str] = None):
+        self.state_path = state_path
+        self.games: Dict[str, GameCursor] = {}
+        self.stats = {"tail": 0, "full": 0, "unchanged": 0}
+        self._load()
+
+    def _load(self) -> None:
+        if not self.state_path:
+            return
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.games = {gid: GameCursor.from_dict(gid, d) for gid, d in data["games"].items()}
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            pass
+
+    def save(self, now: Optional[float] = None) -> None:
+        """保存游标（结束超过 FINAL_RETENTION_SECONDS 的比赛不再保留）"""
+        now = time.time() if now is None else now
+        self.games = {gid: g for gid, g in self.games.items()
+                      if not (g.final and now - g.updated_at > FINAL_RETENTION_SECONDS)}
+        if not self.state_path:
+            return
+        tmp = f"{self.state_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"games": {gid: g.to_dict() for gid, g in self.games.items()}}, f)
+            os.replace(tmp, self.state_path)
+        except OSError as e:
+            print(f"文字直播游标保存失败: {e}", file=sys.stderr)
+
+    def get(self, game_id: str) -> GameCursor:
+        state = self.games.get(game_id)
+        if state is None:
+            state = self.games[game_id] = GameCursor(game_id)
+        return state
+
+    def _new_actions(self, state: GameCursor, body: bytes) -> List[Dict]:
+        span = _actions_span(body)
+        region = state._region
+        if span is not None and region is not None:
+            start, end = span
+            if end - start >= len(region) and body.startswith(region, start):
+                tail = body[start + len(region):end].strip()
+                if not tail:
+                    self.stats["unchanged"] += 1
+                    return []
+                # 上一轮数组为空时尾部直接以新 action 开头，否则以逗号开头
+                inner = tail if not region else tail[1:] if tail.startswith(b",") else None
+                if inner is not None:
+                    try:
+                        actions = nba_json.loads(b"[" + inner + b"]")
+                    except ValueError:
+                        actions = None
+                    if isinstance(actions, list) and all(
+                            isinstance(a, dict) and _to_int(a.get("actionNumber")) is not None for a in actions):
+                        state._region = _region(body, start, end)
+                        self.stats["tail"] += 1
+                        return [a for a in actions if int(a["actionNumber"]) > state.cursor]
+        # 首次处理 / 重启后 / 之前的 action 有变化：解码整个数组，按游标过滤
+        self.stats["full"] += 1
+        state._region = None
+        actions = None
+        if span is not None:
+            try:
+                actions = nba_json.loads(b"[" + body[span[0]:span[1]] + b"]")
+                state._region = _region(body, *span)
+            except ValueError:
+                actions = None
+        if actions is None:
+            game = (nba_json.loads(body) or {}).get("game") or {}
+            actions = game.get("actions") or []
+        out = []
+        for a in actions:
+            if not isinstance(a, dict) or _to_int(a.get("actionNumber")) is None:
+                state._region = None
+                continue
+            if int(a["actionNumber"]) > state.cursor:
+                out.append(a)
+        return out
+
+    def ingest(self, game_id: str, body: bytes, now: Optional[float] = None) -> List[Dict]:
+        """处理一份 playbyplay 响应体，返回游标之后的新事件（按 actionNumber 升序）"""
+        state = self.get(game_id)
+        actions = self._new_actions(state, body)
+        actions.sort(key=lambda a: int(a["actionNumber"]))
+        events = [state.apply(a) for a in actions]
+        if events:
+            state.updated_at = time.time() if now is None else now
+        return events
+
+    def active(self, game_ids: Iterable[str]) -> List[str]:
+        """game_ids 中尚未结束的比赛"""
+        return [gid for gid in game_ids if not (gid in self.games and self.games[gid].final)]
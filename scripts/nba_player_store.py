@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+球员单场数据的列式存储（只追加，内存映射，需要 numpy）
+数据王只保留每项第一名，其余球员数据随 boxscore 一起丢弃；开启存储后（NBA_PLAYER_STORE=1 或 --player-store）
+完赛比赛的全部上场球员单场数据按列追加到 NBA_CACHE_DIR/player_lines/：
+    meta.json      行数、列定义（已提交的行数以这里为准，追加到一半中断的尾部在打开时截掉）
+    <列名>.col     每列一个定长数组文件（gameId、date、teamId、oppTeamId、home、personId、name、seconds 及各统计项）
+    names.txt      球员名字的字符串表（name 列保存行号）
+查询直接在内存映射的列上做向量化计算（整季约 3 万行，毫秒级），不再读取 JSON：
+
+    python scripts/nba_player_store.py leaders points --start 2024-10-22 --end 2025-04-13 --per-game --min-games 20
+    python scripts/nba_player_store.py teams --start 2025-01-01
+    python scripts/nba_player_store.py player 2544
+    python scripts/nba_player_store.py ingest-archive     # 从原始响应归档（nba_archive）导入已归档的完赛 boxscore
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # 可选依赖
+    np = None
+
+import nba_json
+from nba_boxscore import PLAYER_LINE_STATS
+from nba_leaders import LEADER_STATS
+
+FORMAT_VERSION = 1
+# (列名, dtype)；统计项列名与 CDN statistics 键一致
+COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("gameId", "<i8"), ("date", "<i4"), ("teamId", "<i4"), ("oppTeamId", "<i4"), ("home", "<i1"),
+    ("personId", "<i4"), ("name", "<i4"), ("seconds", "<i4"),
+) + tuple((k, "<i2") for k in PLAYER_LINE_STATS)
+STAT_COLUMNS = PLAYER_LINE_STATS
+# 缓冲超过这么多行时自动写盘
+FLUSH_ROWS = 20000
+
+
+def _date_int(value: Optional[str]) -> Optional[int]:
+    """YYYY-MM-DD / YYYYMMDD -> YYYYMMDD 整数"""
+    if not value:
+        return None
+    return int(str(value).replace("-", ""))
+
+
+def _date_str(value: int) -> str:
+    return f"{value // 10000:04d}-{value // 100 % 100:02d}-{value % 100:02d}"
+
+
+class PlayerLineStore:
+    """
+    只追加的列式存储。add_game() 先写入内存缓冲，flush() 一次性追加到各列文件并更新 meta.json；
+    查询只看已写盘的数据。线程安全（单进程写）。
+    """
+
+    def __init__(self, path: str):
+        if np is None:
+            raise RuntimeError("球员数据存储需要 numpy（pip install numpy）")
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self.rows = 0
+        self._names: List[str] = []
+        self._committed_names = 0
+        self._name_index: Dict[str, int] = {}
+        self._buffer: List[Tuple] = []
+        self._pending_games: set = set()
+        self._maps: Optional[Dict[str, "np.ndarray"]] = None
+        self.added_games = 0
+        self.added_rows = 0
+        self._open()
+        self._games = set(self.column("gameId").tolist())
+
+    # ---- 文件 ----
+
+    def _col_path(self, name: str) -> str:
+        return os.path.join(self.path, f"{name}.col")
+
+    def _open(self) -> None:
+        meta_path = os.path.join(self.path, "meta.json")
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("version") != FORMAT_VERSION or [tuple(c) for c in meta.get("columns", [])] != list(COLUMNS):
+                raise ValueError(f"列式存储格式不兼容: {meta_path}")
+            self.rows = int(meta["rows"])
+            name_count = int(meta["names"])
+        except FileNotFoundError:
+            self.rows, name_count = 0, 0
+            self._write_meta(0, 0)
+        # 截掉上次追加到一半中断的尾部（meta.json 之外的行 / 名字）
+        for name, dtype in COLUMNS:
+            size = self.rows * np.dtype(dtype).itemsize
+            with open(self._col_path(name), "ab") as f:
+                if f.tell() < size:
+                    raise ValueError(f"列文件不完整: {self._col_path(name)}")
+                if f.tell() > size:
+                    f.truncate(size)
+        names_path = os.path.join(self.path, "names.txt")
+        try:
+            with open(names_path, "r", encoding="utf-8") as f:
+                stored = f.read()
+        except FileNotFoundError:
+            stored = ""
+        self._names = stored.split("\n")[:name_count]
+        if len(self._names) < name_count:
+            raise ValueError(f"名字表不完整: {names_path}")
+        committed = "".join(f"{n}\n" for n in self._names)
+        if stored != committed:
+            with open(names_path, "w", encoding="utf-8") as f:
+                f.write(committed)
+        self._committed_names = name_count
+        self._name_index = {n: i for i, n in enumerate(self._names)}
+
+    def _write_meta(self, rows: int, names: int) -> None:
+        meta_path = os.path.join(self.path, "meta.json")
+        tmp = f"{meta_path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": FORMAT_VERSION, "rows": rows, "names": names,
+                       "columns": [list(c) for c in COLUMNS]}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, meta_path)
+
+    # ---- 写入 ----
+
+    def has_game(self, game_id: str) -> bool:
+        gid = int(game_id) if str(game_id).isdigit() else None
+        with self._lock:
+            return gid is None or gid in self._games or gid in self._pending_games
+
+    def add_game(self, lines: Dict) -> bool:
+        """缓冲一场完赛比赛的全部球员数据（nba_boxscore.player_lines 的结果），已存在的 gameId 跳过"""
+        gid_str = str(lines.get("gameId") or "")
+        if not gid_str.isdigit() or not lines.get("rows"):
+            return False
+        gid = int(gid_str)
+        with self._lock:
+            if gid in self._games or gid in self._pending_games:
+                return False
+            self._pending_games.add(gid)
+            date = int(lines["date"])
+            for team_id, opp_id, home, person_id, name, seconds, *stats in lines["rows"]:
+                idx = self._name_index.get(name)
+                if idx is None:
+                    idx = self._name_index[name] = len(self._names)
+                    self._names.append(name)
+                self._buffer.append((gid, date, team_id, opp_id, home, person_id, idx, seconds, *stats))
+            full = len(self._buffer) >= FLUSH_ROWS
+        if full:
+            self.flush()
+        return True
+
+    def flush(self) -> int:
+        """把缓冲追加写盘，返回写入行数（先写各列和名字表，最后更新 meta.json 提交）"""
+        with self._lock:
+            if not self._buffer:
+                return 0
+            buffer, self._buffer = self._buffer, []
+            table = np.array(buffer, dtype=np.int64)
+            for i, (name, dtype) in enumerate(COLUMNS):
+                with open(self._col_path(name), "ab") as f:
+                    f.write(table[:, i].astype(dtype).tobytes())
+            with open(os.path.join(self.path, "names.txt"), "a", encoding="utf-8") as f:
+                f.write("".join(f"{n}\n" for n in self._names[self._committed_names:]))
+            self._committed_names = len(self._names)
+            self.rows += len(buffer)
+            self._write_meta(self.rows, len(self._names))
+            self.added_games += len(self._pending_games)
+            self.added_rows += len(buffer)
+            self._games |= self._pending_games
+            self._pending_games = set()
+            self._maps = None
+            return len(buffer)
+
+    # ---- 读取 ----
+
+    def column(self, name: str) -> "np.ndarray":
+        """已写盘的一列（内存映射，只读）"""
+        with self._lock:
+            if self._maps is None:
+                self._maps = {}
+            arr = self._maps.get(name)
+            if arr is None:
+                dtype = dict(COLUMNS)[name]
+                arr = (np.memmap(self._col_path(name), dtype=dtype, mode="r", shape=(self.rows,))
+                       if self.rows else np.empty(0, dtype=dtype))
+                self._maps[name] = arr
+            return arr
+
+    def name(self, index: int) -> str:
+        return self._names[index]
+
+    def _mask(self, start: Optional[str], end: Optional[str], team_id: Optional[int] = None) -> "np.ndarray":
+        date = self.column("date")
+        mask = np.ones(len(date), dtype=bool)
+        if start:
+            mask &= date >= _date_int(start)
+        if end:
+            mask &= date <= _date_int(end)
+        if team_id is not None:
+            mask &= self.column("teamId") == team_id
+        return mask
+
+    def _latest_names(self, persons: "np.ndarray", inverse: "np.ndarray", names: "np.ndarray") -> "np.ndarray":
+        # 每名球员取最后一行的名字（按行号取最大，结果确定）
+        last = np.full(len(persons), -1, dtype=np.int64)
+        np.maximum.at(last, inverse, np.arange(len(inverse)))
+        return names[last]
+
+    def leaders(self, stat: str, start: Optional[str] = None, end: Optional[str] = None, k: int = 10,
+                per_game: bool = False, min_games: int = 1, team_id: Optional[int] = None) -> List[Dict]:
+        """
+        日期区间（默认全部）内某项统计的前 k 名：累计或场均（per_game）。
+        stat 为数据王统计项（points / rebounds ...）或列名（reboundsTotal、turnovers ...）
+        """
+        column = LEADER_STATS[stat].cdn_key if stat in LEADER_STATS else stat
+        if column not in STAT_COLUMNS:
+            raise KeyError(f"未知统计项: {stat}")
+        mask = self._mask(start, end, team_id)
+        persons, inverse = np.unique(self.column("personId")[mask], return_inverse=True)
+        if not len(persons):
+            return []
+        games = np.bincount(inverse, minlength=len(persons))
+        totals = np.bincount(inverse, weights=self.column(column)[mask], minlength=len(persons))
+        score = totals / games if per_game else totals
+        score = np.where(games >= min_games, score, -np.inf)
+        # 按数值降序，相同时按 personId 升序
+        order = np.lexsort((persons, -score))[:k]
+        order = order[np.isfinite(score[order])]
+        names = self._latest_names(persons, inverse, self.column("name")[mask])
+        return [{"personId": int(persons[i]), "name": self.name(int(names[i])), "games": int(games[i]),
+                 "total": int(totals[i]), "perGame": round(float(totals[i] / games[i]), 2)} for i in order]
+
+    def team_averages(self, start: Optional[str] = None, end: Optional[str] = None) -> List[Dict]:
+        """各队场均（全队球员单场数据相加后按比赛场数平均），按 teamId 排序"""
+        mask = self._mask(start, end)
+        teams, inverse = np.unique(self.column("teamId")[mask], return_inverse=True)
+        if not len(teams):
+            return []
+        # (球队, 比赛) 去重得到每队场数
+        pairs = np.unique(inverse.astype(np.int64) << 40 | self.column("gameId")[mask])
+        games = np.bincount(pairs >> 40, minlength=len(teams))
+        out = []
+        sums = {c: np.bincount(inverse, weights=self.column(c)[mask], minlength=len(teams)) for c in STAT_COLUMNS}
+        for i, team in enumerate(teams):
+            row = {"teamId": int(team), "games": int(games[i])}
+            row.update({c: round(float(sums[c][i] / games[i]), 2) for c in STAT_COLUMNS})
+            out.append(row)
+        return out
+
+    def player_splits(self, person_id: int, start: Optional[str] = None, end: Optional[str] = None) -> Dict:
+        """单名球员的场均：全部、主场 / 客场、按月"""
+        mask = self._mask(start, end) & (self.column("personId") == person_id)
+        if not mask.any():
+            return {"personId": person_id, "splits": {}}
+        idx = np.flatnonzero(mask)
+        stats = {c: self.column(c)[idx] for c in ("seconds",) + STAT_COLUMNS}
+        groups = {
+            "all": np.zeros(len(idx), dtype=np.int64),
+            "home": self.column("home")[idx].astype(np.int64),
+            "month": self.column("date")[idx].astype(np.int64) // 100,
+        }
+        splits: Dict[str, Dict] = {}
+        for split, keys in groups.items():
+            values, inverse = np.unique(keys, return_inverse=True)
+            games = np.bincount(inverse, minlength=len(values))
+            sums = {c: np.bincount(inverse, weights=v, minlength=len(values)) for c, v in stats.items()}
+            for i, value in enumerate(values):
+                if split == "all":
+                    label = "all"
+                elif split == "home":
+                    label = "home" if value else "away"
+                else:
+                    label = f"{value // 100:04d}-{value % 100:02d}"
+                row = {"games": int(games[i]), "minutes": round(float(sums["seconds"][i] / games[i] / 60), 1)}
+                row.update({c: round(float(sums[c][i] / games[i]), 2) for c in STAT_COLUMNS})
+                splits[label] = row
+        return {"personId": person_id, "name": self.name(int(self.column("name")[idx[-1]])), "splits": splits}
+
+    def info(self) -> Dict:
+        date = self.column("date")
+        return {"rows": self.rows, "games": len(self._games), "players": len(np.unique(self.column("personId"))),
+                "firstDate": _date_str(int(date.min())) if len(date) else None,
+                "lastDate": _date_str(int(date.max())) if len(date) else None}
+
+
+def ingest_payloads(store: PlayerLineStore, payloads: Iterable[bytes]) -> int:
+    """导入一批 CDN boxscore 原始响应体中的完赛比赛，返回新增场数"""
+    from nba_boxscore import extract_cdn_boxscore_game, player_lines
+
+    added = 0
+    for body in payloads:
+        try:
+            game = extract_cdn_boxscore_game(nba_json.loads(body))
+        except ValueError:
+            continue
+        if game is None or store.has_game(str(game.get("gameId") or "")):
+            continue
+        lines = player_lines(game)
+        if lines is not None and store.add_game(lines):
+            added += 1
+    store.flush()
+    return added
+
+
+def _cache_dir() -> str:
+    # 与 nba_scraper 的 CACHE_DIR 一致（不导入抓取器）
+    return os.getenv("NBA_CACHE_DIR", "").strip() or os.path.join(os.path.expanduser("~"), ".cache", "nba_scraper")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="球员单场数据列式存储：查询 / 从原始响应归档导入")
+    parser.add_argument("--store", default=None, help="存储目录（默认 NBA_PLAYER_STORE_DIR 或 NBA_CACHE_DIR/player_lines）")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("leaders", help="某项统计的前 k 名")
+    p.add_argument("stat", help="points / rebounds / assists / steals / blocks / threes / plusMinus 或列名")
+    p.add_argument("-k", type=int, default=10)
+    p.add_argument("--per-game", action="store_true", help="按场均排序（默认按累计）")
+    p.add_argument("--min-games", type=int, default=1)
+    p.add_argument("--team", type=int, default=None, help="只看某支球队（teamId）")
+    p = sub.add_parser("teams", help="各队场均")
+    p = sub.add_parser("player", help="单名球员的场均与主客场 / 按月拆分")
+    p.add_argument("person_id", type=int)
+    for p in sub.choices.values():
+        p.add_argument("--start", default=None, help="开始日期（美东，YYYY-MM-DD）")
+        p.add_argument("--end", default=None, help="结束日期（美东，YYYY-MM-DD）")
+    p = sub.add_parser("ingest-archive", help="从原始响应归档导入已归档的完赛 CDN boxscore")
+    p.add_argument("--archive", default=None, help="归档路径（默认 NBA_ARCHIVE_PATH 或 NBA_CACHE_DIR/payload_archive.sqlite3）")
+    sub.add_parser("info", help="存储概况")
+    args = parser.parse_args(argv)
+
+    try:
+        store = PlayerLineStore(args.store or os.getenv("NBA_PLAYER_STORE_DIR", "").strip()
+                                or os.path.join(_cache_dir(), "player_lines"))
+    except (RuntimeError, ValueError) as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    if args.command == "leaders":
+        if args.stat not in LEADER_STATS and args.stat not in STAT_COLUMNS:
+            parser.error(f"未知统计项: {args.stat}（可选: {', '.join(list(LEADER_STATS) + list(STAT_COLUMNS))}）")
+        result = store.leaders(args.stat, args.start, args.end, args.k, args.per_game, args.min_games, args.team)
+    elif args.command == "teams":
+        result = store.team_averages(args.start, args.end)
+    elif args.command == "player":
+        result = store.player_splits(args.person_id, args.start, args.end)
+    elif args.command == "ingest-archive":
+        from nba_archive import PayloadArchive
+
+        archive = PayloadArchive(args.archive or os.getenv("NBA_ARCHIVE_PATH", "").strip()
+                                 or os.path.join(_cache_dir(), "payload_archive.sqlite3"))
+        added = ingest_payloads(store, (body for _, status, body in archive.iter_latest("%/boxscore/boxscore_%")
+                                        if status == 200))
+        result = {"addedGames": added, **store.info()}
+    else:
+        result = store.info()
+    print(nba_json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按比赛状态自适应的刷新调度
+根据每场比赛的状态和开赛时间计算下一次需要刷新的时间：
+- 进行中：每隔几秒刷新
+- 未开赛：离开赛越近刷新越频繁（开赛前逐步加密）
+- 已完赛且数据定型：永不刷新
+一天的下次刷新时间取当天所有比赛中最早的一个；刷新周期里只请求已到期的资源。
+"""
+
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+import nba_json
+from nba_game_store import is_final_match
+from nba_model import match_from_dict
+
+NY_TZ = ZoneInfo("America/New_York")
+
+# 进行中的比赛刷新间隔（秒）
+LIVE_INTERVAL = 15
+# 未开赛比赛：最长刷新间隔、开赛前最短刷新间隔
+UPCOMING_MAX_INTERVAL = 3600
+UPCOMING_MIN_INTERVAL = 30
+# 开赛前的加密系数：刷新间隔 = 距开赛时间 / PRE_TIP_RAMP_DIVISOR
+PRE_TIP_RAMP_DIVISOR = 6
+# 开赛时间未知（TBD）的未开赛比赛
+UNKNOWN_TIP_INTERVAL = 1800
+# 已完赛但数据尚未定型（boxscore 暂缺等）
+UNSETTLED_FINAL_INTERVAL = 300
+# 当天没有比赛
+EMPTY_DAY_INTERVAL = 600
+# 抓取失败（所有来源都没有返回赛程）后的重试间隔，连续失败时翻倍，最长 EMPTY_DAY_INTERVAL
+FAILED_DAY_RETRY = 15
+
+
+def tip_off_timestamp(m: Dict) -> Optional[float]:
+    """由比赛数据的美东日期 + HH:MM 时间推算开赛时间戳，无法解析（TBD/状态文字）时返回 None"""
+    try:
+        et = datetime.strptime(f"{m.get('date')} {m.get('time')}", "%Y-%m-%d %H:%M")
+    except (TypeError, ValueError):
+        return None
+    return et.replace(tzinfo=NY_TZ).timestamp()
+
+
+def next_game_due(m: Dict, now: float) -> Optional[float]:
+    """计算单场比赛的下次刷新时间戳，None 表示永不需要刷新"""
+    status = m.get("status")
+    if status == "live":
+        return now + LIVE_INTERVAL
+    if status == "finished":
+        return None if is_final_match(m) else now + UNSETTLED_FINAL_INTERVAL
+    tip = tip_off_timestamp(m)
+    if tip is None:
+        return now + UNKNOWN_TIP_INTERVAL
+    until_tip = tip - now
+    if until_tip <= 0:
+        # 已过预定开赛时间但尚未开始（延迟开赛）
+        return now + UPCOMING_MIN_INTERVAL
+    interval = min(UPCOMING_MAX_INTERVAL, max(
+        UPCOMING_MIN_INTERVAL, until_tip / PRE_TIP_RAMP_DIVISOR))
+    # 保证开赛前一刻至少刷新一次
+    return min(now + interval, max(now + UPCOMING_MIN_INTERVAL, tip - UPCOMING_MIN_INTERVAL))
+
+
+class RefreshScheduler:
+    """
+    记录每天/每场比赛的下次刷新时间以及上次抓取到的比赛数据。
+    state_path 不为 None 时持久化到磁盘，供单次运行（cron）之间共享。
+    """
+
+    def __init__(self, state_path: Optional[str] = None):
+        self.state_path = state_path
+        # {day_key: {"nextDue": ts|None, "games": {gameId: ts|None}, "matches": [...]|None, ["failures": n]}}
+        self.days: Dict[str, Dict] = {}
+        self._load()
+
+    def _load(self) -> None:
+        if not self.state_path:
+            return
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data.get("days"), dict):
+                self.days = data["days"]
+                for day in self.days.values():
+                    if isinstance(day.get("matches"), list):
+                        day["matches"] = [match_from_dict(m) if isinstance(m, dict) else m for m in day["matches"]]
+                        # 已定型的一天里有比赛不再算定型（数据王配置改变）：立即重新抓取
+                        if day.get("nextDue") is None and not all(
+                                next_game_due(m, 0.0) is None for m in day["matches"]):
+                            day["nextDue"] = 0.0
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    def save(self) -> None:
+        if not self.state_path:
+            return
+        tmp = f"{self.state_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+            with open(tmp, "wb") as f:
+                f.write(nba_json.dumps_bytes({"days": self.days}))
+            os.replace(tmp, self.state_path)
+        except OSError as e:
+            print(f"刷新调度状态保存失败: {e}", file=sys.stderr)
+
+    def day_is_due(self, day_key: str, now: float) -> bool:
+        """这一天是否需要重新请求；从未抓取过的日期总是到期（抓取失败后的重试等待期间除外）"""
+        day = self.days.get(day_key)
+        if day is None:
+            return True
+        next_due = day.get("nextDue")
+        if day.get("matches") is None:
+            return next_due is None or next_due <= now
+        return next_due is not None and next_due <= now
+
+    def previous_matches(self, day_key: str) -> Optional[List[Dict]]:
+        """上次抓取到的当天比赛数据"""
+        day = self.days.get(day_key)
+        return None if day is None else day.get("matches")
+
+    def reusable_games(self, day_key: str, now: float) -> Dict[str, Dict]:
+        """当天尚未到期的进行中/完赛比赛：本轮沿用上次的球员数据，不再请求 boxscore"""
+        day = self.days.get(day_key) or {}
+        games = day.get("games") or {}
+        out: Dict[str, Dict] = {}
+        for m in day.get("matches") or []:
+            gid = str(m.get("id"))
+            due = games.get(gid)
+            if m.get("status") in ("live", "finished") and due is not None and due > now:
+                out[gid] = m
+        return out
+
+    def update_day(self, day_key: str, matches: List[Dict], now: float) -> None:
+        """记录本轮抓取结果并计算当天及每场比赛的下次刷新时间"""
+        games = {str(m.get("id")): next_game_due(m, now) for m in matches}
+        if not matches:
+            next_due: Optional[float] = now + EMPTY_DAY_INTERVAL
+        else:
+            dues = [d for d in games.values() if d is not None]
+            next_due = min(dues) if dues else None
+        self.days[day_key] = {"nextDue": next_due, "games": games, "matches": matches}
+
+    def mark_failed(self, day_key: str, now: float) -> None:
+        """
+        本轮抓取失败：保留上次的比赛数据和每场比赛的刷新时间（不当作没有比赛的一天），
+        FAILED_DAY_RETRY 秒后重试，连续失败时退避
+        """
+        day = self.days.get(day_key) or {"games": {}, "matches": None}
+        failures = int(day.get("failures") or 0) + 1
+        retry = min(EMPTY_DAY_INTERVAL, FAILED_DAY_RETRY * 2 ** (failures - 1))
+        self.days[day_key] = {**day, "nextDue": now + retry, "failures": failures}
+
+    def prune(self, keep_days: List[str]) -> None:
+        """丢弃窗口之外的日期"""
+        keep = set(keep_days)
+        for day_key in list(self.days):
+            if day_key not in keep:
+                del self.days[day_key]
+
+    def seconds_until_next_due(self, now: Optional[float] = None) -> Optional[float]:
+        """距离最近一次到期还有多少秒；没有任何待刷新资源时返回 None"""
+        now = time.time() if now is None else now
+        dues = [d.get("nextDue") for d in self.days.values() if d.get("nextDue") is not None]
+        if not dues:
+            return None
+        return max(0.0, min(dues) - now)
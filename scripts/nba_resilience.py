@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+抓取层的容错策略（按主机）
+- 令牌桶限速：避免并发的日期/boxscore 请求同时打到同一个主机
+- 429/5xx/网络错误：指数退避 + 全抖动重试（优先遵守 Retry-After）
+- 熔断器：连续失败达到阈值后打开，冷却期内直接失败，不再等待超时；冷却后放行一个探测请求
+- 连接超时与读取超时分开设置，每次请求（含重试）的总耗时不超过调用方给出的 timeout
+"""
+
+import asyncio
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+class HostPolicy(NamedTuple):
+    """单个主机的容错参数"""
+    rate: float              # 令牌桶：每秒请求数
+    burst: int               # 令牌桶：突发容量
+    connect_timeout: float   # 建立连接超时（秒）
+    read_timeout: float      # 单次尝试的读取超时（秒）
+    max_retries: int         # 最多重试次数（不含首次）
+    failure_threshold: int   # 连续失败多少次打开熔断器
+    cooldown: float          # 熔断打开后的冷却时间（秒）
+
+
+DEFAULT_POLICY = HostPolicy(10.0, 10, 3.0, 15.0, 2, 5, 30.0)
+
+HOST_POLICIES: Dict[str, HostPolicy] = {
+    "cdn.nba.com": HostPolicy(50.0, 50, 3.0, 10.0, 2, 5, 30.0),
+    # stats.nba.com 经常直接挂起或拦截：读取超时更短、少重试、更快熔断、冷却更久
+    "stats.nba.com": HostPolicy(2.0, 4, 3.0, 8.0, 1, 3, 120.0),
+    "site.web.api.espn.com": HostPolicy(5.0, 10, 3.0, 10.0, 2, 5, 60.0),
+}
+
+# 需要重试（并计入熔断失败）的状态码
+RETRY_STATUS = frozenset({429, 500, 502, 503, 504})
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 4.0
+
+
+class CircuitOpenError(Exception):
+    """熔断器打开，请求未发出"""
+
+    def __init__(self, host: str, retry_in: float):
+        super().__init__(f"{host} 熔断中，{retry_in:.0f}s 后重试")
+        self.host = host
+        self.retry_in = retry_in
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """第 attempt 次重试前的等待时间：有 Retry-After 时遵守，否则为全抖动指数退避"""
+    if retry_after is not None:
+        return max(0.0, retry_after)
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+
+
+def _retry_after(resp: Any) -> Optional[float]:
+    """解析 Retry-After（只支持秒数形式）"""
+    if resp is None:
+        return None
+    headers = getattr(resp, "headers", None) or {}
+    value = headers.get("Retry-After") or headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class TokenBucket:
+    """令牌桶：令牌不足时按到达顺序排队等待（令牌可以为负，表示已被预约）"""
+
+    def __init__(self, rate: float, burst: int, clock: Callable[[], float] = time.monotonic):
+        self.rate = max(rate, 1e-6)
+        self.burst = max(1, burst)
+        self.clock = clock
+        self.tokens = float(self.burst)
+        self.updated = clock()
+
+    def reserve(self) -> float:
+        """取一个令牌，返回需要等待的秒数"""
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    async def acquire(self) -> None:
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class CircuitBreaker:
+    """closed -> (连续失败) -> open -> (冷却) -> half_open（放行一个探测请求）-> closed / open"""
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int, cooldown: float, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def allow(self) -> bool:
+        if self.state == self.OPEN:
+            if self.clock() < self.opened_at + self.cooldown:
+                return False
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN:
+            if self._probing:
+                return False
+            self._probing = True
+        return True
+
+    def retry_in(self) -> float:
+        return max(0.0, self.opened_at + self.cooldown - self.clock())
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = self.clock()
+        self._probing = False
+
+    def abandon(self) -> None:
+        """请求被取消或未发出：不计成功也不计失败，只释放探测名额"""
+        self._probing = False
+
+
+class HostGuard:
+    """单个主机的限速器 + 熔断器 + 计数"""
+
+    def __init__(self, policy: HostPolicy):
+        self.policy = policy
+        self.bucket = TokenBucket(policy.rate, policy.burst)
+        self.breaker = CircuitBreaker(policy.failure_threshold, policy.cooldown)
+        self.attempts = 0
+        self.retries = 0
+        self.failures = 0
+        self.short_circuits = 0
+
+
+class ResilienceLayer:
+    """按主机应用限速、重试和熔断；send(timeout) 负责真正发出一次请求，timeout 为 (连接超时, 读取超时)"""
+
+    def __init__(self, policies: Optional[Dict[str, HostPolicy]] = None, default: HostPolicy = DEFAULT_POLICY):
+        self.policies = HOST_POLICIES if policies is None else policies
+        self.default = default
+        self.guards: Dict[str, HostGuard] = {}
+
+    def guard(self, host: str) -> HostGuard:
+        g = self.guards.get(host)
+        if g is None:
+            g = self.guards[host] = HostGuard(self.policies.get(host, self.default))
+        return g
+
+    async def request(self, url: str, send: Callable[[Tuple[float, float]], Awaitable[Any]], timeout: float) -> Any:
+        host = urlsplit(url).hostname or ""
+        g = self.guard(host)
+        policy = g.policy
+        deadline = time.monotonic() + timeout
+        attempt = 0
+        while True:
+            if not g.breaker.allow():
+                g.short_circuits += 1
+                raise CircuitOpenError(host, g.breaker.retry_in())
+            await g.bucket.acquire()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                g.breaker.abandon()
+                raise asyncio.TimeoutError(f"{host} 请求超出时间预算 {timeout:.0f}s")
+            read_timeout = min(policy.read_timeout, remaining)
+            connect_timeout = min(policy.connect_timeout, read_timeout)
+            # 连接/读取超时只限制单次 IO（服务器慢速吐数据时不会触发），外层再给整次尝试一个硬上限
+            attempt_budget = min(remaining, connect_timeout + read_timeout)
+            g.attempts += 1
+            resp, error = None, None
+            try:
+                resp = await asyncio.wait_for(send((connect_timeout, read_timeout)), attempt_budget)
+            except asyncio.CancelledError:
+                g.breaker.abandon()
+                raise
+            except asyncio.TimeoutError:
+                error = asyncio.TimeoutError(f"{host} 请求超时（{attempt_budget:.0f}s）")
+            except Exception as e:
+                error = e
+            if error is None and resp.status_code not in RETRY_STATUS:
+                g.breaker.record_success()
+                return resp
+            g.failures += 1
+            g.breaker.record_failure()
+            delay = backoff_delay(attempt, _retry_after(resp))
+            if (attempt >= policy.max_retries or g.breaker.state == CircuitBreaker.OPEN
+                    or time.monotonic() + delay >= deadline):
+                if error is not None:
+                    raise error
+                return resp
+            attempt += 1
+            g.retries += 1
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Dict]:
+        """{host: {attempts, retries, failures, shortCircuits, state}}"""
+        return {
+            host: {"attempts": g.attempts, "retries": g.retries, "failures": g.failures,
+                   "shortCircuits": g.short_circuits, "state": g.breaker.state}
+            for host, g in self.guards.items()
+        }
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+stats.nba.com resultSets 解码
+把 {name, headers, rowSet} 结构转成按列名访问的表，并按需为关键列建立哈希索引，
+GameHeader / LineScore / PlayerStats 之间的关联查询都是 O(1)。
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+class ResultSet:
+    """单个 resultSet：列名 -> 下标映射 + 按列组合懒加载的哈希索引"""
+    __slots__ = ("name", "headers", "rows", "columns", "_indexes")
+
+    def __init__(self, name: str, headers: Sequence[str], rows: Sequence[Sequence]):
+        self.name = name
+        self.headers = list(headers)
+        self.rows = rows
+        # 列名重复时以第一次出现为准（与 list.index 一致）
+        self.columns: Dict[str, int] = {}
+        for i, col in enumerate(self.headers):
+            self.columns.setdefault(col, i)
+        self._indexes: Dict[Tuple[str, ...], Dict[Tuple, List[Sequence]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def col(self, name: str) -> int:
+        """列下标，不存在时返回 -1"""
+        return self.columns.get(name, -1)
+
+    def has(self, *names: str) -> bool:
+        return all(n in self.columns for n in names)
+
+    def get(self, row: Sequence, name: str, default: Any = None) -> Any:
+        """按列名取值，列不存在时返回 default"""
+        i = self.columns.get(name, -1)
+        return row[i] if i != -1 else default
+
+    def index(self, *key_columns: str) -> Dict[Tuple, List[Sequence]]:
+        """按若干列建立（并缓存）哈希索引：{(值1, 值2, ...): [行, ...]}，行保持原顺序"""
+        idx = self._indexes.get(key_columns)
+        if idx is None:
+            positions = [self.columns[c] for c in key_columns]
+            idx = {}
+            for row in self.rows:
+                idx.setdefault(tuple(row[p] for p in positions), []).append(row)
+            self._indexes[key_columns] = idx
+        return idx
+
+    def lookup(self, key_columns: Tuple[str, ...], key: Tuple) -> Optional[Sequence]:
+        """按索引取第一条匹配行，没有时返回 None；关键列不存在时同样返回 None"""
+        if not self.has(*key_columns):
+            return None
+        try:
+            rows = self.index(*key_columns).get(tuple(key))
+        except TypeError:
+            # 值不可哈希，按不匹配处理
+            return None
+        return rows[0] if rows else None
+
+
+def decode_result_sets(data: Any) -> Dict[str, ResultSet]:
+    """
+    解析响应中的 resultSets（list）或 resultSet（dict）为 {name: ResultSet}；
+    同名 resultSet 以第一次出现为准。
+    """
+    if not isinstance(data, dict):
+        return {}
+    blocks: Iterable = data.get("resultSets") or data.get("resultSet") or []
+    if isinstance(blocks, dict):
+        blocks = [blocks]
+    out: Dict[str, ResultSet] = {}
+    for block in blocks:
+        if not isinstance(block, dict):
+            continue
+        name = block.get("name")
+        if not name or name in out:
+            continue
+        out[name] = ResultSet(name, block.get("headers") or [], block.get("rowSet") or [])
+    return out
@@ -5,14 +5,50 @@ NBA数据爬虫
 从NBA官网获取比赛赛程和比分数据
 """
 
-import json
+import argparse
 import sys
 import os
+import asyncio
+import sqlite3
+import threading
+import time
 import requests
+from requests.adapters import HTTPAdapter
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
-from typing import List, Dict, Optional
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import AsyncIterator, Awaitable, Callable, List, Dict, Optional, NamedTuple, Tuple
+from urllib.parse import urlsplit
+
+try:
+    import httpx
+except ImportError:  # 未安装 httpx 时回退到 requests 连接池
+    httpx = None
+
+try:
+    import h2  # noqa: F401  httpx 的 HTTP/2 支持依赖 h2
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+from nba_http_cache import HttpCache
+from nba_game_store import FinishedGameStore, LEADER_KEYS, is_final_match
+from nba_daemon import SnapshotDaemon
+from nba_refresh_scheduler import RefreshScheduler
+from nba_change_feed import ChangeFeed
+from nba_leaders import cdn_team_leaders, configured_leader_fields, configured_leader_stats, leader_field, stats_game_leaders
+from nba_resultsets import decode_result_sets
+from nba_resilience import RETRY_STATUS, ResilienceLayer
+from nba_archive import PayloadArchive
+from nba_boxscore import BoxscoreParsePool, parse_cdn_boxscore, to_int_or_none as _to_int_or_none
+from nba_player_store import PlayerLineStore
+from nba_db_sink import DB_ERRORS, MatchSink
+from nba_pbp import PlayByPlayCursors
+from nba_metrics import Metrics
+from nba_identity import IdentityRegistry
+from nba_model import Match, PlayerLine, make_match, player_line
+from nba_backfill import (BackfillCheckpoint, DEFAULT_BACKFILL_CONCURRENCY, DayFetchError, et_date_range,
+                          parse_et_date, run_backfill)
+import nba_json
 
 # NBA球队ID到中文名称的映射
 TEAM_ID_TO_CHINESE = {
@@ -84,807 +120,2039 @@ TEAM_NAME_TO_CHINESE = {
 }
 
 
+# NBA球队ID到三字母缩写的映射
+TEAM_ID_TO_TRICODE = {
+    1610612737: 'ATL', 1610612738: 'BOS', 1610612739: 'CLE', 1610612740: 'NOP', 1610612741: 'CHI',
+    1610612742: 'DAL', 1610612743: 'DEN', 1610612744: 'GSW', 1610612745: 'HOU', 1610612746: 'LAC',
+    1610612747: 'LAL', 1610612748: 'MIA', 1610612749: 'MIL', 1610612750: 'MIN', 1610612751: 'BKN',
+    1610612752: 'NYK', 1610612753: 'ORL', 1610612754: 'IND', 1610612755: 'PHI', 1610612756: 'PHX',
+    1610612757: 'POR', 1610612758: 'SAC', 1610612759: 'SAS', 1610612760: 'OKC', 1610612761: 'TOR',
+    1610612762: 'UTA', 1610612763: 'MEM', 1610612764: 'WAS', 1610612765: 'DET', 1610612766: 'CHA'
+}
+
+_identity_registry: Optional[IdentityRegistry] = None
+_identity_registry_lock = threading.Lock()
+
+
+def get_identity_registry() -> IdentityRegistry:
+    """
+    全局共享的球队/球员身份注册表（懒加载），持久化到 NBA_CACHE_DIR/identity_registry.json；
+    NBA_IDENTITY_REGISTRY=0 时只在内存中使用
+    """
+    global _identity_registry
+    if _identity_registry is not None:
+        return _identity_registry
+    with _identity_registry_lock:
+        if _identity_registry is None:
+            path = os.path.join(CACHE_DIR, "identity_registry.json") if _env_flag(
+                "NBA_IDENTITY_REGISTRY", True) else None
+            _identity_registry = IdentityRegistry(
+                ((tid, TEAM_ID_TO_TRICODE[tid], zh) for tid, zh in TEAM_ID_TO_CHINESE.items()),
+                TEAM_NAME_TO_CHINESE, path)
+    return _identity_registry
+
+
+def _save_identity_registry() -> None:
+    if _identity_registry is not None:
+        _identity_registry.save()
+
+
 def get_chinese_team_name(team_id: Optional[int], english_name: Optional[str]) -> str:
-    """将英文球队名称转换为中文"""
-    if team_id and team_id in TEAM_ID_TO_CHINESE:
-        return TEAM_ID_TO_CHINESE[team_id]
-    if english_name and english_name in TEAM_NAME_TO_CHINESE:
-        return TEAM_NAME_TO_CHINESE[english_name]
-    # 尝试部分匹配
-    if english_name:
-        for en, zh in TEAM_NAME_TO_CHINESE.items():
-            if en in english_name or english_name in en:
-                return zh
-    return english_name or '未知球队'
+    """将英文球队名称（或球队ID、三字母缩写）转换为中文"""
+    return get_identity_registry().team_chinese_name(team_id, english_name)
 
 
-def fetch_nba_schedule_for_date(date_offset: int) -> List[Dict]:
-    """获取指定日期的NBA赛程（优先使用cdn.nba.com官方JSON，更稳定）"""
-    # ✅ 按官网口径：以美东(ET)作为“日期分组/今天”的基准
-    ny_tz = ZoneInfo("America/New_York")
-    base_et = datetime.now(ny_tz) + timedelta(days=date_offset)
-    yyyymmdd = base_et.strftime("%Y%m%d")
-
-    def _fetch_with_cdn_scoreboard(yyyymmdd_str: str) -> List[Dict]:
-        url = f"https://cdn.nba.com/static/json/liveData/scoreboard/scoreboard_{yyyymmdd_str}.json"
-        headers = {
-            # CDN也可能做了简单的反爬校验，这里尽量模拟浏览器请求头
-            "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
-            "Accept": "application/json, text/plain, */*",
-            "Accept-Language": "en-US,en;q=0.9",
-            "Origin": "https://www.nba.com",
-            "Referer": "https://www.nba.com/games",
-            "Connection": "keep-alive"
-        }
-        debug = os.getenv("NBA_DEBUG", "").strip() in (
-            "1", "true", "TRUE", "yes", "YES")
-
-        def _fetch_cdn_boxscore(game_id: str) -> Optional[Dict]:
-            """
-            从NBA CDN获取单场比赛 boxscore（包含球员统计）。
-            参考：https://cdn.nba.com/static/json/liveData/boxscore/boxscore_{gameId}.json
-            返回值通常为 data["game"]（含 homeTeam/awayTeam/players 等）
-            """
-            if not game_id:
+# ===== HTTP 连接层：全进程共享一个带连接池的 Session =====
+# 所有上游请求（CDN / stats.nba.com / ESPN）都走这里，复用 DNS/TCP/TLS 连接
+
+# cdn.nba.com 的浏览器请求头（CDN也可能做了简单的反爬校验，这里尽量模拟浏览器请求头）
+CDN_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
+    "Accept": "application/json, text/plain, */*",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Origin": "https://www.nba.com",
+    "Referer": "https://www.nba.com/games",
+    "Connection": "keep-alive"
+}
+
+# stats.nba.com 的浏览器请求头（校验更严格，需要带 sec-* 系列）
+STATS_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Referer': 'https://www.nba.com/',
+    'Origin': 'https://www.nba.com',
+    'Accept': 'application/json, text/plain, */*',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Connection': 'keep-alive',
+    'Cache-Control': 'no-cache',
+    'sec-ch-ua': '"Not_A Brand";v="8", "Chromium";v="120", "Google Chrome";v="120"',
+    'sec-ch-ua-mobile': '?0',
+    'sec-ch-ua-platform': '"Windows"',
+    'sec-fetch-dest': 'empty',
+    'sec-fetch-mode': 'cors',
+    'sec-fetch-site': 'same-site',
+}
+
+# 每个上游主机的连接池大小：CDN 一次运行会并发拉多个 boxscore，其余主机请求较少
+HTTP_POOL_SIZES = {
+    "cdn.nba.com": 24,
+    "stats.nba.com": 4,
+    "site.web.api.espn.com": 4,
+}
+HTTP_DEFAULT_POOL_SIZE = 4
+
+
+def _env_int(name: str, default: int) -> int:
+    """读取整数环境变量，非法值回退到默认值"""
+    try:
+        return int(os.getenv(name, "").strip() or default)
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    """读取浮点数环境变量，非法值回退到默认值"""
+    try:
+        return float(os.getenv(name, "").strip() or default)
+    except ValueError:
+        return default
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    """读取布尔环境变量（1/true/yes 为真，0/false/no 为假）"""
+    v = os.getenv(name, "").strip().lower()
+    if v in ("1", "true", "yes", "on"):
+        return True
+    if v in ("0", "false", "no", "off"):
+        return False
+    return default
+
+
+# 单日 scoreboard 内并发拉取 boxscore 的上限（可用 NBA_BOXSCORE_CONCURRENCY 覆盖）
+BOXSCORE_CONCURRENCY = max(1, _env_int("NBA_BOXSCORE_CONCURRENCY", 8))
+
+_http_session: Optional[requests.Session] = None
+_http_session_lock = threading.Lock()
+
+# 异步连接统计：{host: {"requests": n, "streams": set(连接id)}}，由 httpx 传输层记录
+_async_conn_stats: Dict[str, Dict] = {}
+
+
+def get_http_session() -> requests.Session:
+    """获取全局共享的 Session（线程安全的懒加载，按主机单独挂载连接池）"""
+    global _http_session
+    if _http_session is not None:
+        return _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            session = requests.Session()
+            # 显式协商压缩，JSON 体积通常能缩小 5~10 倍
+            session.headers.update({
+                "Accept-Encoding": "gzip, deflate",
+                "Connection": "keep-alive",
+            })
+            default_adapter = HTTPAdapter(
+                pool_connections=len(HTTP_POOL_SIZES) + 1,
+                pool_maxsize=HTTP_DEFAULT_POOL_SIZE)
+            session.mount("https://", default_adapter)
+            session.mount("http://", default_adapter)
+            for host, size in HTTP_POOL_SIZES.items():
+                session.mount(f"https://{host}/", HTTPAdapter(
+                    pool_connections=1, pool_maxsize=size))
+            _http_session = session
+    return _http_session
+
+
+def http_get(url: str, headers: Optional[Dict] = None, timeout=20) -> requests.Response:
+    """通过共享连接池发起 GET 请求；timeout 可以是秒数或 (连接超时, 读取超时)"""
+    return get_http_session().get(url, headers=headers, timeout=timeout)
+
+
+def get_http_pool_stats() -> Dict[str, Dict[str, int]]:
+    """
+    统计各主机的连接复用情况。
+    返回 {host: {"requests": 请求数, "connections": 新建连接数, "reused": 复用次数}}
+    """
+    stats: Dict[str, Dict[str, int]] = {}
+    session = _http_session
+    adapters = list(session.adapters.values()) if session is not None else []
+    seen_adapters = set()
+    for adapter in adapters:
+        if id(adapter) in seen_adapters or not isinstance(adapter, HTTPAdapter):
+            continue
+        seen_adapters.add(id(adapter))
+        pools = adapter.poolmanager.pools
+        with pools.lock:
+            pool_list = list(pools._container.values())
+        for pool in pool_list:
+            entry = stats.setdefault(
+                pool.host, {"requests": 0, "connections": 0, "reused": 0})
+            entry["requests"] += pool.num_requests
+            entry["connections"] += pool.num_connections
+            entry["reused"] += max(0, pool.num_requests - pool.num_connections)
+    # 异步引擎（httpx）的统计：按响应所在的网络连接去重计数
+    for host, st in _async_conn_stats.items():
+        entry = stats.setdefault(
+            host, {"requests": 0, "connections": 0, "reused": 0})
+        entry["requests"] += st["requests"]
+        entry["connections"] += len(st["streams"])
+        entry["reused"] += max(0, st["requests"] - len(st["streams"]))
+    return stats
+
+
+def _print_http_pool_stats() -> None:
+    """把连接复用情况输出到 stderr"""
+    for host, st in sorted(get_http_pool_stats().items()):
+        total = st["requests"]
+        ratio = (st["reused"] / total * 100) if total else 0.0
+        print(
+            f"连接复用 {host}: 请求 {total} 次, 新建连接 {st['connections']} 个, 复用率 {ratio:.0f}%", file=sys.stderr)
+
+
+# ===== 异步抓取引擎：所有 scoreboard / boxscore / ESPN / stats 请求共享一个事件循环 =====
+
+# 全局并发上限（可用 NBA_MAX_CONCURRENCY 覆盖），约束整个多日抓取同时在途的请求数
+MAX_CONCURRENCY = max(1, _env_int("NBA_MAX_CONCURRENCY", 16))
+
+# 进程内指标：HTTP 延迟/状态码/流量、缓存命中、各阶段耗时与成功率（--metrics 输出，常驻模式 /metrics）
+METRICS = Metrics()
+
+# URL -> 指标中的 endpoint 标签（不含日期 / gameId，标签基数固定）
+_ENDPOINT_PATTERNS = (
+    ("/liveData/scoreboard/", "cdn_scoreboard"),
+    ("/liveData/boxscore/", "cdn_boxscore"),
+    ("/liveData/playbyplay/", "cdn_playbyplay"),
+    ("/stats/scoreboardV2", "stats_scoreboard"),
+    ("/stats/boxscoretraditionalv2", "stats_boxscore"),
+    ("espn.com/", "espn_scoreboard"),
+)
+
+
+def _endpoint_label(url: str) -> str:
+    return next((label for pattern, label in _ENDPOINT_PATTERNS if pattern in url), "other")
+
+# 上游重定向（基准测试 / 离线回放用）：设为 http://127.0.0.1:8800 时，
+# https://cdn.nba.com/a?b 实际请求 http://127.0.0.1:8800/cdn.nba.com/a?b；只在网络传输层改写，缓存、容错层和归档仍按原始 URL 处理
+UPSTREAM_OVERRIDE = os.getenv("NBA_UPSTREAM_OVERRIDE", "").strip().rstrip("/")
+
+
+def _upstream_url(url: str) -> str:
+    if not UPSTREAM_OVERRIDE:
+        return url
+    scheme, sep, rest = url.partition("://")
+    return f"{UPSTREAM_OVERRIDE}/{rest}" if sep else url
+
+
+# 本地缓存根目录（可用 NBA_CACHE_DIR 覆盖）
+CACHE_DIR = os.getenv("NBA_CACHE_DIR", "").strip() or os.path.join(
+    os.path.expanduser("~"), ".cache", "nba_scraper")
+
+# 条件请求缓存：只缓存 CDN liveData 下的 JSON（scoreboard / boxscore），总大小上限可用 NBA_HTTP_CACHE_MAX_MB 覆盖
+HTTP_CACHE_PREFIXES = ("https://cdn.nba.com/static/json/liveData/",)
+HTTP_CACHE_MAX_BYTES = max(1, _env_int("NBA_HTTP_CACHE_MAX_MB", 64)) * 1024 * 1024
+
+_http_cache: Optional[HttpCache] = None
+_http_cache_disabled = False
+
+
+def get_http_cache() -> Optional[HttpCache]:
+    """获取全局HTTP缓存；NBA_HTTP_CACHE=0 或缓存目录不可写时返回 None"""
+    global _http_cache, _http_cache_disabled
+    if _http_cache is not None or _http_cache_disabled:
+        return _http_cache
+    if not _env_flag("NBA_HTTP_CACHE", True):
+        _http_cache_disabled = True
+        return None
+    try:
+        _http_cache = HttpCache(os.path.join(CACHE_DIR, "http"),
+                                HTTP_CACHE_MAX_BYTES, HTTP_CACHE_PREFIXES)
+    except OSError as e:
+        print(f"HTTP缓存不可用，已禁用: {e}", file=sys.stderr)
+        _http_cache_disabled = True
+    return _http_cache
+
+
+_finished_store: Optional[FinishedGameStore] = None
+_finished_store_disabled = False
+_finished_store_lock = threading.Lock()
+
+
+def get_finished_store() -> Optional[FinishedGameStore]:
+    """获取已完赛比赛存储；NBA_FINISHED_STORE=0、回放模式或数据库不可用时返回 None"""
+    global _finished_store, _finished_store_disabled
+    if REPLAY_ENABLED:
+        # 回放是为了从原始响应重新生成结果，不能沿用之前生成的比赛数据
+        return None
+    if _finished_store is not None or _finished_store_disabled:
+        return _finished_store
+    with _finished_store_lock:
+        if _finished_store is None and not _finished_store_disabled:
+            if not _env_flag("NBA_FINISHED_STORE", True):
+                _finished_store_disabled = True
                 return None
-            box_url = f"https://cdn.nba.com/static/json/liveData/boxscore/boxscore_{game_id}.json"
             try:
-                resp = requests.get(box_url, headers=headers, timeout=15)
-                if resp.status_code != 200:
-                    if debug:
-                        print(
-                            f"boxscore请求失败: {resp.status_code} {box_url}", file=sys.stderr)
-                    return None
-                data = resp.json() or {}
-                # 绝大多数情况下是 { game: {...} }
-                if isinstance(data, dict) and isinstance(data.get("game"), dict):
-                    return data["game"]
-                # 兜底
-                return data if isinstance(data, dict) else None
-            except Exception as e:
-                if debug:
-                    print(f"boxscore请求异常: {e} {box_url}", file=sys.stderr)
-                return None
+                _finished_store = FinishedGameStore(
+                    os.path.join(CACHE_DIR, "finished_games.sqlite3"))
+            except (OSError, sqlite3.Error) as e:
+                print(f"已完赛比赛存储不可用，已禁用: {e}", file=sys.stderr)
+                _finished_store_disabled = True
+    return _finished_store
+
+
+def _store_finished_day(day_key: str, matches: List[Dict]) -> None:
+    """保存当天已定型的比赛；全部定型时记录整天，之后的运行不再请求这一天"""
+    store = get_finished_store()
+    if store is None or not matches:
+        return
+    try:
+        store.put_many(day_key, matches)
+        if all(is_final_match(m) for m in matches):
+            store.put_day(day_key, [str(m["id"]) for m in matches])
+    except sqlite3.Error as e:
+        print(f"已完赛比赛写入失败: {e}", file=sys.stderr)
 
-        print(f"正在尝试(CDN): {url}", file=sys.stderr)
-        resp = requests.get(url, headers=headers, timeout=20)
-        if resp.status_code != 200:
-            print(f"CDN请求失败: {resp.status_code}", file=sys.stderr)
-            return []
-        data = resp.json()
-        scoreboard = data.get("scoreboard") or {}
-        games = scoreboard.get("games") or []
-        out: List[Dict] = []
 
-        for g in games:
-            try:
-                game_id = str(g.get("gameId") or "")
-                if not game_id:
-                    continue
+def _load_finished_games(game_ids: List[str]) -> Dict[str, Dict]:
+    store = get_finished_store()
+    if store is None:
+        return {}
+    try:
+        found = store.get_many(game_ids)
+    except sqlite3.Error as e:
+        print(f"已完赛比赛读取失败: {e}", file=sys.stderr)
+        return {}
+    if found:
+        METRICS.inc("finished_store_total", len(found), scope="game", result="hit")
+    missed = len(set(filter(None, game_ids))) - len(found)
+    if missed > 0:
+        METRICS.inc("finished_store_total", missed, scope="game", result="miss")
+    return found
+
+
+# ===== 原始响应归档 / 离线回放 =====
+# NBA_ARCHIVE=1（或 --archive）：把每个上游响应压缩归档（按内容去重，按 URL + 时间索引）
+# NBA_REPLAY=1（或 --replay）：所有请求都从归档读取，不访问网络；NBA_REPLAY_AS_OF（或 --as-of）指定回放时刻，
+# 同时作为“今天”的基准，默认取每个 URL 最新的响应
+ARCHIVE_PATH = os.getenv("NBA_ARCHIVE_PATH", "").strip() or os.path.join(CACHE_DIR, "payload_archive.sqlite3")
+ARCHIVE_ENABLED = _env_flag("NBA_ARCHIVE", False)
+REPLAY_ENABLED = _env_flag("NBA_REPLAY", False)
+
+_payload_archive: Optional[PayloadArchive] = None
+_payload_archive_lock = threading.Lock()
+
+
+def parse_as_of(value: Optional[str]) -> Optional[float]:
+    """回放时刻：Unix 时间戳或 ISO 时间（不带时区时按美东时间）"""
+    value = (value or "").strip()
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    dt = datetime.fromisoformat(value)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=ZoneInfo("America/New_York"))
+    return dt.timestamp()
+
+
+try:
+    REPLAY_AS_OF: Optional[float] = parse_as_of(os.getenv("NBA_REPLAY_AS_OF"))
+except ValueError:
+    REPLAY_AS_OF = None
+
+
+def configure_archive(archive: bool = False, replay: bool = False, as_of: Optional[float] = None) -> None:
+    """开启归档 / 回放（命令行参数在环境变量之上叠加）"""
+    global ARCHIVE_ENABLED, REPLAY_ENABLED, REPLAY_AS_OF
+    ARCHIVE_ENABLED = ARCHIVE_ENABLED or archive
+    REPLAY_ENABLED = REPLAY_ENABLED or replay
+    if as_of is not None:
+        REPLAY_AS_OF = as_of
+
+
+def get_payload_archive() -> Optional[PayloadArchive]:
+    """归档或回放开启时返回共享的原始响应归档，否则返回 None"""
+    global _payload_archive
+    if not (ARCHIVE_ENABLED or REPLAY_ENABLED):
+        return None
+    if _payload_archive is None:
+        with _payload_archive_lock:
+            if _payload_archive is None:
+                _payload_archive = PayloadArchive(ARCHIVE_PATH)
+    return _payload_archive
+
+
+def _archive_response(archive: PayloadArchive, url: str, resp: "FetchResult", fetched_at: float) -> None:
+    # 限流/服务端错误是暂时的，不归档，回放时沿用之前正常的响应
+    if resp.status_code in RETRY_STATUS:
+        return
+    try:
+        archive.record(url, resp.status_code, resp.content, fetched_at)
+    except sqlite3.Error as e:
+        print(f"原始响应归档失败: {e}", file=sys.stderr)
+
+
+def _print_archive_stats() -> None:
+    archive = _payload_archive
+    if archive is None:
+        return
+    if archive.replay_hits or archive.replay_misses:
+        print(f"离线回放: 命中 {archive.replay_hits} 次, 归档中缺失 {archive.replay_misses} 次", file=sys.stderr)
+    if archive.stored or archive.deduped:
+        print(
+            f"原始响应归档: 新增 {archive.stored} 份（{archive.raw_bytes / 1024:.0f} KB，压缩后 "
+            f"{archive.stored_bytes / 1024:.0f} KB）, 内容重复 {archive.deduped} 次", file=sys.stderr)
+
+
+# ===== boxscore 解析进程池 =====
+# NBA_PARSE_WORKERS=N（或 --parse-workers N）：boxscore 的解码、投影和数据王候选筛选放到 N 个子进程，
+# 事件循环只抓取原始字节；回填 / 回放几百场比赛时吞吐随核数增长。默认 0，在本进程解析（单次抓取 7 天用不上）
+PARSE_WORKERS = max(0, _env_int("NBA_PARSE_WORKERS", 0))
+
+_parse_pool: Optional[BoxscoreParsePool] = None
+_parse_pool_lock = threading.Lock()
+
+
+def configure_parse_pool(workers: Optional[int] = None) -> None:
+    """设置解析进程数（命令行参数覆盖环境变量），0 表示在本进程解析"""
+    global PARSE_WORKERS
+    if workers is not None:
+        PARSE_WORKERS = max(0, workers)
+
+
+def get_parse_pool() -> Optional[BoxscoreParsePool]:
+    """开启解析进程池时返回共享的进程池（首次使用时启动子进程），否则返回 None"""
+    global _parse_pool
+    if PARSE_WORKERS <= 0:
+        return None
+    if _parse_pool is None:
+        with _parse_pool_lock:
+            if _parse_pool is None:
+                _parse_pool = BoxscoreParsePool(PARSE_WORKERS)
+    return _parse_pool
+
+
+def _close_parse_pool() -> None:
+    global _parse_pool
+    pool = _parse_pool
+    if pool is None:
+        return
+    _parse_pool = None
+    pool.shutdown()
+    if pool.parsed or pool.fallbacks:
+        msg = f"解析进程池: {pool.workers} 个进程, 解析 boxscore {pool.parsed} 份（{pool.batches} 批）"
+        if pool.fallbacks:
+            msg += f", 回退到本进程 {pool.fallbacks} 份"
+        print(msg, file=sys.stderr)
+
+
+# ===== 球员单场数据列式存储 =====
+# NBA_PLAYER_STORE=1（或 --player-store）：抓到的完赛 boxscore 中全部上场球员的单场数据追加到列式存储
+# （NBA_PLAYER_STORE_DIR，默认 NBA_CACHE_DIR/player_lines，需要 numpy），供 nba_player_store 做整季查询
+PLAYER_STORE_ENABLED = _env_flag("NBA_PLAYER_STORE", False)
+PLAYER_STORE_DIR = os.getenv("NBA_PLAYER_STORE_DIR", "").strip() or os.path.join(CACHE_DIR, "player_lines")
+
+_player_store: Optional[PlayerLineStore] = None
+_player_store_disabled = False
+_player_store_lock = threading.Lock()
+
+
+def configure_player_store(enabled: bool = False) -> None:
+    """开启球员数据存储（命令行参数在环境变量之上叠加）"""
+    global PLAYER_STORE_ENABLED
+    PLAYER_STORE_ENABLED = PLAYER_STORE_ENABLED or enabled
+
+
+def get_player_store() -> Optional[PlayerLineStore]:
+    """开启时返回共享的球员数据存储；未开启或不可用（缺少 numpy、文件损坏）时返回 None"""
+    global _player_store, _player_store_disabled
+    if not PLAYER_STORE_ENABLED or _player_store_disabled:
+        return None
+    if _player_store is None:
+        with _player_store_lock:
+            if _player_store is None and not _player_store_disabled:
+                try:
+                    _player_store = PlayerLineStore(PLAYER_STORE_DIR)
+                except (RuntimeError, OSError, ValueError) as e:
+                    print(f"球员数据存储不可用，已禁用: {e}", file=sys.stderr)
+                    _player_store_disabled = True
+    return _player_store
 
-                # gameStatus: 1=upcoming, 2=live, 3=finished
-                gs = int(g.get("gameStatus") or 1)
-                status = "upcoming"
-                if gs == 2:
-                    status = "live"
-                elif gs == 3:
-                    status = "finished"
-
-                utc_str = g.get("gameTimeUTC") or ""
-                # 统一以比赛开赛UTC时间换算到美东(ET)，确保日期/时间与官网一致
-                date_str = base_et.strftime("%Y-%m-%d")
-                time_str = "TBD"  # ET HH:MM
-                if utc_str:
-                    try:
-                        utc_dt = datetime.fromisoformat(
-                            utc_str.replace("Z", "+00:00"))
-                        et_dt = utc_dt.astimezone(ny_tz)
-                        date_str = et_dt.strftime("%Y-%m-%d")
-                        time_str = et_dt.strftime("%H:%M")
-                    except Exception:
-                        pass
-
-                home = g.get("homeTeam") or {}
-                away = g.get("awayTeam") or {}
-                arena = g.get("arena") or {}
-
-                home_team_id = home.get("teamId")
-                away_team_id = away.get("teamId")
-                home_name = get_chinese_team_name(
-                    int(home_team_id) if home_team_id else None, None)
-                away_name = get_chinese_team_name(
-                    int(away_team_id) if away_team_id else None, None)
-
-                def _to_int_or_none(v):
-                    try:
-                        if v is None:
-                            return None
-                        return int(v)
-                    except Exception:
-                        return None
-
-                # 获取比分：NBA API的比分可能在多个位置
-                home_score = None
-                away_score = None
-
-                # 方法1：从 homeTeam/awayTeam 对象直接获取
-                if "score" in home:
-                    home_score = _to_int_or_none(home.get("score"))
-                if "score" in away:
-                    away_score = _to_int_or_none(away.get("score"))
-
-                # 方法2：从 game 对象的 gameLeaders 或其他字段获取
-                if home_score is None or away_score is None:
-                    # 尝试从 game 对象获取
-                    game_leaders = g.get("gameLeaders") or {}
-                    home_leaders = game_leaders.get("homeLeaders") or {}
-                    away_leaders = game_leaders.get("awayLeaders") or {}
-
-                    # 有些API可能把比分放在这里
-                    if home_score is None and "points" in home_leaders:
-                        home_score = _to_int_or_none(
-                            home_leaders.get("points"))
-                    if away_score is None and "points" in away_leaders:
-                        away_score = _to_int_or_none(
-                            away_leaders.get("points"))
-
-                # 方法3：从 boxScore 获取（如果有）
-                box_score = g.get("boxScore") or {}
-                if home_score is None:
-                    home_score = _to_int_or_none(
-                        box_score.get("homeTeam", {}).get("score"))
-                if away_score is None:
-                    away_score = _to_int_or_none(
-                        box_score.get("awayTeam", {}).get("score"))
-
-                # 获取球员统计数据（得分、篮板、助攻最多的球员）
-                # 初始化变量
-                home_top_scorer = None
-                home_top_rebounder = None
-                home_top_assister = None
-                away_top_scorer = None
-                away_top_rebounder = None
-                away_top_assister = None
-
-                # 方法1：从 gameLeaders 获取（通常只有得分最多的球员）
-                game_leaders = g.get("gameLeaders") or {}
-                home_leaders = game_leaders.get("homeLeaders") or {}
-                away_leaders = game_leaders.get("awayLeaders") or {}
-
-                # 调试：打印 gameLeaders 结构（仅debug时）
-                if debug and status in ["live", "finished"]:
-                    print(
-                        f"比赛 {game_id} gameLeaders keys: {list(game_leaders.keys())}", file=sys.stderr)
-                    print(f"  homeLeaders: {home_leaders}", file=sys.stderr)
-                    print(f"  awayLeaders: {away_leaders}", file=sys.stderr)
-
-                # 从 gameLeaders 获取得分最多的球员（即使没有 personId 也尝试获取）
-                if home_leaders and (home_leaders.get("name") or home_leaders.get("personId")):
-                    home_top_scorer = {
-                        "name": home_leaders.get("name", ""),
-                        "points": _to_int_or_none(home_leaders.get("points"))
-                    }
-                    # 如果 name 为空，尝试从其他字段获取
-                    if not home_top_scorer["name"] and home_leaders.get("personId"):
-                        home_top_scorer["name"] = f"Player {home_leaders.get('personId')}"
-
-                if away_leaders and (away_leaders.get("name") or away_leaders.get("personId")):
-                    away_top_scorer = {
-                        "name": away_leaders.get("name", ""),
-                        "points": _to_int_or_none(away_leaders.get("points"))
-                    }
-                    # 如果 name 为空，尝试从其他字段获取
-                    if not away_top_scorer["name"] and away_leaders.get("personId"):
-                        away_top_scorer["name"] = f"Player {away_leaders.get('personId')}"
-
-                # 方法2：尝试从 boxScore 获取更详细的统计数据
-                # 注意：scoreboard API 可能不包含 boxScore，需要单独请求
-                box_score = g.get("boxScore") or {}
-
-                # ✅ 关键：scoreboard一般不带boxScore；对 live/finished 补抓 boxscore_{gameId}.json
-                if (not box_score) and status in ["live", "finished"]:
-                    fetched_game = _fetch_cdn_boxscore(game_id)
-                    if fetched_game and isinstance(fetched_game, dict):
-                        # 这里返回的是 game 对象（含 homeTeam/awayTeam/players）
-                        box_score = fetched_game
-                        # 如果比分缺失，也可从 boxscore 里补
-                        if home_score is None:
-                            home_score = _to_int_or_none(
-                                (box_score.get("homeTeam") or {}).get("score"))
-                        if away_score is None:
-                            away_score = _to_int_or_none(
-                                (box_score.get("awayTeam") or {}).get("score"))
-                    else:
-                        if debug:
-                            print(f"比赛 {game_id} 未获取到boxscore",
-                                  file=sys.stderr)
-
-                # 如果有 boxScore，获取球员列表
-                if box_score:
-                    home_players = box_score.get(
-                        "homeTeam", {}).get("players", [])
-                    away_players = box_score.get(
-                        "awayTeam", {}).get("players", [])
-
-                    if home_players and len(home_players) > 0:
-                        try:
-                            # 找到得分最多的球员
-                            home_top_scorer_player = max(home_players, key=lambda p: _to_int_or_none(
-                                p.get("statistics", {}).get("points")) or 0, default=None)
-                            if home_top_scorer_player:
-                                stats = home_top_scorer_player.get(
-                                    "statistics", {})
-                                first_name = home_top_scorer_player.get(
-                                    "firstName", "")
-                                family_name = home_top_scorer_player.get(
-                                    "familyName", "")
-                                home_top_scorer = {
-                                    "name": f"{first_name} {family_name}".strip(),
-                                    "points": _to_int_or_none(stats.get("points"))
-                                }
-
-                            # 篮板最多的球员
-                            home_top_rebounder_player = max(home_players, key=lambda p: _to_int_or_none(
-                                p.get("statistics", {}).get("reboundsTotal")) or 0, default=None)
-                            if home_top_rebounder_player:
-                                reb_stats = home_top_rebounder_player.get(
-                                    "statistics", {})
-                                first_name = home_top_rebounder_player.get(
-                                    "firstName", "")
-                                family_name = home_top_rebounder_player.get(
-                                    "familyName", "")
-                                home_top_rebounder = {
-                                    "name": f"{first_name} {family_name}".strip(),
-                                    "rebounds": _to_int_or_none(reb_stats.get("reboundsTotal"))
-                                }
-
-                            # 助攻最多的球员
-                            home_top_assister_player = max(home_players, key=lambda p: _to_int_or_none(
-                                p.get("statistics", {}).get("assists")) or 0, default=None)
-                            if home_top_assister_player:
-                                ast_stats = home_top_assister_player.get(
-                                    "statistics", {})
-                                first_name = home_top_assister_player.get(
-                                    "firstName", "")
-                                family_name = home_top_assister_player.get(
-                                    "familyName", "")
-                                home_top_assister = {
-                                    "name": f"{first_name} {family_name}".strip(),
-                                    "assists": _to_int_or_none(ast_stats.get("assists"))
-                                }
-                        except Exception as e:
-                            print(f"处理主队球员统计失败: {e}", file=sys.stderr)
-
-                    if away_players and len(away_players) > 0:
-                        try:
-                            # 找到得分最多的球员
-                            away_top_scorer_player = max(away_players, key=lambda p: _to_int_or_none(
-                                p.get("statistics", {}).get("points")) or 0, default=None)
-                            if away_top_scorer_player:
-                                stats = away_top_scorer_player.get(
-                                    "statistics", {})
-                                first_name = away_top_scorer_player.get(
-                                    "firstName", "")
-                                family_name = away_top_scorer_player.get(
-                                    "familyName", "")
-                                away_top_scorer = {
-                                    "name": f"{first_name} {family_name}".strip(),
-                                    "points": _to_int_or_none(stats.get("points"))
-                                }
-
-                            # 篮板最多的球员
-                            away_top_rebounder_player = max(away_players, key=lambda p: _to_int_or_none(
-                                p.get("statistics", {}).get("reboundsTotal")) or 0, default=None)
-                            if away_top_rebounder_player:
-                                reb_stats = away_top_rebounder_player.get(
-                                    "statistics", {})
-                                first_name = away_top_rebounder_player.get(
-                                    "firstName", "")
-                                family_name = away_top_rebounder_player.get(
-                                    "familyName", "")
-                                away_top_rebounder = {
-                                    "name": f"{first_name} {family_name}".strip(),
-                                    "rebounds": _to_int_or_none(reb_stats.get("reboundsTotal"))
-                                }
-
-                            # 助攻最多的球员
-                            away_top_assister_player = max(away_players, key=lambda p: _to_int_or_none(
-                                p.get("statistics", {}).get("assists")) or 0, default=None)
-                            if away_top_assister_player:
-                                ast_stats = away_top_assister_player.get(
-                                    "statistics", {})
-                                first_name = away_top_assister_player.get(
-                                    "firstName", "")
-                                family_name = away_top_assister_player.get(
-                                    "familyName", "")
-                                away_top_assister = {
-                                    "name": f"{first_name} {family_name}".strip(),
-                                    "assists": _to_int_or_none(ast_stats.get("assists"))
-                                }
-                        except Exception as e:
-                            print(f"处理客队球员统计失败: {e}", file=sys.stderr)
-
-                # 调试：打印球员统计数据
-                if debug and status in ["live", "finished"]:
-                    print(f"比赛 {game_id} 球员统计:", file=sys.stderr)
-                    print(f"  主队得分王: {home_top_scorer}", file=sys.stderr)
-                    print(f"  主队篮板王: {home_top_rebounder}", file=sys.stderr)
-                    print(f"  主队助攻王: {home_top_assister}", file=sys.stderr)
-                    print(f"  客队得分王: {away_top_scorer}", file=sys.stderr)
-                    print(f"  客队篮板王: {away_top_rebounder}", file=sys.stderr)
-                    print(f"  客队助攻王: {away_top_assister}", file=sys.stderr)
-
-                # 调试：如果比分仍为None，打印调试信息
-                if (home_score is None or away_score is None) and status in ["live", "finished"]:
-                    print(
-                        f"警告：比赛 {game_id} ({home_name} vs {away_name}) 状态为 {status}，但未获取到比分", file=sys.stderr)
-                    print(
-                        f"  home对象keys: {list(home.keys())}", file=sys.stderr)
-                    print(
-                        f"  away对象keys: {list(away.keys())}", file=sys.stderr)
-                    print(
-                        f"  game对象部分keys: {list(g.keys())[:10]}", file=sys.stderr)
-
-                out.append({
-                    "id": game_id,
-                    "homeTeam": home_name,
-                    "awayTeam": away_name,
-                    "homeTeamId": _to_int_or_none(home_team_id),
-                    "awayTeamId": _to_int_or_none(away_team_id),
-                    "homeScore": home_score,
-                    "awayScore": away_score,
-                    "status": status,
-                    "date": date_str,
-                    "time": time_str,
-                    "league": "NBA",
-                    "venue": arena.get("arenaName") or "未知场馆",
-                    # 球员统计数据
-                    "homeTopScorer": home_top_scorer,
-                    "homeTopRebounder": home_top_rebounder,
-                    "homeTopAssister": home_top_assister,
-                    "awayTopScorer": away_top_scorer,
-                    "awayTopRebounder": away_top_rebounder,
-                    "awayTopAssister": away_top_assister
-                })
-            except Exception as e:
-                print(f"CDN处理单场比赛失败: {e}", file=sys.stderr)
-                continue
-        return out
 
-    # 1) 优先CDN
-    matches = _fetch_with_cdn_scoreboard(yyyymmdd)
-    if matches:
-        print(f"CDN成功获取 {len(matches)} 场比赛", file=sys.stderr)
-        return matches
+def _flush_player_store() -> None:
+    store = _player_store
+    if store is None:
+        return
+    try:
+        store.flush()
+    except OSError as e:
+        print(f"球员数据写入失败: {e}", file=sys.stderr)
+        return
+    if store.added_games:
+        print(f"球员数据存储: 新增 {store.added_games} 场（{store.added_rows} 行）, 共 {store.rows} 行", file=sys.stderr)
+        store.added_games = store.added_rows = 0
+
+
+# ===== 写入平台数据库 =====
+# NBA_DB_SINK=<连接串>（或 --db-sink [连接串]，不带值时用 DATABASE_URL）：每次抓取后把内容变化的比赛和数据王
+# 写入平台数据库的 NbaMatch / NbaMatchLeader（见 nba_db_sink），未变化的比赛不写
+DB_SINK_URL = os.getenv("NBA_DB_SINK", "").strip()
+
+_db_sink: Optional[MatchSink] = None
+_db_sink_disabled = False
+_db_sink_lock = threading.Lock()
+
+
+def configure_db_sink(url: Optional[str] = None) -> None:
+    """设置写入的数据库（命令行参数覆盖环境变量），空字符串表示使用 DATABASE_URL"""
+    global DB_SINK_URL
+    if url is not None:
+        DB_SINK_URL = url.strip() or os.getenv("DATABASE_URL", "").strip().strip('"')
+
+
+def get_db_sink() -> Optional[MatchSink]:
+    """配置了数据库时返回共享的写入器；未配置或连接失败时返回 None"""
+    global _db_sink, _db_sink_disabled
+    if not DB_SINK_URL or _db_sink_disabled:
+        return None
+    if _db_sink is None:
+        with _db_sink_lock:
+            if _db_sink is None and not _db_sink_disabled:
+                try:
+                    _db_sink = MatchSink(DB_SINK_URL)
+                except (RuntimeError, ValueError) + DB_ERRORS as e:
+                    print(f"数据库写入不可用，已禁用: {e}", file=sys.stderr)
+                    _db_sink_disabled = True
+    return _db_sink
+
+
+def _sink_matches(matches: List[Dict]) -> None:
+    """把本次抓取结果中内容变化的比赛写入数据库（失败只打印，不影响输出）"""
+    sink = get_db_sink()
+    if sink is None or not matches:
+        return
+    try:
+        with METRICS.stage("db_sink"):
+            result = sink.write(matches)
+    except DB_ERRORS as e:
+        print(f"数据库写入失败: {e}", file=sys.stderr)
+        return
+    METRICS.inc("db_sink_matches_total", result["written"], change="written")
+    METRICS.inc("db_sink_matches_total", result["unchanged"], change="unchanged")
+    METRICS.inc("db_sink_round_trips_total", result["roundTrips"])
+
+
+def _close_db_sink() -> None:
+    global _db_sink
+    sink = _db_sink
+    if sink is None:
+        return
+    _db_sink = None
+    sink.close()
+    if sink.written or sink.unchanged:
+        print(f"数据库写入: 变化 {sink.written} 场, 未变化 {sink.unchanged} 场, 往返 {sink.round_trips} 次",
+              file=sys.stderr)
+
+
+def _print_http_cache_stats() -> None:
+    cache = _http_cache
+    if cache is None or (cache.hits + cache.misses) == 0:
+        return
+    print(
+        f"HTTP缓存: 304命中 {cache.hits} 次, 完整下载 {cache.misses} 次", file=sys.stderr)
+
+
+class FetchResult(NamedTuple):
+    """与传输层无关的响应结果，字段命名与 requests.Response 保持一致"""
+    status_code: int
+    content: bytes
+    headers: Dict[str, str]
+    from_cache: bool = False
+
+    def json(self):
+        return nba_json.loads(self.content)
+
+
+class _RequestsTransport:
+    """requests 连接池传输层：在线程中执行阻塞请求（未安装 httpx 时使用）"""
+
+    async def get(self, url: str, headers: Optional[Dict], timeout) -> FetchResult:
+        resp = await asyncio.to_thread(http_get, _upstream_url(url), headers, timeout)
+        return FetchResult(resp.status_code, resp.content, dict(resp.headers))
+
+    async def aclose(self) -> None:
+        pass
+
 
-    # 2) 兜底：stats.nba.com（可能被拦）
-    # 以NBA常用的美东时间作为“今天”的基准
-    ny_tz = ZoneInfo("America/New_York")
-    target_date = datetime.now(ny_tz) + timedelta(days=date_offset)
-    year = target_date.year
-    month = str(target_date.month).zfill(2)
-    day = str(target_date.day).zfill(2)
-    date_str = f"{month}/{day}/{year}"
+class _ArchiveTransport:
+    """离线回放传输层：从原始响应归档读取，归档中没有的 URL 按 404 处理"""
 
+    def __init__(self, archive: PayloadArchive, as_of: Optional[float] = None):
+        self.archive = archive
+        self.as_of = as_of
+
+    async def get(self, url: str, headers: Optional[Dict], timeout) -> FetchResult:
+        hit = self.archive.lookup(url, self.as_of)
+        if hit is None:
+            return FetchResult(404, b"", {})
+        return FetchResult(hit[0], hit[1], {"Content-Type": "application/json"})
+
+    async def aclose(self) -> None:
+        pass
+
+
+class _HttpxTransport:
+    """httpx 传输层：原生异步，开启 HTTP/2 后同一主机的请求复用一条连接"""
+
+    def __init__(self, max_connections: int):
+        self.client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            headers={"Accept-Encoding": "gzip, deflate"},
+            limits=httpx.Limits(max_connections=max_connections,
+                                max_keepalive_connections=max_connections),
+        )
+
+    async def get(self, url: str, headers: Optional[Dict], timeout) -> FetchResult:
+        if isinstance(timeout, tuple):
+            connect_timeout, read_timeout = timeout
+            timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        resp = await self.client.get(_upstream_url(url), headers=headers, timeout=timeout)
+        entry = _async_conn_stats.setdefault(
+            resp.url.host, {"requests": 0, "streams": set()})
+        entry["requests"] += 1
+        stream = resp.extensions.get("network_stream")
+        if stream is not None:
+            entry["streams"].add(id(stream))
+        return FetchResult(resp.status_code, resp.content, dict(resp.headers))
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+_resilience: Optional[ResilienceLayer] = None
+
+
+def get_resilience_layer() -> Optional[ResilienceLayer]:
+    """进程内共享的容错层（按主机限速/重试/熔断，熔断状态在多次抓取之间保留）；NBA_RESILIENCE=0 关闭"""
+    global _resilience
+    if not _env_flag("NBA_RESILIENCE", True):
+        return None
+    if _resilience is None:
+        _resilience = ResilienceLayer()
+    return _resilience
+
+
+def _print_resilience_stats() -> None:
+    layer = _resilience
+    if layer is None:
+        return
+    for host, st in sorted(layer.stats().items()):
+        if st["retries"] or st["failures"] or st["shortCircuits"]:
+            print(
+                f"容错 {host}: 尝试 {st['attempts']} 次, 重试 {st['retries']} 次, 失败 {st['failures']} 次, "
+                f"熔断拦截 {st['shortCircuits']} 次, 熔断器 {st['state']}", file=sys.stderr)
+
+
+class AsyncFetcher:
+    """
+    异步抓取器：统一的全局并发上限 + 可插拔传输层 + 按主机的容错层。
+    已安装 httpx 时使用 HTTP/2 客户端，否则回退到 requests 共享连接池；
+    回放模式下从原始响应归档读取（不使用HTTP缓存和容错层）。
+    timeout 是一次 get（含重试）的总时间预算。
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = None, transport=None, use_cache: bool = True,
+                 resilience: Optional[ResilienceLayer] = None):
+        self.max_concurrency = max_concurrency or MAX_CONCURRENCY
+        replay = REPLAY_ENABLED and transport is None
+        if replay:
+            transport = _ArchiveTransport(get_payload_archive(), REPLAY_AS_OF)
+        elif transport is None:
+            transport = _HttpxTransport(self.max_concurrency) if httpx is not None else _RequestsTransport()
+        self.transport = transport
+        self.cache = get_http_cache() if use_cache and not replay else None
+        self.resilience = None if replay else resilience or get_resilience_layer()
+        self.archive = get_payload_archive() if ARCHIVE_ENABLED and not replay else None
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def get(self, url: str, headers: Optional[Dict] = None, timeout: float = 20) -> FetchResult:
+        cache = self.cache if self.cache is not None and self.cache.accepts(url) else None
+        # 缓存的文件读写放到线程中，不阻塞其他并发请求
+        entry = await asyncio.to_thread(cache.load, url) if cache is not None else None
+        if entry is not None:
+            headers = {**(headers or {}), **HttpCache.conditional_headers(entry)}
+
+        async def send(attempt_timeout) -> FetchResult:
+            # 只在真正发出请求时占用并发名额，退避等待期间不占用
+            async with self._semaphore:
+                return await self.transport.get(url, headers, attempt_timeout)
+
+        host = urlsplit(url).hostname or ""
+        endpoint = _endpoint_label(url)
+        started = time.perf_counter()
+        try:
+            if self.resilience is not None:
+                resp = await self.resilience.request(url, send, timeout)
+            else:
+                resp = await send(timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            METRICS.inc("http_responses_total", host=host, endpoint=endpoint, status="error")
+            raise
+        finally:
+            METRICS.observe("http_request_seconds", time.perf_counter() - started, host=host, endpoint=endpoint)
+        METRICS.inc("http_responses_total", host=host, endpoint=endpoint, status=resp.status_code)
+        METRICS.inc("http_response_bytes_total", len(resp.content), host=host, endpoint=endpoint)
+        if cache is not None:
+            # 304：内容未变，直接使用缓存的响应体
+            if resp.status_code == 304 and entry is not None:
+                METRICS.inc("http_cache_total", endpoint=endpoint, result="hit")
+                await asyncio.to_thread(cache.touch, url)
+                resp = FetchResult(200, entry.body, entry.headers, True)
+            elif resp.status_code == 200:
+                METRICS.inc("http_cache_total", endpoint=endpoint, result="miss")
+                await asyncio.to_thread(cache.store, url, resp.content, resp.headers)
+        if self.archive is not None:
+            # 压缩和 SQLite 写入放到线程中，不阻塞其他并发请求；抓取时间在这里取，归档顺序与抓取顺序一致
+            await asyncio.to_thread(_archive_response, self.archive, url, resp, time.time())
+        return resp
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+    async def __aenter__(self) -> "AsyncFetcher":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
+
+
+def _is_debug() -> bool:
+    return os.getenv("NBA_DEBUG", "").strip() in (
+        "1", "true", "TRUE", "yes", "YES")
+
+
+def _to_int_loose(v):
+    try:
+        if v is None:
+            return None
+        # ESPN/Stats 有时会给 "40.0" 这种字符串或 float
+        if isinstance(v, (float, int)):
+            return int(v)
+        s = str(v).strip()
+        if s == "":
+            return None
+        return int(float(s))
+    except Exception:
+        return None
+
+
+def _cdn_scoreboard_url(yyyymmdd_str: str) -> str:
+    return f"https://cdn.nba.com/static/json/liveData/scoreboard/scoreboard_{yyyymmdd_str}.json"
+
+
+def _cdn_boxscore_url(game_id: str) -> str:
+    return f"https://cdn.nba.com/static/json/liveData/boxscore/boxscore_{game_id}.json"
+
+
+def _cdn_playbyplay_url(game_id: str) -> str:
+    return f"https://cdn.nba.com/static/json/liveData/playbyplay/playbyplay_{game_id}.json"
+
+
+def _stats_scoreboard_url(date_str: str) -> str:
     # 注意：scoreboardV2 同时传 DayOffset 和 gameDate 可能导致“再次偏移”出现日期错乱
     # 这里固定 DayOffset=0，仅用 gameDate 精确指定那一天的数据
-    api_urls = [
-        f"https://stats.nba.com/stats/scoreboardV2?DayOffset=0&LeagueID=00&gameDate={date_str}",
-    ]
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Referer': 'https://www.nba.com/',
-        'Origin': 'https://www.nba.com',
-        'Accept': 'application/json, text/plain, */*',
-        'Accept-Language': 'en-US,en;q=0.9',
-        'Connection': 'keep-alive',
-        'Cache-Control': 'no-cache',
-        'sec-ch-ua': '"Not_A Brand";v="8", "Chromium";v="120", "Google Chrome";v="120"',
-        'sec-ch-ua-mobile': '?0',
-        'sec-ch-ua-platform': '"Windows"',
-        'sec-fetch-dest': 'empty',
-        'sec-fetch-mode': 'cors',
-        'sec-fetch-site': 'same-site',
-    }
+    return f"https://stats.nba.com/stats/scoreboardV2?DayOffset=0&LeagueID=00&gameDate={date_str}"
 
-    debug = os.getenv("NBA_DEBUG", "").strip() in (
-        "1", "true", "TRUE", "yes", "YES")
-    _boxscore_cache: Dict[str, Dict] = {}
 
-    def _to_int_or_none(v):
+def _stats_boxscore_url(game_id: str) -> str:
+    return (
+        "https://stats.nba.com/stats/boxscoretraditionalv2"
+        f"?GameID={game_id}&StartPeriod=0&EndPeriod=10&RangeType=0&StartRange=0&EndRange=0"
+    )
+
+
+def _espn_scoreboard_url(yyyymmdd_str: str) -> str:
+    return (
+        "https://site.web.api.espn.com/apis/site/v2/sports/basketball/nba/scoreboard"
+        f"?dates={yyyymmdd_str}"
+    )
+
+
+def _cdn_boxscore_game_ids(games: List[Dict]) -> List[str]:
+    """找出 scoreboard 中需要补抓 boxscore 的 live/finished 比赛"""
+    box_game_ids: List[str] = []
+    for g in games:
         try:
-            if v is None:
-                return None
-            # ESPN/Stats 有时会给 "40.0" 这种字符串或 float
-            if isinstance(v, (float, int)):
-                return int(v)
-            s = str(v).strip()
-            if s == "":
+            gid = str(g.get("gameId") or "")
+            if gid and not g.get("boxScore") and int(g.get("gameStatus") or 1) in (2, 3):
+                box_game_ids.append(gid)
+        except Exception:
+            continue
+    return box_game_ids
+
+
+def _build_cdn_match(g: Dict, base_et: datetime, boxscores: Dict[str, Optional[Dict]]) -> Optional[Match]:
+    """由 scoreboard 中的单场比赛（及其已抓取的 boxscore）构造比赛数据"""
+    ny_tz = base_et.tzinfo
+    debug = _is_debug()
+    game_id = str(g.get("gameId") or "")
+    if not game_id:
+        return None
+
+    # gameStatus: 1=upcoming, 2=live, 3=finished
+    gs = int(g.get("gameStatus") or 1)
+    status = "upcoming"
+    if gs == 2:
+        status = "live"
+    elif gs == 3:
+        status = "finished"
+
+    utc_str = g.get("gameTimeUTC") or ""
+    # 统一以比赛开赛UTC时间换算到美东(ET)，确保日期/时间与官网一致
+    date_str = base_et.strftime("%Y-%m-%d")
+    time_str = "TBD"  # ET HH:MM
+    if utc_str:
+        try:
+            utc_dt = datetime.fromisoformat(
+                utc_str.replace("Z", "+00:00"))
+            et_dt = utc_dt.astimezone(ny_tz)
+            date_str = et_dt.strftime("%Y-%m-%d")
+            time_str = et_dt.strftime("%H:%M")
+        except Exception:
+            pass
+
+    home = g.get("homeTeam") or {}
+    away = g.get("awayTeam") or {}
+    arena = g.get("arena") or {}
+
+    home_team_id = home.get("teamId")
+    away_team_id = away.get("teamId")
+    home_name = get_chinese_team_name(
+        int(home_team_id) if home_team_id else None, None)
+    away_name = get_chinese_team_name(
+        int(away_team_id) if away_team_id else None, None)
+
+    # 获取比分：NBA API的比分可能在多个位置
+    home_score = None
+    away_score = None
+
+    # 方法1：从 homeTeam/awayTeam 对象直接获取
+    if "score" in home:
+        home_score = _to_int_or_none(home.get("score"))
+    if "score" in away:
+        away_score = _to_int_or_none(away.get("score"))
+
+    # 方法2：从 game 对象的 gameLeaders 或其他字段获取
+    if home_score is None or away_score is None:
+        # 尝试从 game 对象获取
+        game_leaders = g.get("gameLeaders") or {}
+        home_leaders = game_leaders.get("homeLeaders") or {}
+        away_leaders = game_leaders.get("awayLeaders") or {}
+
+        # 有些API可能把比分放在这里
+        if home_score is None and "points" in home_leaders:
+            home_score = _to_int_or_none(
+                home_leaders.get("points"))
+        if away_score is None and "points" in away_leaders:
+            away_score = _to_int_or_none(
+                away_leaders.get("points"))
+
+    # 方法3：从 boxScore 获取（如果有）
+    box_score = g.get("boxScore") or {}
+    if home_score is None:
+        home_score = _to_int_or_none(
+            box_score.get("homeTeam", {}).get("score"))
+    if away_score is None:
+        away_score = _to_int_or_none(
+            box_score.get("awayTeam", {}).get("score"))
+
+    # 获取球员统计数据（得分、篮板、助攻最多的球员，以及 NBA_EXTRA_LEADER_STATS 额外配置的统计项）
+    leader_stats = configured_leader_stats()
+    leader_fields: Dict[str, Optional[PlayerLine]] = {
+        leader_field(side, stat): None for side in ("home", "away") for stat in leader_stats}
+
+    # 方法1：从 gameLeaders 获取（通常只有得分最多的球员）
+    game_leaders = g.get("gameLeaders") or {}
+    home_leaders = game_leaders.get("homeLeaders") or {}
+    away_leaders = game_leaders.get("awayLeaders") or {}
+
+    # 调试：打印 gameLeaders 结构（仅debug时）
+    if debug and status in ["live", "finished"]:
+        print(
+            f"比赛 {game_id} gameLeaders keys: {list(game_leaders.keys())}", file=sys.stderr)
+        print(f"  homeLeaders: {home_leaders}", file=sys.stderr)
+        print(f"  awayLeaders: {away_leaders}", file=sys.stderr)
+
+    # 从 gameLeaders 获取得分最多的球员（即使没有 personId 也尝试获取）
+    for side, side_leaders in (("home", home_leaders), ("away", away_leaders)):
+        if side_leaders and (side_leaders.get("name") or side_leaders.get("personId")):
+            name = side_leaders.get("name", "")
+            points = _to_int_or_none(side_leaders.get("points"))
+            # 如果 name 为空，尝试从其他字段获取
+            if not name and side_leaders.get("personId"):
+                name = f"Player {side_leaders.get('personId')}"
+            # 由 personId 直接得到头像（身份注册表，无需请求 ESPN）
+            if side_leaders.get("personId"):
+                identity = get_identity_registry().identify(side_leaders.get("personId"), name)
+                top_scorer = player_line(identity["name"], "points", points, identity["avatar"])
+            else:
+                top_scorer = player_line(name, "points", points)
+            leader_fields[f"{side}TopScorer"] = top_scorer
+
+    # 方法2：尝试从 boxScore 获取更详细的统计数据
+    # 注意：scoreboard API 可能不包含 boxScore，需要单独请求
+    box_score = g.get("boxScore") or {}
+
+    # ✅ 关键：scoreboard一般不带boxScore；对 live/finished 补抓 boxscore_{gameId}.json
+    if (not box_score) and status in ["live", "finished"]:
+        fetched_game = boxscores.get(game_id)
+        if fetched_game and isinstance(fetched_game, dict):
+            # 这里返回的是 game 对象（含 homeTeam/awayTeam/players）
+            box_score = fetched_game
+            # 如果比分缺失，也可从 boxscore 里补
+            if home_score is None:
+                home_score = _to_int_or_none(
+                    (box_score.get("homeTeam") or {}).get("score"))
+            if away_score is None:
+                away_score = _to_int_or_none(
+                    (box_score.get("awayTeam") or {}).get("score"))
+        else:
+            if debug:
+                print(f"比赛 {game_id} 未获取到boxscore",
+                      file=sys.stderr)
+
+    # 如果有 boxScore，获取球员列表：每队只遍历一次球员，同时计算各项数据王
+    if box_score:
+        for side, side_label in (("home", "主队"), ("away", "客队")):
+            players = box_score.get(f"{side}Team", {}).get("players", [])
+            if not players:
+                continue
+            try:
+                with METRICS.stage("leaders_cdn"):
+                    team_leaders = cdn_team_leaders(
+                        players, leader_stats, _to_int_or_none, identify=get_identity_registry().identify)
+                for stat in leader_stats:
+                    ranked = team_leaders[stat.category]
+                    leader_fields[leader_field(side, stat)] = ranked[0] if ranked else None
+            except Exception as e:
+                print(f"处理{side_label}球员统计失败: {e}", file=sys.stderr)
+
+    # 调试：打印球员统计数据
+    if debug and status in ["live", "finished"]:
+        print(f"比赛 {game_id} 球员统计:", file=sys.stderr)
+        for field, leader in leader_fields.items():
+            print(f"  {field}: {leader}", file=sys.stderr)
+
+    # 调试：如果比分仍为None，打印调试信息
+    if (home_score is None or away_score is None) and status in ["live", "finished"]:
+        print(
+            f"警告：比赛 {game_id} ({home_name} vs {away_name}) 状态为 {status}，但未获取到比分", file=sys.stderr)
+        print(
+            f"  home对象keys: {list(home.keys())}", file=sys.stderr)
+        print(
+            f"  away对象keys: {list(away.keys())}", file=sys.stderr)
+        print(
+            f"  game对象部分keys: {list(g.keys())[:10]}", file=sys.stderr)
+
+    # 球员统计数据（homeTopScorer ... awayTopAssister）排在固定字段之后
+    return make_match(
+        leader_fields,
+        id=game_id,
+        homeTeam=home_name,
+        awayTeam=away_name,
+        homeTeamId=_to_int_or_none(home_team_id),
+        awayTeamId=_to_int_or_none(away_team_id),
+        homeScore=home_score,
+        awayScore=away_score,
+        status=status,
+        date=date_str,
+        time=time_str,
+        league="NBA",
+        venue=arena.get("arenaName") or "未知场馆",
+    )
+
+
+@METRICS.timed_stage("leaders_stats")
+def _parse_stats_boxscore_leaders(data, home_team_id: int, away_team_id: int) -> Dict:
+    """
+    解析 stats.nba.com boxscoretraditionalv2 响应（PlayerStats resultSet），
+    计算两队得分/篮板/助攻最高球员。
+    """
+    player_rs = decode_result_sets(data).get("PlayerStats")
+    if player_rs is None or not player_rs.has("TEAM_ID", "PLAYER_NAME"):
+        return {}
+
+    # 一次遍历所有球员行，同时计算两队各项数据王
+    home_team_id, away_team_id = int(home_team_id), int(away_team_id)
+    leader_stats = configured_leader_stats()
+    by_team = stats_game_leaders(
+        player_rs.rows, player_rs.columns, (home_team_id, away_team_id), leader_stats, _to_int_loose,
+        identify=get_identity_registry().identify)
+    out: Dict[str, Optional[PlayerLine]] = {}
+    for side, team_id in (("home", home_team_id), ("away", away_team_id)):
+        for stat in leader_stats:
+            ranked = by_team[team_id][stat.category]
+            out[leader_field(side, stat)] = ranked[0] if ranked else None
+    return out
+
+
+@METRICS.timed_stage("leaders_espn")
+def _parse_espn_leaders_map(data) -> Dict:
+    """
+    解析 ESPN scoreboard，得到当天所有比赛两队 points/rebounds/assists leaders。
+    返回 {(homeZh, awayZh): {homeTopScorer, ...}} 的映射。
+    """
+    data = data or {}
+    out: Dict = {}
+
+    def take_leader(competitor: Dict, cat: str) -> Optional[PlayerLine]:
+        leaders = competitor.get("leaders") or []
+        for l in leaders:
+            if l.get("name") != cat:
+                continue
+            first = (l.get("leaders") or [{}])[0] or {}
+            athlete = first.get("athlete") or {}
+            name = str(athlete.get("displayName") or "").strip()
+            athlete_id = str(athlete.get("id") or "").strip()
+            # ESPN 通常会给 headshot.href
+            headshot = athlete.get("headshot") or {}
+            avatar = headshot.get("href") if isinstance(
+                headshot, dict) else None
+            value = first.get("value")
+            iv = _to_int_loose(value)
+            if not name:
                 return None
-            return int(float(s))
+            # 记入身份注册表（与 NBA personId 关联）；没有 headshot 时用 athlete id 拼
+            avatar = get_identity_registry().link_espn(athlete_id, name, avatar)
+            if cat in ("points", "rebounds", "assists"):
+                return player_line(name, cat, iv, avatar)
+        return None
+
+    for e in data.get("events", []) or []:
+        comp = (e.get("competitions") or [{}])[0] or {}
+        comps = comp.get("competitors") or []
+        home = next((c for c in comps if c.get(
+            "homeAway") == "home"), None)
+        away = next((c for c in comps if c.get(
+            "homeAway") == "away"), None)
+        if not home or not away:
+            continue
+
+        home_en = ((home.get("team") or {}).get("displayName")) or ""
+        away_en = ((away.get("team") or {}).get("displayName")) or ""
+        home_zh = get_chinese_team_name(None, home_en)
+        away_zh = get_chinese_team_name(None, away_en)
+
+        leaders_obj = {
+            "homeTopScorer": take_leader(home, "points"),
+            "homeTopRebounder": take_leader(home, "rebounds"),
+            "homeTopAssister": take_leader(home, "assists"),
+            "awayTopScorer": take_leader(away, "points"),
+            "awayTopRebounder": take_leader(away, "rebounds"),
+            "awayTopAssister": take_leader(away, "assists"),
+        }
+        out[(home_zh, away_zh)] = leaders_obj
+    return out
+
+
+def _parse_stats_scoreboard(data, date_str: str) -> Optional[List[Match]]:
+    """解析 stats.nba.com scoreboardV2（GameHeader + LineScore），数据结构不完整时返回 None"""
+    if not data or 'resultSets' not in data:
+        return None
+
+    result_sets = decode_result_sets(data)
+    game_header = result_sets.get('GameHeader')
+    line_score = result_sets.get('LineScore')
+    if game_header is None or line_score is None:
+        return None
+
+    game_id_idx = game_header.col('GAME_ID')
+    game_status_idx = game_header.col('GAME_STATUS_TEXT')
+    game_status_id_idx = game_header.col('GAME_STATUS_ID')
+    game_date_idx = game_header.col('GAME_DATE_EST')
+    home_team_id_idx = game_header.col('HOME_TEAM_ID')
+    visitor_team_id_idx = game_header.col('VISITOR_TEAM_ID')
+    arena_idx = game_header.col('ARENA_NAME')
+
+    pts_idx_ls = line_score.col('PTS')
+    # LineScore 按 (GAME_ID, TEAM_ID) 建哈希索引，每场比赛 O(1) 取两队比分
+    has_line_score = pts_idx_ls != -1 and line_score.has('GAME_ID', 'TEAM_ID')
+    line_score_key = ('GAME_ID', 'TEAM_ID')
+
+    if game_id_idx == -1:
+        return None
+
+    matches: List[Match] = []
+
+    for game in game_header.rows:
+        try:
+            game_id = game[game_id_idx]
+            game_status = str(
+                game[game_status_idx] or '') if game_status_idx != -1 else ''
+            game_status_id = _to_int_loose(
+                game[game_status_id_idx]) if game_status_id_idx != -1 else None
+            game_date = game[game_date_idx] if game_date_idx != - \
+                1 else date_str
+            home_team_id = game[home_team_id_idx] if home_team_id_idx != -1 else None
+            visitor_team_id = game[visitor_team_id_idx] if visitor_team_id_idx != -1 else None
+            arena = str(game[arena_idx]
+                        or '未知场馆') if arena_idx != -1 else '未知场馆'
+
+            home_team_name = get_chinese_team_name(home_team_id, None)
+            away_team_name = get_chinese_team_name(
+                visitor_team_id, None)
+
+            home_score = None
+            away_score = None
+            if has_line_score:
+                home_team_data = line_score.lookup(line_score_key, (game_id, home_team_id))
+                away_team_data = line_score.lookup(line_score_key, (game_id, visitor_team_id))
+                if home_team_data and away_team_data:
+                    home_pts = home_team_data[pts_idx_ls]
+                    away_pts = away_team_data[pts_idx_ls]
+                    home_score = int(
+                        home_pts) if home_pts is not None else None
+                    away_score = int(
+                        away_pts) if away_pts is not None else None
+
+            # ✅ 使用 GAME_STATUS_ID 更可靠：1=upcoming, 2=live, 3=finished
+            status = 'upcoming'
+            if game_status_id == 2:
+                status = 'live'
+            elif game_status_id == 3:
+                status = 'finished'
+            elif game_status_id == 1:
+                status = 'upcoming'
+            else:
+                # 兜底：用文本判断
+                status_upper = game_status.upper().strip()
+                if 'FINAL' in status_upper:
+                    status = 'finished'
+                elif status_upper == '' or 'ET' in status_upper or 'PM' in status_upper or 'AM' in status_upper:
+                    status = 'upcoming'
+                else:
+                    status = 'live'
+
+            game_date_str = game_date.split('T')[0] if 'T' in str(
+                game_date) else str(game_date).split()[0]
+            m = make_match(
+                id=str(game_id),
+                homeTeam=home_team_name,
+                awayTeam=away_team_name,
+                homeTeamId=int(home_team_id) if home_team_id is not None else None,
+                awayTeamId=int(visitor_team_id) if visitor_team_id is not None else None,
+                homeScore=home_score,
+                awayScore=away_score,
+                status=status,
+                date=game_date_str,
+                time=game_status if game_status else 'TBD',
+                league='NBA',
+                venue=arena,
+            )
+            matches.append(m)
         except Exception:
+            continue
+    return matches
+
+
+@METRICS.timed_stage("cdn_boxscore", key=lambda fetcher, game_id: game_id)
+async def _fetch_cdn_boxscore_async(fetcher: AsyncFetcher, game_id: str) -> Optional[Dict]:
+    """
+    从NBA CDN获取单场比赛 boxscore（包含球员统计）。
+    参考：https://cdn.nba.com/static/json/liveData/boxscore/boxscore_{gameId}.json
+    返回 data["game"] 的投影（两队比分 + 球员名字和数据王统计项，见 nba_boxscore.project_cdn_boxscore_game）
+    """
+    if not game_id:
+        return None
+    box_url = _cdn_boxscore_url(game_id)
+    debug = _is_debug()
+    try:
+        resp = await fetcher.get(box_url, headers=CDN_HEADERS, timeout=15)
+        if resp.status_code != 200:
+            if debug:
+                print(
+                    f"boxscore请求失败: {resp.status_code} {box_url}", file=sys.stderr)
             return None
+        store = get_player_store()
+        with_lines = store is not None and not store.has_game(game_id)
+        pool = get_parse_pool()
+        if pool is not None:
+            projected = await pool.parse(resp.content, configured_leader_stats(), with_lines)
+        else:
+            projected = parse_cdn_boxscore(resp.content, configured_leader_stats(), with_lines=with_lines)
+        lines = projected.pop("playerLines", None) if projected is not None else None
+        if lines is not None:
+            store.add_game(lines)
+        return projected
+    except Exception as e:
+        if debug:
+            print(f"boxscore请求异常: {e} {box_url}", file=sys.stderr)
+        return None
 
-    def _fetch_stats_boxscore_leaders(game_id: str, home_team_id: Optional[int], away_team_id: Optional[int]) -> Dict:
-        """
-        从 stats.nba.com 获取单场球员数据，计算两队得分/篮板/助攻最高球员。
-        使用 boxscoretraditionalv2（返回 PlayerStats resultSet）。
-        """
-        if not game_id or not home_team_id or not away_team_id:
-            return {}
-        if game_id in _boxscore_cache:
-            return _boxscore_cache[game_id]
 
-        url = (
-            "https://stats.nba.com/stats/boxscoretraditionalv2"
-            f"?GameID={game_id}&StartPeriod=0&EndPeriod=10&RangeType=0&StartRange=0&EndRange=0"
-        )
+@METRICS.timed_stage("cdn_scoreboard", key=lambda fetcher, base_et, *a, **k: base_et.strftime("%Y%m%d"))
+async def _fetch_cdn_scoreboard_games_async(fetcher: AsyncFetcher, base_et: datetime) -> Optional[List[Dict]]:
+    """CDN scoreboard：只请求并解析当天赛程（scoreboard.games）；当天没有比赛时为空列表，请求失败返回 None"""
+    url = _cdn_scoreboard_url(base_et.strftime("%Y%m%d"))
+    print(f"正在尝试(CDN): {url}", file=sys.stderr)
+    try:
+        resp = await fetcher.get(url, headers=CDN_HEADERS, timeout=20)
+    except Exception as e:
+        # 超时/熔断：交给 stats.nba.com 兜底
+        print(f"CDN请求异常: {e}", file=sys.stderr)
+        return None
+    if resp.status_code != 200:
+        print(f"CDN请求失败: {resp.status_code}", file=sys.stderr)
+        return None
+    scoreboard = resp.json().get("scoreboard")
+    if not isinstance(scoreboard, dict):
+        return None
+    return scoreboard.get("games") or []
+
+
+async def _assemble_cdn_matches_async(fetcher: AsyncFetcher, base_et: datetime, games: List[Dict],
+                                      reuse: Optional[Dict[str, Dict]] = None) -> List[Dict]:
+    """
+    由 CDN scoreboard 的赛程有界并发补抓 boxscore，最后按赛程顺序组装。
+    reuse 中的比赛（调度未到期）不请求 boxscore，沿用上次的球员数据。
+    """
+    reuse = reuse or {}
+
+    # 已定型的完赛比赛直接使用本地存储，不再请求 boxscore、也不再解析
+    finished = _load_finished_games(
+        [str(g.get("gameId") or "") for g in games])
+
+    # ✅ scoreboard一般不带boxScore；对 live/finished 补抓 boxscore_{gameId}.json（单日并发上限 BOXSCORE_CONCURRENCY）
+    box_game_ids = [gid for gid in _cdn_boxscore_game_ids(games)
+                    if gid not in finished and gid not in reuse]
+    day_semaphore = asyncio.Semaphore(BOXSCORE_CONCURRENCY)
+
+    async def _bounded_boxscore(gid: str) -> Optional[Dict]:
+        async with day_semaphore:
+            return await _fetch_cdn_boxscore_async(fetcher, gid)
+
+    fetched = await asyncio.gather(*(_bounded_boxscore(gid) for gid in box_game_ids))
+    boxscores: Dict[str, Optional[Dict]] = dict(zip(box_game_ids, fetched))
+
+    out: List[Dict] = []
+    for g in games:
+        stored = finished.get(str(g.get("gameId") or ""))
+        if stored is not None:
+            out.append(stored)
+            continue
         try:
-            if debug:
-                print(f"正在尝试(Stats BoxScore): {url}", file=sys.stderr)
-            resp = requests.get(url, headers=headers, timeout=20)
-            if resp.status_code != 200:
-                if debug:
-                    print(
-                        f"Stats BoxScore请求失败: {resp.status_code} game={game_id}", file=sys.stderr)
-                _boxscore_cache[game_id] = {}
-                return {}
-            data = resp.json() or {}
-            result_sets = data.get("resultSets") or []
-            player_rs = None
-            # 可能是 list[dict] 或 dict
-            if isinstance(result_sets, list):
-                for rs in result_sets:
-                    if rs.get("name") == "PlayerStats":
-                        player_rs = rs
-                        break
-            if not player_rs:
-                _boxscore_cache[game_id] = {}
-                return {}
-
-            headers_list = player_rs.get("headers") or []
-            rows = player_rs.get("rowSet") or []
-
-            def idx(col: str) -> int:
-                return headers_list.index(col) if col in headers_list else -1
-
-            team_id_i = idx("TEAM_ID")
-            name_i = idx("PLAYER_NAME")
-            pts_i = idx("PTS")
-            reb_i = idx("REB")
-            ast_i = idx("AST")
-            min_i = idx("MIN")
-            if team_id_i == -1 or name_i == -1:
-                _boxscore_cache[game_id] = {}
-                return {}
-
-            def played(row) -> bool:
-                # 有些 DNP 也会有行，MIN 为空或 "0"；尽量过滤掉
-                if min_i == -1:
-                    return True
-                v = row[min_i]
-                if v is None:
-                    return False
-                s = str(v).strip()
-                if s == "" or s == "0" or s == "0:00":
-                    return False
-                return True
-
-            def best_for(team_id: int, stat_idx: int, key: str) -> Optional[Dict]:
-                if stat_idx == -1:
-                    return None
-                team_rows = [r for r in rows if _to_int_or_none(
-                    r[team_id_i]) == team_id and played(r)]
-                if not team_rows:
-                    return None
-                best_row = max(
-                    team_rows, key=lambda r: _to_int_or_none(r[stat_idx]) or 0)
-                val = _to_int_or_none(best_row[stat_idx])
-                name = str(best_row[name_i] or "").strip()
-                if not name:
-                    return None
-                return {"name": name, key: val}
-
-            out = {
-                "homeTopScorer": best_for(int(home_team_id), pts_i, "points"),
-                "homeTopRebounder": best_for(int(home_team_id), reb_i, "rebounds"),
-                "homeTopAssister": best_for(int(home_team_id), ast_i, "assists"),
-                "awayTopScorer": best_for(int(away_team_id), pts_i, "points"),
-                "awayTopRebounder": best_for(int(away_team_id), reb_i, "rebounds"),
-                "awayTopAssister": best_for(int(away_team_id), ast_i, "assists"),
-            }
-            _boxscore_cache[game_id] = out
-            return out
+            m = _build_cdn_match(g, base_et, boxscores)
+            if m is not None:
+                previous = reuse.get(m["id"])
+                if previous is not None:
+                    # 沿用上次的全部数据王字段（含 NBA_EXTRA_LEADER_STATS 额外配置的统计项）
+                    for k in m.leader_fields:
+                        m[k] = previous.get(k)
+                out.append(m)
         except Exception as e:
+            print(f"CDN处理单场比赛失败: {e}", file=sys.stderr)
+            continue
+    return out
+
+
+@METRICS.timed_stage("stats_boxscore", key=lambda fetcher, game_id, *a, **k: game_id)
+async def _fetch_stats_boxscore_leaders_async(fetcher: AsyncFetcher, game_id: str, home_team_id: Optional[int], away_team_id: Optional[int]) -> Dict:
+    """
+    从 stats.nba.com 获取单场球员数据，计算两队得分/篮板/助攻最高球员。
+    使用 boxscoretraditionalv2（返回 PlayerStats resultSet）。
+    """
+    if not game_id or not home_team_id or not away_team_id:
+        return {}
+    url = _stats_boxscore_url(game_id)
+    debug = _is_debug()
+    try:
+        if debug:
+            print(f"正在尝试(Stats BoxScore): {url}", file=sys.stderr)
+        resp = await fetcher.get(url, headers=STATS_HEADERS, timeout=20)
+        if resp.status_code != 200:
             if debug:
                 print(
-                    f"Stats BoxScore请求/解析异常: {e} game={game_id}", file=sys.stderr)
-            _boxscore_cache[game_id] = {}
+                    f"Stats BoxScore请求失败: {resp.status_code} game={game_id}", file=sys.stderr)
             return {}
+        return _parse_stats_boxscore_leaders(resp.json(), home_team_id, away_team_id)
+    except Exception as e:
+        if debug:
+            print(
+                f"Stats BoxScore请求/解析异常: {e} game={game_id}", file=sys.stderr)
+        return {}
+
 
-    def _fetch_espn_leaders_map(yyyymmdd_str: str) -> Dict:
-        """
-        使用 ESPN scoreboard，一次请求拿到当天所有比赛两队 points/rebounds/assists leaders。
-        返回 {(homeZh, awayZh): {homeTopScorer, ...}} 的映射。
-        """
-        if not yyyymmdd_str:
+@METRICS.timed_stage("espn_scoreboard", key=lambda fetcher, yyyymmdd_str: yyyymmdd_str)
+async def _fetch_espn_leaders_map_async(fetcher: AsyncFetcher, yyyymmdd_str: str) -> Dict:
+    """
+    使用 ESPN scoreboard，一次请求拿到当天所有比赛两队 points/rebounds/assists leaders。
+    返回 {(homeZh, awayZh): {homeTopScorer, ...}} 的映射。
+    """
+    if not yyyymmdd_str:
+        return {}
+    url = _espn_scoreboard_url(yyyymmdd_str)
+    debug = _is_debug()
+    try:
+        resp = await fetcher.get(url, timeout=20)
+        if resp.status_code != 200:
+            if debug:
+                print(
+                    f"ESPN scoreboard请求失败: {resp.status_code} {url}", file=sys.stderr)
             return {}
-        url = (
-            "https://site.web.api.espn.com/apis/site/v2/sports/basketball/nba/scoreboard"
-            f"?dates={yyyymmdd_str}"
-        )
-        try:
-            resp = requests.get(url, timeout=20)
-            if resp.status_code != 200:
-                if debug:
-                    print(
-                        f"ESPN scoreboard请求失败: {resp.status_code} {url}", file=sys.stderr)
-                return {}
-            data = resp.json() or {}
-            out: Dict = {}
-
-            def take_leader(competitor: Dict, cat: str) -> Optional[Dict]:
-                leaders = competitor.get("leaders") or []
-                for l in leaders:
-                    if l.get("name") != cat:
-                        continue
-                    first = (l.get("leaders") or [{}])[0] or {}
-                    athlete = first.get("athlete") or {}
-                    name = str(athlete.get("displayName") or "").strip()
-                    athlete_id = str(athlete.get("id") or "").strip()
-                    # ESPN 通常会给 headshot.href
-                    headshot = athlete.get("headshot") or {}
-                    avatar = headshot.get("href") if isinstance(
-                        headshot, dict) else None
-                    # 兜底：用 athlete id 拼 headshot
-                    if not avatar and athlete_id:
-                        avatar = f"https://a.espncdn.com/i/headshots/nba/players/full/{athlete_id}.png"
-                    value = first.get("value")
-                    iv = _to_int_or_none(value)
-                    if not name:
-                        return None
-                    if cat == "points":
-                        return {"name": name, "avatar": avatar, "points": iv}
-                    if cat == "rebounds":
-                        return {"name": name, "avatar": avatar, "rebounds": iv}
-                    if cat == "assists":
-                        return {"name": name, "avatar": avatar, "assists": iv}
-                return None
+        return _parse_espn_leaders_map(resp.json())
+    except Exception as e:
+        if debug:
+            print(f"ESPN leaders抓取异常: {e}", file=sys.stderr)
+        return {}
 
-            for e in data.get("events", []) or []:
-                comp = (e.get("competitions") or [{}])[0] or {}
-                comps = comp.get("competitors") or []
-                home = next((c for c in comps if c.get(
-                    "homeAway") == "home"), None)
-                away = next((c for c in comps if c.get(
-                    "homeAway") == "away"), None)
-                if not home or not away:
-                    continue
 
-                home_en = ((home.get("team") or {}).get("displayName")) or ""
-                away_en = ((away.get("team") or {}).get("displayName")) or ""
-                home_zh = get_chinese_team_name(None, home_en)
-                away_zh = get_chinese_team_name(None, away_en)
-
-                leaders_obj = {
-                    "homeTopScorer": take_leader(home, "points"),
-                    "homeTopRebounder": take_leader(home, "rebounds"),
-                    "homeTopAssister": take_leader(home, "assists"),
-                    "awayTopScorer": take_leader(away, "points"),
-                    "awayTopRebounder": take_leader(away, "rebounds"),
-                    "awayTopAssister": take_leader(away, "assists"),
-                }
-                out[(home_zh, away_zh)] = leaders_obj
-            return out
+@METRICS.timed_stage("stats_scoreboard", key=lambda fetcher, target_date, *a, **k: target_date.strftime("%Y%m%d"))
+async def _fetch_with_stats_scoreboard_async(fetcher: AsyncFetcher, target_date: datetime, reuse: Optional[Dict[str, Dict]] = None,
+                                             prefetch_espn: bool = False) -> List[Dict]:
+    """
+    兜底：stats.nba.com scoreboardV2（可能被拦），球员统计优先 ESPN，其次 stats boxscore。
+    reuse 中的比赛（调度未到期）沿用上次的球员数据。
+    prefetch_espn: 与 scoreboard 同时请求 ESPN leaders（有进行中比赛、肯定需要球员统计时使用）
+    """
+    reuse = reuse or {}
+    date_str = target_date.strftime("%m/%d/%Y")
+    url = _stats_scoreboard_url(date_str)
+    debug = _is_debug()
+    espn_task = asyncio.ensure_future(_fetch_espn_leaders_map_async(
+        fetcher, target_date.strftime("%Y%m%d"))) if prefetch_espn else None
+    try:
+        print(f"正在尝试(Stats): {url}", file=sys.stderr)
+        response = await fetcher.get(url, headers=STATS_HEADERS, timeout=20)
+        if response.status_code != 200:
+            print(f"Stats请求失败: {response.status_code}", file=sys.stderr)
+            return []
+        matches = _parse_stats_scoreboard(response.json(), date_str) or []
+        if not matches:
+            return []
+
+        # 已定型的完赛比赛直接使用本地存储，不再补抓球员统计
+        finished = _load_finished_games([str(mm.get("id")) for mm in matches])
+        stored_indexes = set()
+        leader_keys = configured_leader_fields()
+        for i, mm in enumerate(matches):
+            stored = finished.get(str(mm.get("id")))
+            if stored is not None:
+                matches[i] = stored
+                stored_indexes.add(i)
+                continue
+            previous = reuse.get(str(mm.get("id")))
+            if previous is not None and mm.get("status") in ("live", "finished"):
+                matches[i] = mm.updated({k: previous.get(k) for k in leader_keys if k in previous})
+                stored_indexes.add(i)
+        pending = [i for i, mm in enumerate(matches)
+                   if i not in stored_indexes and mm.get("status") in ("live", "finished")]
+        if not pending:
+            return matches
+
+        # ✅ 对 live/finished 补抓球员统计：优先 ESPN（稳定、单次请求）
+        try:
+            if espn_task is not None:
+                espn_map = await espn_task
+            else:
+                espn_map = await _fetch_espn_leaders_map_async(fetcher, target_date.strftime("%Y%m%d"))
+            leaders_by_index: Dict[int, Dict] = {}
+            missing: List[int] = []
+            for i in pending:
+                mm = matches[i]
+                leaders = espn_map.get((mm.get("homeTeam"), mm.get("awayTeam"))) or {}
+                leaders_by_index[i] = leaders
+                # 如果ESPN没匹配上，再尝试 stats boxscore（可能被拦），各场并发请求
+                if not any(leaders.get(k) for k in LEADER_KEYS):
+                    missing.append(i)
+
+            # 同一 GAME_ID 只请求一次
+            stats_tasks: Dict[str, "asyncio.Future"] = {}
+            for i in missing:
+                mm = matches[i]
+                gid = str(mm.get("id"))
+                if gid not in stats_tasks:
+                    stats_tasks[gid] = asyncio.ensure_future(_fetch_stats_boxscore_leaders_async(
+                        fetcher, gid, mm.get("homeTeamId"), mm.get("awayTeamId")))
+            if stats_tasks:
+                await asyncio.gather(*stats_tasks.values())
+            for i in missing:
+                leaders_by_index[i] = stats_tasks[str(matches[i].get("id"))].result() or {}
+
+            for i, leaders in sorted(leaders_by_index.items()):
+                if leaders:
+                    matches[i] = matches[i].updated(leaders)
         except Exception as e:
             if debug:
-                print(f"ESPN leaders抓取异常: {e}", file=sys.stderr)
-            return {}
+                print(f"补抓球员统计失败(ESPN/Stats): {e}", file=sys.stderr)
+        return matches
+    except Exception as e:
+        print(f"Stats请求/解析异常: {e}", file=sys.stderr)
+        return []
+    finally:
+        # 预取的 ESPN 没用上（无需补抓或提前失败）时取消
+        if espn_task is not None and not espn_task.done():
+            espn_task.cancel()
 
-    matches = []
-    for url in api_urls:
-        try:
-            print(f"正在尝试(Stats): {url}", file=sys.stderr)
-            response = requests.get(url, headers=headers, timeout=20)
-            if response.status_code != 200:
-                print(f"Stats请求失败: {response.status_code}", file=sys.stderr)
-                continue
-            data = response.json()
-            if not data or 'resultSets' not in data:
-                continue
 
-            game_header = None
-            line_score = None
-            for rs in data.get('resultSets', []):
-                if rs.get('name') == 'GameHeader':
-                    game_header = rs
-                elif rs.get('name') == 'LineScore':
-                    line_score = rs
-            if not game_header or not line_score:
-                continue
+# 对冲请求：CDN 超过 HEDGE_DELAY 秒未返回时并行请求 stats.nba.com；有进行中比赛的日期立即并行
+HEDGE_ENABLED = _env_flag("NBA_HEDGE", True)
+HEDGE_DELAY = max(0.0, _env_float("NBA_HEDGE_DELAY", 3.0))
+# 美东午夜后这么多小时内，前一天的比赛可能仍在进行
+LIVE_AFTER_MIDNIGHT_HOURS = 3
 
-            headers_list = game_header.get('headers', [])
-            rows = game_header.get('rowSet', [])
-            line_score_headers = line_score.get('headers', [])
-            line_score_rows = line_score.get('rowSet', [])
-
-            game_id_idx = headers_list.index(
-                'GAME_ID') if 'GAME_ID' in headers_list else -1
-            game_status_idx = headers_list.index(
-                'GAME_STATUS_TEXT') if 'GAME_STATUS_TEXT' in headers_list else -1
-            game_status_id_idx = headers_list.index(
-                'GAME_STATUS_ID') if 'GAME_STATUS_ID' in headers_list else -1
-            game_date_idx = headers_list.index(
-                'GAME_DATE_EST') if 'GAME_DATE_EST' in headers_list else -1
-            home_team_id_idx = headers_list.index(
-                'HOME_TEAM_ID') if 'HOME_TEAM_ID' in headers_list else -1
-            visitor_team_id_idx = headers_list.index(
-                'VISITOR_TEAM_ID') if 'VISITOR_TEAM_ID' in headers_list else -1
-            arena_idx = headers_list.index(
-                'ARENA_NAME') if 'ARENA_NAME' in headers_list else -1
-
-            game_id_idx_ls = line_score_headers.index(
-                'GAME_ID') if 'GAME_ID' in line_score_headers else -1
-            team_id_idx_ls = line_score_headers.index(
-                'TEAM_ID') if 'TEAM_ID' in line_score_headers else -1
-            pts_idx_ls = line_score_headers.index(
-                'PTS') if 'PTS' in line_score_headers else -1
-
-            if game_id_idx == -1:
-                continue
 
-            for game in rows:
-                try:
-                    game_id = game[game_id_idx]
-                    game_status = str(
-                        game[game_status_idx] or '') if game_status_idx != -1 else ''
-                    game_status_id = _to_int_or_none(
-                        game[game_status_id_idx]) if game_status_id_idx != -1 else None
-                    game_date = game[game_date_idx] if game_date_idx != - \
-                        1 else date_str
-                    home_team_id = game[home_team_id_idx] if home_team_id_idx != -1 else None
-                    visitor_team_id = game[visitor_team_id_idx] if visitor_team_id_idx != -1 else None
-                    arena = str(game[arena_idx]
-                                or '未知场馆') if arena_idx != -1 else '未知场馆'
-
-                    home_team_name = get_chinese_team_name(home_team_id, None)
-                    away_team_name = get_chinese_team_name(
-                        visitor_team_id, None)
-
-                    home_score = None
-                    away_score = None
-                    if game_id_idx_ls != -1 and team_id_idx_ls != -1 and pts_idx_ls != -1:
-                        home_team_data = next(
-                            (row for row in line_score_rows if row[game_id_idx_ls] == game_id and row[team_id_idx_ls] == home_team_id), None)
-                        away_team_data = next(
-                            (row for row in line_score_rows if row[game_id_idx_ls] == game_id and row[team_id_idx_ls] == visitor_team_id), None)
-                        if home_team_data and away_team_data:
-                            home_pts = home_team_data[pts_idx_ls]
-                            away_pts = away_team_data[pts_idx_ls]
-                            home_score = int(
-                                home_pts) if home_pts is not None else None
-                            away_score = int(
-                                away_pts) if away_pts is not None else None
-
-                    # ✅ 使用 GAME_STATUS_ID 更可靠：1=upcoming, 2=live, 3=finished
-                    status = 'upcoming'
-                    if game_status_id == 2:
-                        status = 'live'
-                    elif game_status_id == 3:
-                        status = 'finished'
-                    elif game_status_id == 1:
-                        status = 'upcoming'
-                    else:
-                        # 兜底：用文本判断
-                        status_upper = game_status.upper().strip()
-                        if 'FINAL' in status_upper:
-                            status = 'finished'
-                        elif status_upper == '' or 'ET' in status_upper or 'PM' in status_upper or 'AM' in status_upper:
-                            status = 'upcoming'
-                        else:
-                            status = 'live'
-
-                    game_date_str = game_date.split('T')[0] if 'T' in str(
-                        game_date) else str(game_date).split()[0]
-                    m = {
-                        'id': str(game_id),
-                        'homeTeam': home_team_name,
-                        'awayTeam': away_team_name,
-                        'homeTeamId': int(home_team_id) if home_team_id is not None else None,
-                        'awayTeamId': int(visitor_team_id) if visitor_team_id is not None else None,
-                        'homeScore': home_score,
-                        'awayScore': away_score,
-                        'status': status,
-                        'date': game_date_str,
-                        'time': game_status if game_status else 'TBD',
-                        'league': 'NBA',
-                        'venue': arena
-                    }
-                    matches.append(m)
-                except Exception:
+def _print_source_stats() -> None:
+    # 各来源胜出的天数（CDN 直接成功也计入）
+    source_wins = METRICS.totals("source_wins_total", "source")
+    if source_wins:
+        wins = ", ".join(f"{k} {v:g} 天" for k, v in sorted(source_wins.items()))
+        print(f"数据来源: {wins}", file=sys.stderr)
+
+
+def _base_et_for_offset(date_offset: int) -> datetime:
+    # ✅ 按官网口径：以美东(ET)作为“日期分组/今天”的基准；按时刻回放时以回放时刻为“今天”
+    tz = ZoneInfo("America/New_York")
+    now = datetime.fromtimestamp(REPLAY_AS_OF, tz) if REPLAY_ENABLED and REPLAY_AS_OF is not None else datetime.now(tz)
+    return now + timedelta(days=date_offset)
+
+
+async def fetch_nba_schedule_for_date_async(date_offset: int, fetcher: Optional[AsyncFetcher] = None, reuse: Optional[Dict[str, Dict]] = None,
+                                            hedge_delay: Optional[float] = None, raise_on_failure: bool = False) -> List[Dict]:
+    """
+    获取指定日期的NBA赛程（优先使用cdn.nba.com官方JSON，更稳定）
+    reuse: {gameId: 上次的比赛数据}，这些比赛本轮不补抓球员统计（由刷新调度决定）
+    hedge_delay / raise_on_failure: 见 fetch_nba_schedule_for_et_date_async
+    """
+    return await fetch_nba_schedule_for_et_date_async(_base_et_for_offset(date_offset), fetcher, reuse, hedge_delay,
+                                                      raise_on_failure)
+
+
+async def _first_valid_source(tasks: Dict[str, "asyncio.Future"]) -> Tuple[Optional[str], List[Dict]]:
+    """
+    等待各来源的抓取任务，返回第一个非空结果 (来源, 比赛列表)，其余任务取消；
+    同时完成时按 tasks 的顺序优先（CDN 在前）。全部为空或失败时返回 (None, [])。
+    """
+    pending = set(tasks.values())
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for source, task in tasks.items():
+                if task not in done or task.cancelled():
                     continue
+                if task.exception() is not None:
+                    print(f"{source} 抓取异常: {task.exception()}", file=sys.stderr)
+                    continue
+                if task.result():
+                    return source, task.result()
+        return None, []
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def fetch_nba_schedule_for_et_date_async(base_et: datetime, fetcher: Optional[AsyncFetcher] = None, reuse: Optional[Dict[str, Dict]] = None,
+                                               hedge_delay: Optional[float] = None, raise_on_failure: bool = False) -> List[Dict]:
+    """
+    获取指定美东日期（带时区的 datetime）的NBA赛程，流程同 fetch_nba_schedule_for_date_async。
+    hedge_delay: CDN 超过该秒数未返回时并行请求 stats.nba.com（默认 NBA_HEDGE_DELAY），0 表示立即并行
+    raise_on_failure: 所有来源都失败时抛出 DayFetchError，而不是返回空列表
+                      （CDN scoreboard 成功返回、当天没有比赛时仍返回空列表）
+    """
+    if fetcher is None:
+        async with AsyncFetcher() as own_fetcher:
+            return await fetch_nba_schedule_for_et_date_async(base_et, own_fetcher, reuse, hedge_delay, raise_on_failure)
+
+    day_key = base_et.strftime("%Y%m%d")
+    started = time.perf_counter()
+
+    # 0) 整天都已定型：直接返回本地存储，零请求
+    store = get_finished_store()
+    if store is not None:
+        try:
+            stored_day = store.get_day(day_key)
+        except sqlite3.Error:
+            stored_day = None
+        METRICS.inc("finished_store_total", scope="day", result="hit" if stored_day is not None else "miss")
+        if stored_day is not None:
+            print(f"本地存储命中 {day_key}: {len(stored_day)} 场已完赛比赛", file=sys.stderr)
+            METRICS.record_stage("day", time.perf_counter() - started, "ok" if stored_day else "empty", day_key)
+            return stored_day
+
+    # 1) 优先CDN；CDN scoreboard 迟迟不返回时并行请求 stats.nba.com（对冲），取先完成的有效结果。
+    #    对冲只和 scoreboard 这一次请求赛跑：scoreboard 先返回就确定走 CDN，取消 stats，
+    #    之后补抓 boxscore 再慢也不会触发对冲
+    if hedge_delay is None:
+        hedge_delay = HEDGE_DELAY
+    tasks: Dict[str, "asyncio.Future"] = {
+        "cdn": asyncio.ensure_future(_fetch_cdn_scoreboard_games_async(fetcher, base_et))}
+    try:
+        if HEDGE_ENABLED:
+            await asyncio.wait(tasks.values(), timeout=max(0.0, hedge_delay))
+            if not tasks["cdn"].done():
+                print(f"CDN {hedge_delay:g}s 内未返回，并行请求 stats.nba.com", file=sys.stderr)
+                tasks["stats"] = asyncio.ensure_future(_fetch_with_stats_scoreboard_async(
+                    fetcher, base_et, reuse, prefetch_espn=hedge_delay <= 0))
+        source, matches = await _first_valid_source(tasks)
+    finally:
+        for task in tasks.values():
+            task.cancel()
+    if source == "cdn":
+        matches = await _assemble_cdn_matches_async(fetcher, base_et, matches, reuse)
+        if not matches:
+            source = None
+
+    # 2) 兜底：CDN 没有数据、且 stats.nba.com 没有跑完对冲请求时，再请求 stats.nba.com（可能被拦）
+    stats_task = tasks.get("stats")
+    if source is None and (stats_task is None or stats_task.cancelled()):
+        matches = await _fetch_with_stats_scoreboard_async(fetcher, base_et, reuse)
+        source = "stats" if matches else None
+    if source == "cdn":
+        print(f"CDN成功获取 {len(matches)} 场比赛", file=sys.stderr)
+    if source is not None:
+        METRICS.inc("source_wins_total", source=source)
+        if len(tasks) > 1:
+            print(f"{day_key}: 对冲请求由 {source} 胜出", file=sys.stderr)
+    if len(tasks) > 1:
+        METRICS.inc("hedges_total", winner=source or "none")
+    _store_finished_day(day_key, matches)
+    METRICS.record_stage("day", time.perf_counter() - started, "ok" if matches else "empty", day_key)
+    if not matches and raise_on_failure:
+        cdn = tasks["cdn"]
+        if cdn.cancelled() or cdn.exception() is not None or cdn.result() is None:
+            raise DayFetchError(f"{day_key}: 所有来源均未返回赛程")
+    return matches
+
+
+def fetch_nba_schedule_for_date(date_offset: int) -> List[Dict]:
+    """获取指定日期的NBA赛程（同步入口，内部运行异步引擎）"""
+    try:
+        return asyncio.run(fetch_nba_schedule_for_date_async(date_offset))
+    finally:
+        _save_identity_registry()
+        _flush_player_store()
 
-            if matches:
-                # ✅ 对 live/finished 补抓球员统计：优先 ESPN（稳定、单次请求）
-                try:
-                    yyyymmdd_target = target_date.strftime("%Y%m%d")
-                    espn_map = _fetch_espn_leaders_map(yyyymmdd_target)
-                    for i, mm in enumerate(matches):
-                        if mm.get("status") not in ("live", "finished"):
-                            continue
-                        key = (mm.get("homeTeam"), mm.get("awayTeam"))
-                        leaders = espn_map.get(key) or {}
-                        # 如果ESPN没匹配上，再尝试 stats boxscore（可能被拦）
-                        if not any(leaders.get(k) for k in ("homeTopScorer", "homeTopRebounder", "homeTopAssister", "awayTopScorer", "awayTopRebounder", "awayTopAssister")):
-                            leaders = _fetch_stats_boxscore_leaders(
-                                str(mm.get("id")), mm.get("homeTeamId"), mm.get("awayTeamId")) or {}
-                        if leaders:
-                            matches[i].update(leaders)
-                except Exception as e:
-                    if debug:
-                        print(f"补抓球员统计失败(ESPN/Stats): {e}", file=sys.stderr)
-                return matches
-        except Exception as e:
-            print(f"Stats请求/解析异常: {e}", file=sys.stderr)
-            continue
 
+# range(-3, 4) 表示：往前3天、往前2天、往前1天、今天、未来1天、未来2天、未来3天
+# 扩展范围以确保能覆盖时区差异（北京时间往前2天可能对应美东时区的往前3天）
+DAY_OFFSETS = tuple(range(-3, 4))
+
+
+def _day_may_be_live(offset: int, previous: Optional[List[Dict]]) -> bool:
+    """
+    判断某天是否可能有进行中比赛：上次抓取时有进行中比赛；
+    或者是美东“今天”（凌晨 LIVE_AFTER_MIDNIGHT_HOURS 小时内也包括前一天，跨午夜的比赛仍归在前一天），
+    且上次结果没有显示全部完赛。没有刷新调度（上次结果）时只按日期判断。
+    """
+    if previous and any(m.get("status") == "live" for m in previous):
+        return True
+    if previous and all(m.get("status") == "finished" for m in previous):
+        return False
+    if offset == 0:
+        return True
+    return offset == -1 and _base_et_for_offset(0).hour < LIVE_AFTER_MIDNIGHT_HOURS
+
+
+async def _fetch_one_day_async(offset: int, fetcher: AsyncFetcher, scheduler: Optional[RefreshScheduler], now: float) -> List[Dict]:
+    """
+    获取单天数据（失败返回空列表）；传入 scheduler 时未到期的日期直接沿用上次结果，
+    抓取失败时沿用上次结果并稍后重试（不记为没有比赛）
+    """
+    day_key = _base_et_for_offset(offset).strftime("%Y%m%d")
+    reuse = None
+    hedge_delay = None
+    if scheduler is not None:
+        if not scheduler.day_is_due(day_key, now):
+            matches = scheduler.previous_matches(day_key) or []
+            print(
+                f"DayOffset={offset}: 未到刷新时间，沿用上次的 {len(matches)} 场比赛", file=sys.stderr)
+            return matches
+        reuse = scheduler.reusable_games(day_key, now)
+    previous = scheduler.previous_matches(day_key) if scheduler is not None else None
+    # 可能有进行中比赛：不等 CDN，立即对冲
+    if _day_may_be_live(offset, previous):
+        hedge_delay = 0.0
+    try:
+        matches = await fetch_nba_schedule_for_date_async(offset, fetcher, reuse, hedge_delay,
+                                                          raise_on_failure=scheduler is not None)
+        print(
+            f"DayOffset={offset}: 获取到 {len(matches)} 场比赛", file=sys.stderr)
+    except Exception as e:
+        print(f"获取DayOffset={offset}的数据失败: {e}", file=sys.stderr)
+        if scheduler is None:
+            return []
+        scheduler.mark_failed(day_key, now)
+        matches = scheduler.previous_matches(day_key) or []
+        if matches:
+            print(f"DayOffset={offset}: 沿用上次的 {len(matches)} 场比赛，稍后重试", file=sys.stderr)
+        return matches
+    if scheduler is not None:
+        scheduler.update_day(day_key, matches, now)
     return matches
 
 
-def fetch_nba_schedule_multi_day() -> List[Dict]:
-    """获取多天的NBA赛程（过去2天、今天、未来3天）- 优化：使用并发请求
-    例如：如果今天是2月11号，会爬取9号、10号、11号、12号、13号、14号的数据
-    已结束的比赛：只显示往前2天和往前1天的数据（9号和10号）
+def _finish_scheduler_cycle(scheduler: Optional[RefreshScheduler]) -> None:
+    _save_identity_registry()
+    _flush_player_store()
+    if scheduler is not None:
+        scheduler.prune([_base_et_for_offset(offset).strftime("%Y%m%d") for offset in DAY_OFFSETS])
+        scheduler.save()
+
+
+async def fetch_nba_schedule_multi_day_async(fetcher: Optional[AsyncFetcher] = None, scheduler: Optional[RefreshScheduler] = None) -> List[Dict]:
+    """获取多天的NBA赛程（往前3天 ~ 未来3天）- 所有请求在同一个事件循环中调度
+    例如：如果今天是2月11号，会爬取8号 ~ 14号的数据
+    结果按日期偏移顺序去重合并，输出顺序稳定
+    传入 scheduler 时只请求已到期的日期/比赛，其余沿用上次结果
     """
+    if fetcher is None:
+        async with AsyncFetcher() as own_fetcher:
+            return await fetch_nba_schedule_multi_day_async(own_fetcher, scheduler)
+
+    now = time.time()
+    per_day = await asyncio.gather(*(_fetch_one_day_async(offset, fetcher, scheduler, now) for offset in DAY_OFFSETS))
+    _finish_scheduler_cycle(scheduler)
+
     all_matches: List[Dict] = []
     seen_ids = set()
+    for matches in per_day:
+        # 去重（防止不同 offset 下偶发返回重复 GAME_ID）
+        for m in matches:
+            mid = m.get('id')
+            if not mid or mid in seen_ids:
+                continue
+            seen_ids.add(mid)
+            all_matches.append(m)
+    return all_matches
 
-    # 优化：使用线程池并发请求多天数据，而不是串行请求
-    def fetch_one_day(offset: int) -> tuple[int, List[Dict]]:
-        """获取单天数据，返回 (offset, matches)"""
-        try:
-            matches = fetch_nba_schedule_for_date(offset)
-            print(
-                f"DayOffset={offset}: 获取到 {len(matches)} 场比赛", file=sys.stderr)
-            return (offset, matches)
-        except Exception as e:
-            print(f"获取DayOffset={offset}的数据失败: {e}", file=sys.stderr)
-            return (offset, [])
-
-    # 使用线程池并发执行，最多3个线程同时请求
-    # range(-3, 4) 表示：往前3天、往前2天、往前1天、今天、未来1天、未来2天、未来3天
-    # 扩展范围以确保能覆盖时区差异（北京时间往前2天可能对应美东时区的往前3天）
-    with ThreadPoolExecutor(max_workers=3) as executor:
-        # 提交所有任务
-        future_to_offset = {
-            executor.submit(fetch_one_day, offset): offset
-            for offset in range(-3, 4)
-        }
 
-        # 按完成顺序收集结果（先完成的先处理）
-        for future in as_completed(future_to_offset):
-            offset, matches = future.result()
-            # 去重（防止不同 offset 下偶发返回重复 GAME_ID）
+async def iter_nba_schedule_multi_day_async(fetcher: Optional[AsyncFetcher] = None, scheduler: Optional[RefreshScheduler] = None) -> AsyncIterator[Tuple[int, List[Dict]]]:
+    """
+    流式获取多天赛程：每完成一天立即产出 (offset, 该天去重后的新比赛)，
+    先完成的日期先产出，不必等待最慢的一天。
+    """
+    if fetcher is None:
+        async with AsyncFetcher() as own_fetcher:
+            async for item in iter_nba_schedule_multi_day_async(own_fetcher, scheduler):
+                yield item
+        return
+
+    now = time.time()
+
+    async def fetch_tagged(offset: int) -> Tuple[int, List[Dict]]:
+        return offset, await _fetch_one_day_async(offset, fetcher, scheduler, now)
+
+    seen_ids = set()
+    for next_done in asyncio.as_completed([fetch_tagged(offset) for offset in DAY_OFFSETS]):
+        offset, matches = await next_done
+        fresh: List[Dict] = []
+        # 去重（防止不同 offset 下偶发返回重复 GAME_ID）
+        for m in matches:
+            mid = m.get('id')
+            if not mid or mid in seen_ids:
+                continue
+            seen_ids.add(mid)
+            fresh.append(m)
+        yield offset, fresh
+    _finish_scheduler_cycle(scheduler)
+
+
+def fetch_nba_schedule_multi_day(scheduler: Optional[RefreshScheduler] = None) -> List[Dict]:
+    """获取多天的NBA赛程（同步入口，内部运行异步引擎）"""
+    return asyncio.run(fetch_nba_schedule_multi_day_async(scheduler=scheduler))
+
+
+BACKFILL_CONCURRENCY = _env_int("NBA_BACKFILL_CONCURRENCY", DEFAULT_BACKFILL_CONCURRENCY)
+
+
+def _backfill_checkpoint_path() -> str:
+    return os.path.join(CACHE_DIR, "backfill_checkpoint.json")
+
+
+async def backfill_nba_schedule_async(start: str, end: str, on_day: Callable[[datetime, List[Dict]], Awaitable[None]],
+                                      fetcher: Optional[AsyncFetcher] = None, concurrency: Optional[int] = None,
+                                      checkpoint_path: Optional[str] = None) -> Dict:
+    """
+    回填 [start, end]（美东日期，YYYY-MM-DD）之间每一天的赛程，同时最多抓取 concurrency 天。
+    每成功抓取一天 await on_day(美东日期, 比赛列表)；检查点中已完成的日期直接跳过，请求失败的日期不输出。
+    checkpoint_path 为 None 时使用 NBA_CACHE_DIR/backfill_checkpoint.json，传空字符串不使用检查点。
+    返回汇总 {days, skipped, completed, incomplete, failed, count}
+    """
+    if fetcher is None:
+        async with AsyncFetcher() as own_fetcher:
+            return await backfill_nba_schedule_async(start, end, on_day, own_fetcher, concurrency, checkpoint_path)
+
+    days = et_date_range(parse_et_date(start), parse_et_date(end))
+    if checkpoint_path is None:
+        # 回放是重新生成输出，默认不跳过检查点中已完成的日期
+        checkpoint_path = "" if REPLAY_ENABLED else _backfill_checkpoint_path()
+    checkpoint = BackfillCheckpoint(checkpoint_path or None)
+
+    async def fetch_day(base_et: datetime) -> List[Dict]:
+        return await fetch_nba_schedule_for_et_date_async(base_et, fetcher, raise_on_failure=True)
+
+    try:
+        return await run_backfill(days, fetch_day, on_day, checkpoint, concurrency or BACKFILL_CONCURRENCY)
+    finally:
+        _save_identity_registry()
+        _flush_player_store()
+
+
+def backfill_nba_schedule(start: str, end: str, on_day: Callable[[datetime, List[Dict]], Awaitable[None]], **kwargs) -> Dict:
+    """日期区间回填（同步入口，内部运行异步引擎）"""
+    return asyncio.run(backfill_nba_schedule_async(start, end, on_day, **kwargs))
+
+
+def _build_result(matches: List[Dict]) -> Dict:
+    return {
+        'matches': matches,
+        'count': len(matches),
+        'error': False
+    }
+
+
+async def _serve_snapshots(args: argparse.Namespace) -> None:
+    """常驻模式：复用同一个抓取器（连接保持温热），定时刷新并提供快照"""
+    scheduler = RefreshScheduler(_refresh_schedule_path())
+    async with AsyncFetcher() as fetcher:
+        async def refresh() -> Dict:
+            # /metrics 中的最慢日期/比赛只反映最近一轮刷新
+            METRICS.reset_slowest()
+            matches = await fetch_nba_schedule_multi_day_async(fetcher, scheduler)
+            await asyncio.to_thread(_sink_matches, matches)
+            return _build_result(matches)
+
+        snapshot_path = None if args.snapshot_file == "" else (
+            args.snapshot_file or os.path.join(CACHE_DIR, "snapshot.json"))
+        # 按调度的最近到期时间唤醒刷新（最长不超过 --interval）
+        daemon = SnapshotDaemon(refresh, args.interval, snapshot_path,
+                                next_refresh_in=scheduler.seconds_until_next_due,
+                                change_feed=ChangeFeed(_change_feed_path()), metrics=METRICS)
+        await daemon.serve(args.host, args.port, args.unix_socket)
+
+
+def _refresh_schedule_path() -> str:
+    return os.path.join(CACHE_DIR, "refresh_schedule.json")
+
+
+def _change_feed_path() -> str:
+    return os.path.join(CACHE_DIR, "change_feed.json")
+
+
+def _build_feed_output(matches: List[Dict], args: argparse.Namespace) -> Dict:
+    """变更流输出：合并本次结果后，按 --if-none-match / --since 给出未变化标记、增量或带版本的全量"""
+    feed = ChangeFeed(_change_feed_path())
+    if feed.apply(matches):
+        feed.save()
+    if args.if_none_match and args.if_none_match == feed.etag:
+        return {"notModified": True, "epoch": feed.epoch, "version": feed.version, "etag": feed.etag, "error": False}
+    if args.since is not None:
+        return feed.changes_since(args.since, args.epoch)
+    result = _build_result(matches)
+    result.update({"epoch": feed.epoch, "version": feed.version, "etag": feed.etag})
+    return result
+
+
+def _write_line(obj: Dict) -> None:
+    with METRICS.stage("serialize"):
+        line = nba_json.dumps(obj)
+    sys.stdout.write(line + "\n")
+    sys.stdout.flush()
+
+
+def _with_metrics(result: Dict, args: argparse.Namespace) -> Dict:
+    """
+    按 --metrics 输出指标：指定 --metrics-file 时写入文件；否则 json 格式附在结果的 "metrics" 字段，
+    prometheus 格式写到标准错误
+    """
+    if not args.metrics:
+        return result
+    if args.metrics_file:
+        text = METRICS.prometheus() if args.metrics == "prometheus" else nba_json.dumps(METRICS.snapshot())
+        try:
+            with open(args.metrics_file, "w", encoding="utf-8") as f:
+                f.write(text)
+        except OSError as e:
+            print(f"指标写入失败: {e}", file=sys.stderr)
+    elif args.metrics == "json":
+        result["metrics"] = METRICS.snapshot()
+    else:
+        sys.stderr.write(METRICS.prometheus())
+    return result
+
+
+async def _stream_ndjson(args: argparse.Namespace) -> None:
+    """NDJSON 流式输出：每完成一天立即输出（每场一行或每天一行），最后输出汇总行"""
+    scheduler = RefreshScheduler(_refresh_schedule_path()) if args.adaptive else None
+    count = 0
+    streamed: List[Dict] = []
+    async for offset, matches in iter_nba_schedule_multi_day_async(scheduler=scheduler):
+        count += len(matches)
+        streamed.extend(matches)
+        if args.stream == "day":
+            _write_line({"type": "day", "dayOffset": offset, "matches": matches})
+        else:
             for m in matches:
-                mid = m.get('id')
-                if not mid or mid in seen_ids:
-                    continue
-                seen_ids.add(mid)
-                all_matches.append(m)
+                _write_line({"type": "match", "dayOffset": offset, "match": m})
+    # 整轮结束后一次写入数据库（一个事务）
+    _sink_matches(streamed)
+    _write_line(_with_metrics({"type": "summary", "count": count, "error": False}, args))
+
+
+def _run_backfill(args: argparse.Namespace) -> Dict:
+    """回填模式：每完成一天输出一行 NDJSON（--output 指定文件时追加写入），最后在标准输出打印汇总行"""
+    out = open(args.output, "a", encoding="utf-8") if args.output else sys.stdout
+    out_lock = threading.Lock()
+
+    def write_day(line: str, matches: List[Dict]) -> None:
+        with out_lock:
+            out.write(line + "\n")
+            out.flush()
+            if out is not sys.stdout:
+                os.fsync(out.fileno())
+        _sink_matches(matches)
+
+    async def on_day(base_et: datetime, matches: List[Dict]) -> None:
+        with METRICS.stage("serialize"):
+            line = nba_json.dumps({"type": "day", "date": base_et.strftime("%Y-%m-%d"), "matches": matches})
+        # 落盘和写库放到线程中，不阻塞其他日期的抓取
+        await asyncio.to_thread(write_day, line, matches)
 
-    return all_matches
+    try:
+        return backfill_nba_schedule(args.backfill[0], args.backfill[1], on_day,
+                                     concurrency=args.backfill_concurrency, checkpoint_path=args.checkpoint)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+# ===== 文字直播（play-by-play）增量处理 =====
+# --pbp [GAME_ID ...]：抓取比赛的 playbyplay，按每场的 actionNumber 游标只输出新 action（附比分、领先变换 / 打平标记），
+# 游标保存在 NBA_CACHE_DIR/pbp_cursors.json，重启后从断点继续；不指定 gameId 时取今天（美东）已开赛的比赛。
+# --follow 时每 NBA_PBP_INTERVAL（或 --pbp-interval，默认 10）秒轮询一次，直到所有比赛（含今天尚未开赛的）结束
+PBP_INTERVAL = max(1.0, _env_float("NBA_PBP_INTERVAL", 10.0))
+
+
+def _pbp_cursor_path() -> str:
+    return os.path.join(CACHE_DIR, "pbp_cursors.json")
+
+
+async def _pbp_schedule(fetcher: AsyncFetcher) -> Optional[Dict[str, int]]:
+    """今天（美东）CDN scoreboard 中全部比赛的 {gameId: gameStatus}（1 未开赛，2 进行中，3 已结束），请求失败返回 None"""
+    url = _cdn_scoreboard_url(_base_et_for_offset(0).strftime("%Y%m%d"))
+    try:
+        resp = await fetcher.get(url, headers=CDN_HEADERS, timeout=20)
+    except Exception as e:
+        print(f"CDN请求异常: {e}", file=sys.stderr)
+        return None
+    if resp.status_code != 200:
+        print(f"CDN请求失败: {resp.status_code}", file=sys.stderr)
+        return None
+    games = (resp.json().get("scoreboard") or {}).get("games") or []
+    return {str(g["gameId"]): _to_int_loose(g.get("gameStatus")) or 1 for g in games if g.get("gameId")}
+
+
+@METRICS.timed_stage("cdn_playbyplay", key=lambda fetcher, cursors, game_id: game_id)
+async def _poll_playbyplay_async(fetcher: AsyncFetcher, cursors: PlayByPlayCursors, game_id: str) -> List[Dict]:
+    """抓取一场比赛的 playbyplay，返回游标之后的新事件（未开赛 / 请求失败时为空）"""
+    url = _cdn_playbyplay_url(game_id)
+    debug = _is_debug()
+    try:
+        resp = await fetcher.get(url, headers=CDN_HEADERS, timeout=15)
+        if resp.status_code != 200:
+            if debug:
+                print(f"playbyplay请求失败: {resp.status_code} {url}", file=sys.stderr)
+            return []
+        return cursors.ingest(game_id, resp.content)
+    except Exception as e:
+        if debug:
+            print(f"playbyplay请求异常: {e} {url}", file=sys.stderr)
+        return []
 
 
-def main():
+async def _run_playbyplay(args: argparse.Namespace) -> Dict:
+    """
+    文字直播模式：每轮每场比赛的新事件输出为 action 行，随后一行该场的 game 状态，返回汇总。
+    不指定 gameId 时每轮按今天的 scoreboard 只请求已开赛的比赛；--follow 一直轮询到今天所有比赛（含未开赛的）结束
+    """
+    cursors = PlayByPlayCursors(_pbp_cursor_path())
+    interval = args.pbp_interval or PBP_INTERVAL
+    explicit = list(dict.fromkeys(args.pbp))
+    schedule: Dict[str, int] = {}
+    # scoreboard 已显示结束、且之后已请求过一次的比赛（事件已完整）
+    settled = set()
+    count, polled = 0, set()
+    async with AsyncFetcher() as fetcher:
+        while True:
+            if explicit:
+                game_ids = cursors.active(explicit)
+            else:
+                # scoreboard 请求失败时沿用上一轮的赛程
+                schedule = await _pbp_schedule(fetcher) or schedule
+                game_ids = [gid for gid in cursors.active(schedule)
+                            if schedule[gid] >= 2 and gid not in settled]
+            polled.update(game_ids)
+            per_game = await asyncio.gather(*(_poll_playbyplay_async(fetcher, cursors, gid) for gid in game_ids))
+            for gid, events in zip(game_ids, per_game):
+                for event in events:
+                    _write_line({"type": "action", **event})
+                if events:
+                    _write_line({"type": "game", **cursors.games[gid].summary()})
+                count += len(events)
+            cursors.save()
+            if explicit:
+                pending = cursors.active(explicit)
+            else:
+                settled.update(gid for gid in game_ids if schedule[gid] == 3)
+                pending = [gid for gid in cursors.active(schedule)
+                           if schedule[gid] == 1 or (schedule[gid] == 2 and gid not in settled)]
+            if not args.follow or not pending:
+                break
+            await asyncio.sleep(interval)
+    return {"games": len(polled), "count": count, "decode": dict(cursors.stats)}
+
+
+def _parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="NBA数据爬虫：默认抓取一次并输出JSON")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="按比赛状态自适应刷新：只请求已到期的日期/比赛，其余沿用上次结果（常驻模式默认开启）")
+    parser.add_argument("--since", type=int, default=None,
+                        help="变更流：只输出该版本号之后内容变化的比赛（含被删除的 gameId）")
+    parser.add_argument("--epoch", default=None,
+                        help="变更流：上次输出中的 epoch，不一致时返回全量")
+    parser.add_argument("--if-none-match", default=None,
+                        help="变更流：上次输出中的 etag，内容未变时只输出 notModified 标记")
+    parser.add_argument("--stream", choices=("match", "day"), default=None,
+                        help="NDJSON 流式输出：每完成一天立即输出，match 为每场一行，day 为每天一行，最后一行为汇总")
+    parser.add_argument("--serve", action="store_true",
+                        help="常驻模式：后台定时刷新，通过本地HTTP提供最新快照")
+    parser.add_argument("--host", default="127.0.0.1", help="常驻模式监听地址")
+    parser.add_argument("--port", type=int, default=8787, help="常驻模式监听端口")
+    parser.add_argument("--unix-socket", default=None,
+                        help="常驻模式改用 Unix domain socket（指定路径时忽略 --host/--port）")
+    parser.add_argument("--interval", type=float, default=60,
+                        help="常驻模式最长刷新间隔（秒），实际按刷新调度的到期时间提前唤醒")
+    parser.add_argument("--snapshot-file", default=None,
+                        help="快照持久化文件（默认 NBA_CACHE_DIR/snapshot.json，传空字符串关闭）")
+    parser.add_argument("--backfill", nargs=2, metavar=("START", "END"), default=None,
+                        help="回填模式：抓取美东日期区间 [START, END]（YYYY-MM-DD）内每一天，按天输出 NDJSON")
+    parser.add_argument("--backfill-concurrency", type=int, default=None,
+                        help="回填模式同时抓取的天数（默认 NBA_BACKFILL_CONCURRENCY 或 4）")
+    parser.add_argument("--checkpoint", default=None,
+                        help="回填检查点文件（默认 NBA_CACHE_DIR/backfill_checkpoint.json，传空字符串关闭）")
+    parser.add_argument("--output", default=None,
+                        help="回填结果追加写入的 NDJSON 文件（默认标准输出）")
+    parser.add_argument("--pbp", nargs="*", default=None, metavar="GAME_ID",
+                        help="文字直播模式：按每场的 actionNumber 游标只输出新的 play-by-play 事件（NDJSON），"
+                             "不指定 gameId 时取今天已开赛的比赛（--follow 时等待未开赛的比赛）")
+    parser.add_argument("--follow", action="store_true",
+                        help="文字直播模式持续轮询，直到所有比赛结束（不指定 gameId 时包括今天尚未开赛的比赛）")
+    parser.add_argument("--pbp-interval", type=float, default=None,
+                        help="文字直播模式的轮询间隔（秒），默认 NBA_PBP_INTERVAL 或 10")
+    parser.add_argument("--archive", action="store_true",
+                        help="把上游原始响应压缩归档（按内容去重），供之后离线回放（同 NBA_ARCHIVE=1）")
+    parser.add_argument("--replay", action="store_true",
+                        help="离线回放：所有请求从原始响应归档读取，不访问网络（同 NBA_REPLAY=1）")
+    parser.add_argument("--as-of", type=parse_as_of, default=None,
+                        help="回放时刻（Unix 时间戳或 ISO 时间，无时区按美东），默认取每个 URL 最新的响应")
+    parser.add_argument("--parse-workers", type=int, nargs="?", const=os.cpu_count() or 1, default=None,
+                        help="boxscore 解析进程数（同 NBA_PARSE_WORKERS），不带数值时取 CPU 核数；"
+                             "适合回填 / 回放等批量任务，0 表示在本进程解析")
+    parser.add_argument("--player-store", action="store_true",
+                        help="把完赛比赛全部上场球员的单场数据追加到列式存储（同 NBA_PLAYER_STORE=1，需要 numpy），"
+                             "用 nba_player_store.py 查询")
+    parser.add_argument("--db-sink", nargs="?", const="", default=None, metavar="URL",
+                        help="把内容变化的比赛和数据王写入平台数据库（同 NBA_DB_SINK）：mysql://... 或 sqlite:///路径，"
+                             "不带值时用 DATABASE_URL")
+    parser.add_argument("--metrics", choices=("json", "prometheus"), default=None,
+                        help="输出本次运行的指标（HTTP 延迟/状态码/流量、缓存命中率、各阶段耗时与成功率、最慢的日期和比赛）："
+                             "json 附在输出的 metrics 字段（流式/回填附在汇总行），prometheus 写到标准错误")
+    parser.add_argument("--metrics-file", default=None,
+                        help="把 --metrics 指定格式的指标写入该文件，而不是附在输出中")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
     """主函数"""
+    args = _parse_args(argv)
+    configure_archive(args.archive, args.replay, args.as_of)
+    configure_parse_pool(args.parse_workers)
+    configure_player_store(args.player_store)
+    configure_db_sink(args.db_sink)
+    if args.serve:
+        try:
+            asyncio.run(_serve_snapshots(args))
+        except KeyboardInterrupt:
+            pass
+        return
+
+    if args.backfill:
+        try:
+            summary = _run_backfill(args)
+            _write_line(_with_metrics({"type": "summary", **summary, "error": False}, args))
+            _print_http_pool_stats()
+            _print_http_cache_stats()
+            _print_resilience_stats()
+            _print_source_stats()
+            _print_archive_stats()
+            _close_parse_pool()
+            _close_db_sink()
+        except Exception as e:
+            _write_line({"type": "summary", "count": 0,
+                        "error": True, "message": str(e)})
+            sys.exit(1)
+        return
+
+    if args.pbp is not None:
+        try:
+            summary = asyncio.run(_run_playbyplay(args))
+            _write_line(_with_metrics({"type": "summary", **summary, "error": False}, args))
+            _print_http_cache_stats()
+            _print_resilience_stats()
+            _print_archive_stats()
+        except Exception as e:
+            _write_line({"type": "summary", "count": 0,
+                        "error": True, "message": str(e)})
+            sys.exit(1)
+        return
+
+    if args.stream:
+        try:
+            asyncio.run(_stream_ndjson(args))
+            _close_parse_pool()
+            _close_db_sink()
+        except Exception as e:
+            _write_line({"type": "summary", "count": 0,
+                        "error": True, "message": str(e)})
+            sys.exit(1)
+        return
+
     try:
-        matches = fetch_nba_schedule_multi_day()
-        result = {
-            'matches': matches,
-            'count': len(matches),
-            'error': False
-        }
-        print(json.dumps(result, ensure_ascii=False))
+        scheduler = RefreshScheduler(_refresh_schedule_path()) if args.adaptive else None
+        matches = fetch_nba_schedule_multi_day(scheduler)
+        _sink_matches(matches)
+        if args.since is not None or args.if_none_match:
+            result = _build_feed_output(matches, args)
+        else:
+            result = _build_result(matches)
+        with METRICS.stage("serialize"):
+            output = nba_json.dumps_document(result)
+        if args.metrics == "json" and not args.metrics_file:
+            # 指标附在输出中：在序列化计时之后再取快照，快照里包含本次序列化的耗时
+            output = nba_json.dumps_document(_with_metrics(result, args))
+        else:
+            _with_metrics(result, args)
+        print(output)
+        _print_http_pool_stats()
+        _print_http_cache_stats()
+        _print_resilience_stats()
+        _print_source_stats()
+        _print_archive_stats()
+        _close_parse_pool()
+        _close_db_sink()
     except Exception as e:
         error_result = {
             'matches': [],
@@ -892,7 +2160,7 @@ def main():
             'error': True,
             'message': str(e)
         }
-        print(json.dumps(error_result, ensure_ascii=False), file=sys.stderr)
+        print(nba_json.dumps_document(error_result), file=sys.stderr)
         sys.exit(1)
 
 
@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+# scripts/ 下的模块按脚本方式互相导入，测试时把 scripts/ 加入导入路径
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
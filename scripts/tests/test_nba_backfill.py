@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+import asyncio
+from datetime import date, datetime
+
+from nba_backfill import NY_TZ, BackfillCheckpoint, day_is_complete, run_backfill
+from nba_model import make_match, player_line
+
+TODAY = date(2025, 1, 20)
+OLD_DAY = date(2025, 1, 10)
+LEADERS = ("homeTopScorer", "homeTopRebounder", "homeTopAssister",
+           "awayTopScorer", "awayTopRebounder", "awayTopAssister")
+
+
+def _match(status="finished", leaders=True, **fields):
+    base = dict(id="0022400001", homeTeam="湖人", awayTeam="凯尔特人", homeTeamId=1610612747,
+                awayTeamId=1610612738, homeScore=110, awayScore=100, status=status,
+                date="2025-01-10", time="19:30", league="NBA", venue="LA Arena")
+    base.update(fields)
+    values = {k: player_line("Player", "points", 30) if leaders else None for k in LEADERS}
+    return make_match(values, **base)
+
+
+def test_empty_day_is_complete():
+    assert day_is_complete([], OLD_DAY, TODAY)
+
+
+def test_finished_day_with_leaders_is_complete():
+    assert day_is_complete([_match()], OLD_DAY, TODAY)
+
+
+def test_finished_game_without_leaders_leaves_day_incomplete():
+    assert not day_is_complete([_match(leaders=False)], OLD_DAY, TODAY)
+
+
+def test_postponed_game_only_settles_old_days():
+    postponed = _match(status="upcoming", leaders=False, homeScore=None, awayScore=None)
+    assert day_is_complete([_match(), postponed], OLD_DAY, TODAY)
+    assert not day_is_complete([_match(), postponed], date(2025, 1, 19), TODAY)
+
+
+def test_unsettled_finished_day_is_recorded_as_failed():
+    checkpoint = BackfillCheckpoint(None)
+    day = datetime(2025, 1, 10, tzinfo=NY_TZ)
+    outputs = []
+
+    async def fetch_day(_):
+        return [_match(leaders=False)]
+
+    async def on_day(d, matches):
+        outputs.append((d, matches))
+
+    summary = asyncio.run(run_backfill([day], fetch_day, on_day, checkpoint))
+    assert len(outputs) == 1
+    assert summary["completed"] == 0 and summary["incomplete"] == 1
+    assert not checkpoint.is_done("20250110")
+    assert "20250110" in checkpoint.failed
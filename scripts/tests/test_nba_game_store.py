@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+from nba_game_store import FinishedGameStore, is_final_match
+from nba_model import make_match, player_line
+from nba_refresh_scheduler import RefreshScheduler
+
+DEFAULT = ("homeTopScorer", "homeTopRebounder", "homeTopAssister",
+           "awayTopScorer", "awayTopRebounder", "awayTopAssister")
+WITH_STEALS = ("homeTopScorer", "homeTopRebounder", "homeTopAssister", "homeTopStealer",
+               "awayTopScorer", "awayTopRebounder", "awayTopAssister", "awayTopStealer")
+
+
+def _match(fields=DEFAULT):
+    return make_match({k: player_line("Player", "points", 30) for k in fields},
+                      id="0022400001", homeTeam="湖人", awayTeam="凯尔特人", homeTeamId=1610612747,
+                      awayTeamId=1610612738, homeScore=110, awayScore=100, status="finished",
+                      date="2025-01-10", time="19:30", league="NBA", venue="LA Arena")
+
+
+def test_final_match_follows_configured_leader_layout(monkeypatch):
+    monkeypatch.delenv("NBA_EXTRA_LEADER_STATS", raising=False)
+    assert is_final_match(_match())
+    assert not is_final_match(_match(WITH_STEALS))
+    monkeypatch.setenv("NBA_EXTRA_LEADER_STATS", "steals")
+    assert not is_final_match(_match())
+    assert is_final_match(_match(WITH_STEALS))
+
+
+def test_stored_day_is_refetched_after_layout_change(tmp_path, monkeypatch):
+    monkeypatch.delenv("NBA_EXTRA_LEADER_STATS", raising=False)
+    store = FinishedGameStore(str(tmp_path / "games.sqlite3"))
+    assert store.put_many("20250110", [_match()]) == 1
+    store.put_day("20250110", ["0022400001"])
+    assert store.get_day("20250110") == [_match()]
+    monkeypatch.setenv("NBA_EXTRA_LEADER_STATS", "steals")
+    assert store.get_many(["0022400001"]) == {}
+    assert store.get_day("20250110") is None
+    store.close()
+
+
+def test_settled_scheduler_day_is_due_after_layout_change(tmp_path, monkeypatch):
+    monkeypatch.delenv("NBA_EXTRA_LEADER_STATS", raising=False)
+    path = str(tmp_path / "schedule.json")
+    scheduler = RefreshScheduler(path)
+    scheduler.update_day("20250110", [_match()], 1000.0)
+    scheduler.save()
+    assert not RefreshScheduler(path).day_is_due("20250110", 2000.0)
+    monkeypatch.setenv("NBA_EXTRA_LEADER_STATS", "steals")
+    assert RefreshScheduler(path).day_is_due("20250110", 2000.0)
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+import os
+
+from nba_http_cache import HttpCache
+
+URL = "https://cdn.nba.com/static/json/liveData/boxscore/boxscore_0022400001.json"
+
+
+def test_store_and_load_round_trip(tmp_path):
+    cache = HttpCache(str(tmp_path), 1 << 20)
+    cache.store(URL, b'{"game": {}}\n{"x": 1}', {"ETag": '"v1"', "Content-Length": "99"})
+    entry = cache.load(URL)
+    assert entry.body == b'{"game": {}}\n{"x": 1}'
+    assert entry.etag == '"v1"'
+    assert "Content-Length" not in entry.headers
+    assert [n for n in os.listdir(tmp_path)] == [os.path.basename(cache._path(URL))]
+
+
+def test_truncated_entry_is_ignored(tmp_path):
+    cache = HttpCache(str(tmp_path), 1 << 20)
+    cache.store(URL, b"x" * 100, {"ETag": '"v1"'})
+    path = cache._path(URL)
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 10)
+    assert cache.load(URL) is None
+
+
+def test_eviction_keeps_recently_touched_entries(tmp_path):
+    cache = HttpCache(str(tmp_path), 2000)
+    urls = [f"{URL}?{i}" for i in range(6)]
+    for i, url in enumerate(urls):
+        cache.store(url, b"x" * 300, {"ETag": f'"{i}"'})
+        if i == 3:
+            cache.touch(urls[0])
+    assert cache.load(urls[0]) is not None
+    assert cache.load(urls[1]) is None
+    assert cache.load(urls[-1]) is not None
+    assert sum(os.path.getsize(os.path.join(tmp_path, n)) for n in os.listdir(tmp_path)) <= 2000
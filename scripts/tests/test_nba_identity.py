@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+import json
+
+from nba_identity import ESPN_HEADSHOT_URL, NBA_HEADSHOT_URL, IdentityRegistry
+
+
+def test_nba_avatar_does_not_depend_on_learned_espn_links(tmp_path):
+    path = str(tmp_path / "registry.json")
+    registry = IdentityRegistry([], {}, path)
+    before = registry.identify(2544, "LeBron James")
+    registry.link_espn("1966", "LeBron James", None)
+    after = registry.identify(2544, "LeBron James")
+    assert before == after == {"name": "LeBron James", "avatar": NBA_HEADSHOT_URL.format(person_id="2544")}
+
+    registry.save()
+    reloaded = IdentityRegistry([], {}, path)
+    assert reloaded.identify(2544, "LeBron James") == before
+
+
+def test_players_with_the_same_name_are_not_merged():
+    registry = IdentityRegistry([], {}, None)
+    first = registry.identify(1, "Marcus Morris")
+    second = registry.identify(2, "Marcus Morris")
+    assert first["avatar"] != second["avatar"]
+    assert registry.link_espn("100", "Marcus Morris", None) == ESPN_HEADSHOT_URL.format(athlete_id="100")
+    assert registry.link_espn("200", "Marcus Morris", None) == ESPN_HEADSHOT_URL.format(athlete_id="200")
+
+
+def test_old_registry_format_loads_names_only(tmp_path):
+    path = tmp_path / "registry.json"
+    path.write_text(json.dumps({"players": {"2544": ["LeBron James", "1966", "https://espn/1966.png"]}}))
+    registry = IdentityRegistry([], {}, str(path))
+    assert registry.identify(2544, "")["name"] == "LeBron James"
+    assert registry.identify(2544, "")["avatar"] == NBA_HEADSHOT_URL.format(person_id="2544")
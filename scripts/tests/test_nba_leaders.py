@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+from nba_boxscore import leader_candidates, to_int_or_none
+from nba_leaders import LEADER_STATS, TopK, cdn_team_leaders
+
+PLUS_MINUS = [LEADER_STATS["plusMinus"]]
+
+
+def _player(name, played="1", **stats):
+    first, last = name.split(" ", 1)
+    return {"personId": hash(name) % 10000, "firstName": first, "familyName": last, "played": played,
+            "statistics": stats}
+
+
+def test_negative_plus_minus_ignores_dnp_player():
+    players = [_player("A Starter", plusMinusPoints=-8), _player("B Bench", plusMinusPoints=-3),
+               _player("C DNP", played="0", plusMinusPoints=0)]
+    leaders = cdn_team_leaders(players, PLUS_MINUS, to_int_or_none)
+    assert [(p.name, p.value) for p in leaders["plusMinus"]] == [("B Bench", -3)]
+
+
+def test_candidates_keep_best_played_player():
+    players = [_player("A Starter", plusMinusPoints=-8), _player("C DNP", played="0", plusMinusPoints=0),
+               _player("B Bench", plusMinusPoints=-3)]
+    kept = leader_candidates(players, PLUS_MINUS)
+    assert [p["familyName"] for p in kept] == ["Bench"]
+
+
+def test_missing_values_do_not_rank_as_zero():
+    top = TopK(1)
+    top.offer([None], "missing")
+    top.offer([-5], "negative")
+    assert top.results() == [[(-5, "negative")]]
+
+
+def test_all_missing_gives_no_leader():
+    players = [_player("A Starter"), _player("B Bench")]
+    assert cdn_team_leaders(players, PLUS_MINUS, to_int_or_none) == {"plusMinus": []}
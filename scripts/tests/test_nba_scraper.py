@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import nba_scraper
+from nba_scraper import _day_may_be_live
+
+
+def _at_et_hour(monkeypatch, hour):
+    now = datetime(2025, 1, 10, hour, 30, tzinfo=ZoneInfo("America/New_York"))
+    monkeypatch.setattr(nba_scraper, "_base_et_for_offset", lambda offset: now)
+
+
+def test_today_may_be_live_without_scheduler(monkeypatch):
+    _at_et_hour(monkeypatch, 20)
+    assert _day_may_be_live(0, None)
+    assert not _day_may_be_live(-1, None)
+    assert not _day_may_be_live(1, None)
+
+
+def test_yesterday_may_be_live_just_after_midnight(monkeypatch):
+    _at_et_hour(monkeypatch, 1)
+    assert _day_may_be_live(-1, None)
+
+
+def test_previous_matches_decide(monkeypatch):
+    _at_et_hour(monkeypatch, 20)
+    assert _day_may_be_live(1, [{"status": "live"}])
+    assert not _day_may_be_live(0, [{"status": "finished"}])
+    assert _day_may_be_live(0, [{"status": "upcoming"}])